@@ -9,6 +9,7 @@ from pytest_django.lazy_django import skip_if_no_django
 
 from course_discovery.apps.core.tests.factories import PartnerFactory, SiteFactory
 from course_discovery.apps.core.utils import ElasticsearchUtils
+from course_discovery.apps.course_metadata.data_loaders.rate_limiter import reset_rate_limiters
 
 logger = logging.getLogger(__name__)
 
@@ -103,3 +104,9 @@ def client():
 def clear_caches(request):
     for existing_cache in caches.all():
         existing_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_rate_limiters():
+    # Each test's data loaders start with a full bucket of requests.
+    reset_rate_limiters()
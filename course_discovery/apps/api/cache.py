@@ -1,10 +1,18 @@
+import gzip
+import hashlib
 import logging
+import math
+import threading
 import time
 import zlib
+from collections import OrderedDict, namedtuple
 
 from django.conf import settings
 from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
 from django.http.response import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from rest_framework.renderers import JSONRenderer
 from rest_framework_extensions.cache.decorators import CacheResponse
 from rest_framework_extensions.key_constructor.bits import KeyBitBase, QueryParamsKeyBit
@@ -15,17 +23,118 @@ from waffle import get_waffle_flag_model
 
 from course_discovery.apps.api.utils import conditional_decorator
 
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
 logger = logging.getLogger(__name__)
 API_TIMESTAMP_KEY = 'api_timestamp'
+API_RESOURCE_TIMESTAMP_KEY_TPL = 'api_timestamp.{resource}.{partner}'
+ALL_PARTNERS = 'all'
+API_CACHE_STATS_KEY_TPL = 'api_cache_stats.{name}'
+LOCK_KEY_PREFIX = 'lock.'
+STALE_KEY_PREFIX = 'stale.'
+
+# Resource families are the groups of endpoints whose cached responses are
+# invalidated together. Views opt in by setting ``cache_resource_family``.
+COURSES_RESOURCE = 'courses'
+ORGANIZATIONS_RESOURCE = 'organizations'
+PATHWAYS_RESOURCE = 'pathways'
+PEOPLE_RESOURCE = 'people'
+PROGRAMS_RESOURCE = 'programs'
+ALL_RESOURCES = (
+    COURSES_RESOURCE, ORGANIZATIONS_RESOURCE, PATHWAYS_RESOURCE, PEOPLE_RESOURCE, PROGRAMS_RESOURCE,
+)
+
+# Courses and programs nest nearly every catalog model (runs, seats, entitlements, subjects, staff, etc.),
+# and pathways embed minimal programs, so those three families move together.
+CATALOG_RESOURCES = (COURSES_RESOURCE, PATHWAYS_RESOURCE, PROGRAMS_RESOURCE)
+PERSON_RESOURCES = (COURSES_RESOURCE, PEOPLE_RESOURCE, PROGRAMS_RESOURCE)
+
+ApiCacheDependency = namedtuple('ApiCacheDependency', ['resources', 'partner_path'])
+
+# Declares which resource families may render a given model, and how to find the
+# partner an instance belongs to. Models missing from this map fall back to
+# invalidating the entire API cache. A partner_path of None (or one that can't be
+# resolved) invalidates the listed resources for every partner.
+API_CACHE_DEPENDENCIES = {
+    'course_metadata.course': ApiCacheDependency(CATALOG_RESOURCES, 'partner_id'),
+    'course_metadata.courseentitlement': ApiCacheDependency(CATALOG_RESOURCES, 'course.partner_id'),
+    'course_metadata.courserun': ApiCacheDependency(CATALOG_RESOURCES, 'course.partner_id'),
+    'course_metadata.courseurlredirect': ApiCacheDependency(CATALOG_RESOURCES, 'partner_id'),
+    'course_metadata.courseurlslug': ApiCacheDependency(CATALOG_RESOURCES, 'partner_id'),
+    'course_metadata.degree': ApiCacheDependency(CATALOG_RESOURCES, 'partner_id'),
+    'course_metadata.organization': ApiCacheDependency(ALL_RESOURCES, 'partner_id'),
+    'course_metadata.pathway': ApiCacheDependency((PATHWAYS_RESOURCE,), 'partner_id'),
+    'course_metadata.person': ApiCacheDependency(PERSON_RESOURCES, 'partner_id'),
+    'course_metadata.personareaofexpertise': ApiCacheDependency(PERSON_RESOURCES, 'person.partner_id'),
+    'course_metadata.personsocialnetwork': ApiCacheDependency(PERSON_RESOURCES, 'person.partner_id'),
+    'course_metadata.position': ApiCacheDependency(PERSON_RESOURCES, 'person.partner_id'),
+    'course_metadata.program': ApiCacheDependency(CATALOG_RESOURCES, 'partner_id'),
+    'course_metadata.seat': ApiCacheDependency(CATALOG_RESOURCES, 'course_run.course.partner_id'),
+    'course_metadata.subject': ApiCacheDependency(CATALOG_RESOURCES, 'partner_id'),
+    'course_metadata.topic': ApiCacheDependency(CATALOG_RESOURCES, 'partner_id'),
+}
+
+
+def get_api_resource_timestamp_key(resource, partner_id=None):
+    return API_RESOURCE_TIMESTAMP_KEY_TPL.format(
+        resource=resource,
+        partner=ALL_PARTNERS if partner_id is None else partner_id,
+    )
+
+
+def _get_request_partner_id(request):
+    site = getattr(request, 'site', None)
+    partner = getattr(site, 'partner', None)
+    return getattr(partner, 'id', None)
+
+
+def get_api_timestamps(resource=None, partner_id=None):
+    """
+    Return the timestamps a cached response for the given resource family depends on.
+
+    The global timestamp is always included. When a resource family is given, the
+    family's all-partner timestamp and, if known, its per-partner timestamp are added.
+    Missing timestamps are initialized to the current time, mirroring cache.get_or_set.
+    """
+    keys = [API_TIMESTAMP_KEY]
+    if resource:
+        keys.append(get_api_resource_timestamp_key(resource))
+        if partner_id is not None:
+            keys.append(get_api_resource_timestamp_key(resource, partner_id))
+
+    timestamps = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in timestamps}
+    if missing:
+        cache.set_many(missing, None)
+        timestamps.update(missing)
+
+    return [timestamps[key] for key in keys]
 
 
 class ApiTimestampKeyBit(KeyBitBase):
     def get_data(self, **kwargs):  # pylint: disable=arguments-differ
-        return cache.get_or_set(API_TIMESTAMP_KEY, time.time, None)
+        view_instance = kwargs.get('view_instance')
+        resource = getattr(view_instance, 'cache_resource_family', None)
+        if not resource:
+            data = cache.get_or_set(API_TIMESTAMP_KEY, time.time, None)
+            last_modified = data
+        else:
+            partner_id = _get_request_partner_id(kwargs.get('request'))
+            data = get_api_timestamps(resource, partner_id)
+            last_modified = max(data)
 
+        # Nothing the response depends on has changed since the newest of its timestamps.
+        # Views are instantiated per request, so this is safe to keep on the view.
+        if view_instance is not None:
+            view_instance.api_cache_timestamp = last_modified
 
-class TimestampedListKeyConstructor(DefaultListKeyConstructor):
-    timestamp = ApiTimestampKeyBit()
+        return data
+
+
+class ListKeyConstructor(DefaultListKeyConstructor):
     # The DefaultListKeyConstructor includes the PaginationKeyBit. While it does
     # subclass QueryParamsKeyBit, it also bypasses logic which includes all query
     # params in the cache key, restricting the set of query params that end up in
@@ -35,13 +144,20 @@ class TimestampedListKeyConstructor(DefaultListKeyConstructor):
     querystring = QueryParamsKeyBit()
 
 
-class TimestampedObjectKeyConstructor(DefaultObjectKeyConstructor):
-    timestamp = ApiTimestampKeyBit()
+class ObjectKeyConstructor(DefaultObjectKeyConstructor):
     # The DefaultObjectKeyConstructor doesn't include querystring parameters
     # in its cache key.
     querystring = QueryParamsKeyBit()
 
 
+class TimestampedListKeyConstructor(ListKeyConstructor):
+    timestamp = ApiTimestampKeyBit()
+
+
+class TimestampedObjectKeyConstructor(ObjectKeyConstructor):
+    timestamp = ApiTimestampKeyBit()
+
+
 def timestamped_list_key_constructor(*args, **kwargs):  # pylint: disable=unused-argument
     return TimestampedListKeyConstructor()(**kwargs)
 
@@ -50,17 +166,402 @@ def timestamped_object_key_constructor(*args, **kwargs):  # pylint: disable=unus
     return TimestampedObjectKeyConstructor()(**kwargs)
 
 
+# The stale key constructors omit the timestamp, so they are stable across cache
+# generations. They are used to find the most recently cached generation of a response.
+def stale_list_key_constructor(*args, **kwargs):  # pylint: disable=unused-argument
+    return STALE_KEY_PREFIX + ListKeyConstructor()(**kwargs)
+
+
+def stale_object_key_constructor(*args, **kwargs):  # pylint: disable=unused-argument
+    return STALE_KEY_PREFIX + ObjectKeyConstructor()(**kwargs)
+
+
 def set_api_timestamp():
     timestamp = time.time()
     cache.set(API_TIMESTAMP_KEY, timestamp, None)
 
 
-def api_change_receiver(sender, **kwargs):  # pylint: disable=unused-argument
+def set_api_resource_timestamps(resources, partner_id=None):
+    """
+    Invalidate cached responses for the given resource families.
+
+    If partner_id is None, the families are invalidated for every partner.
+    """
+    timestamp = time.time()
+    cache.set_many(
+        {get_api_resource_timestamp_key(resource, partner_id): timestamp for resource in resources},
+        None,
+    )
+
+
+def _resolve_partner_id(instance, partner_path):
+    """
+    Follow a dotted attribute path (e.g. 'course_run.course.partner_id') from instance.
+    Returns None if any part of the path can't be resolved.
+    """
+    if instance is None or not partner_path:
+        return None
+
+    value = instance
+    try:
+        for attr in partner_path.split('.'):
+            value = getattr(value, attr)
+    except (AttributeError, ObjectDoesNotExist):
+        return None
+
+    return value
+
+
+def api_change_receiver(sender, instance=None, **kwargs):  # pylint: disable=unused-argument
     """
     Receiver function for handling post_save and post_delete signals emitted by
     course_metadata models.
+
+    Models with a declared dependency only invalidate the resource families (and
+    partner) that can render them. Everything else invalidates the entire API cache.
     """
-    set_api_timestamp()
+    dependency = API_CACHE_DEPENDENCIES.get(sender._meta.label_lower)  # pylint: disable=protected-access
+    if dependency is None:
+        set_api_timestamp()
+        return
+
+    partner_id = _resolve_partner_id(instance, dependency.partner_path)
+    set_api_resource_timestamps(dependency.resources, partner_id)
+
+
+GZIP_ENCODING = 'gzip'
+BROTLI_ENCODING = 'br'
+# zlib.decompress accepts both zlib and gzip framed data with this wbits value.
+ZLIB_AUTO_HEADER_WBITS = zlib.MAX_WBITS | 32
+
+
+def accepts_encoding(request, encoding):
+    """
+    Return True if the request's Accept-Encoding header allows the given content coding.
+    """
+    for value in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = value.strip().partition(';')
+        if coding.strip().lower() not in (encoding, '*'):
+            continue
+
+        qvalue = params.strip()
+        if qvalue.startswith('q='):
+            try:
+                return float(qvalue[2:]) > 0
+            except ValueError:
+                return False
+        return True
+
+    return False
+
+
+def encode_content(content, encoding):
+    if encoding == BROTLI_ENCODING and brotli:
+        return brotli.compress(content), BROTLI_ENCODING
+    return gzip.compress(content, compresslevel=settings.API_CACHE_COMPRESSION_LEVEL), GZIP_ENCODING
+
+
+def can_decode_content(encoding):
+    """
+    Return True if this process can decode content stored with the given content coding.
+
+    brotli is optional, so a process without it can't read entries written by one that has it.
+    """
+    return encoding != BROTLI_ENCODING or brotli is not None
+
+
+def decode_content(content, encoding):
+    if encoding == BROTLI_ENCODING:
+        return brotli.decompress(content)
+
+    try:
+        # Entries without an encoding predate gzip support, and are either zlib compressed or not compressed.
+        return zlib.decompress(content, ZLIB_AUTO_HEADER_WBITS)
+    except (TypeError, zlib.error):
+        # If we get a type error or a zlib error, the response content was never compressed
+        return content
+
+
+def unpack_response_triple(response_triple):
+    """
+    Return (content, status, headers, encoding, etag, last_modified) for a cached response.
+
+    Entries written by older versions of this module are (content, status, headers) triples,
+    or lack the trailing validators. Missing values are None.
+    """
+    content, status, headers = response_triple[:3]
+    encoding, etag, last_modified = (tuple(response_triple[3:]) + (None, None, None))[:3]
+    return content, status, headers, encoding, etag, last_modified
+
+
+def get_content_etag(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+def get_last_modified(timestamp):
+    """
+    Return the whole-second Last-Modified time for a cache timestamp, or None if it can't be used yet.
+
+    HTTP dates have a precision of one second, so the timestamp is rounded up. Until that second has
+    passed, a further change could get the same Last-Modified time and clients sending If-Modified-Since
+    would wrongly be told nothing changed. Responses rendered in the meantime rely on their ETag alone.
+    """
+    if not timestamp:
+        return None
+
+    last_modified = math.ceil(timestamp)
+    if time.time() <= last_modified:
+        return None
+
+    return last_modified
+
+
+def set_response_validators(response, etag, last_modified, encoding=None):
+    """
+    Set the ETag and Last-Modified headers of a response.
+
+    Strong ETags must differ between content codings, so encoded responses get a suffixed ETag.
+    """
+    if etag:
+        response['ETag'] = quote_etag('{}-{}'.format(etag, encoding) if encoding else etag)
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+
+
+def get_not_modified_response(request, status, etag, last_modified, encoding=None):
+    """
+    Return a 304 (or 412) response if the request's conditional headers are satisfied, else None.
+    """
+    if not (etag or last_modified) or not 200 <= status < 300:
+        return None
+
+    representation_etag = None
+    if etag:
+        representation_etag = quote_etag('{}-{}'.format(etag, encoding) if encoding else etag)
+
+    response = get_conditional_response(
+        request,
+        etag=representation_etag,
+        last_modified=int(last_modified) if last_modified else None,
+    )
+    if response is not None:
+        set_response_validators(response, etag, last_modified, encoding)
+        if encoding:
+            patch_vary_headers(response, ('Accept-Encoding',))
+
+    return response
+
+
+API_CACHE_STATS = ('hit', 'stale', 'miss', 'lock_wait', 'lock_wait_hit', 'lock_wait_timeout')
+
+
+def record_api_cache_event(name):
+    """
+    Increment one of the shared API_CACHE_STATS counters, if stat recording is enabled.
+    """
+    if not settings.API_CACHE_RECORD_STATS:
+        return
+
+    key = API_CACHE_STATS_KEY_TPL.format(name=name)
+    # add() is a no-op if the counter already exists; it guarantees incr() has something to increment.
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The counter was evicted between add() and incr(). Losing a single event is fine.
+        pass
+
+
+def get_api_cache_stats():
+    keys = {API_CACHE_STATS_KEY_TPL.format(name=name): name for name in API_CACHE_STATS}
+    counts = cache.get_many(list(keys))
+    return {name: counts.get(key, 0) for key, name in keys.items()}
+
+
+def reset_api_cache_stats():
+    cache.delete_many([API_CACHE_STATS_KEY_TPL.format(name=name) for name in API_CACHE_STATS])
+
+
+LOCAL_CACHE_STATS = ('hits', 'misses', 'evictions', 'entries', 'bytes', 'max_bytes')
+
+
+def log_api_cache_stats():
+    """
+    Log the shared API_CACHE_STATS counters, and the stats of this process's local response cache.
+    """
+    stats = get_api_cache_stats()
+    local_stats = local_response_cache.stats()
+    logger.info(
+        'API cache stats: %s. Local response cache stats: %s',
+        ', '.join('{}={}'.format(name, stats[name]) for name in API_CACHE_STATS),
+        ', '.join('{}={}'.format(name, local_stats[name]) for name in LOCAL_CACHE_STATS),
+    )
+
+
+class ApiCacheStatsLogger:
+    """
+    Logs the API cache stats from the processes serving API requests, at most once per interval.
+
+    The interval, in seconds, is read from settings.API_CACHE_STATS_LOG_INTERVAL, and 0 disables logging.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._logged_at = time.monotonic()
+
+    def log_if_due(self):
+        interval = settings.API_CACHE_STATS_LOG_INTERVAL
+        if not interval:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self._logged_at < interval:
+                return
+            self._logged_at = now
+
+        log_api_cache_stats()
+
+
+api_cache_stats_logger = ApiCacheStatsLogger()
+
+
+class LocalResponseCache:
+    """
+    A bounded, per-process LRU cache of response triples, sized by the bytes of their content.
+
+    It sits in front of the shared cache and uses the same (timestamped) keys, so a change of
+    cache generation makes old entries unreachable; they then age out as new entries are added.
+    The budget is read from settings.API_CACHE_LOCAL_MAX_BYTES, and 0 disables the cache.
+    """
+    # Rough per-entry cost of the key, tuple, and headers on top of the content itself.
+    ENTRY_OVERHEAD_BYTES = 1024
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self):
+        return settings.API_CACHE_LOCAL_MAX_BYTES
+
+    def _entry_size(self, response_triple):
+        content = response_triple[0]
+        return len(content) + self.ENTRY_OVERHEAD_BYTES
+
+    def get(self, key):
+        if not self.max_bytes:
+            return None
+
+        with self._lock:
+            response_triple = self._entries.get(key)
+            if response_triple is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+
+        return response_triple
+
+    def set(self, key, response_triple):
+        max_bytes = self.max_bytes
+        entry_size = self._entry_size(response_triple)
+        if entry_size > max_bytes:
+            # Also covers the disabled case. Entries larger than the whole budget would evict everything.
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= self._entry_size(previous)
+
+            self._entries[key] = response_triple
+            self.size += entry_size
+
+            while self.size > max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= self._entry_size(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+local_response_cache = LocalResponseCache()
+
+
+class TypeaheadCache:
+    """
+    A bounded, per-process LRU cache of typeahead responses, whose entries expire after a short time.
+
+    Typeahead is requested on every keystroke, and its results only need to be as fresh as the search index.
+    The size and lifetime of entries are read from settings.TYPEAHEAD_CACHE_MAX_ENTRIES and
+    settings.TYPEAHEAD_CACHE_TIMEOUT. A size of 0 disables the cache.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_entries(self):
+        return settings.TYPEAHEAD_CACHE_MAX_ENTRIES
+
+    @staticmethod
+    def get_key(query, partner, index_generation):
+        # Typeahead matching is case insensitive, and ignores repeated whitespace.
+        return ' '.join(query.lower().split()), partner.short_code, index_generation
+
+    def get(self, key):
+        if not self.max_entries:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires, data = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data):
+        max_entries = self.max_entries
+        if not max_entries:
+            return
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + settings.TYPEAHEAD_CACHE_TIMEOUT, data)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+typeahead_cache = TypeaheadCache()
 
 
 class CompressedCacheResponse(CacheResponse):
@@ -68,7 +569,15 @@ class CompressedCacheResponse(CacheResponse):
     Subclasses CacheResponse to allow for compression of content going into the cache
     See https://github.com/chibisov/drf-extensions/blob/master/rest_framework_extensions/cache/decorators.py#L52
     for a similar implementation of process_cache_response without compression
+
+    When settings.API_CACHE_STALE_WHILE_REVALIDATE is enabled, misses are coalesced: a single
+    request (holding a cache lock) renders the response, while concurrent requests for the same
+    key are served the previous generation's entry, or wait briefly for the new one.
     """
+    def __init__(self, *args, stale_key_func=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stale_key_func = stale_key_func
+
     def process_cache_response(self, view_instance, view_method, request, args, kwargs):
         flag_name = 'compressed_cache.{}.{}'.format(view_instance.__class__.__name__, view_method.__name__)
         flag = get_waffle_flag_model().get(flag_name)
@@ -79,7 +588,10 @@ class CompressedCacheResponse(CacheResponse):
         # to define all of the flags ahead of time.
         use_page_cache = (not flag.pk) or flag.is_active(request)
 
-        if use_page_cache:
+        if not use_page_cache:
+            logger.info("Skipping page caching for %s", flag_name)
+            response = self.render_response(view_instance, view_method, request, args, kwargs)
+        else:
             key = self.calculate_key(
                 view_instance=view_instance,
                 view_method=view_method,
@@ -87,46 +599,167 @@ class CompressedCacheResponse(CacheResponse):
                 args=args,
                 kwargs=kwargs
             )
-            response_triple = self.cache.get(key)
-        else:
-            logger.info("Skipping page caching for %s", flag_name)
-            response_triple = None
-
-        if not response_triple:
-            response = view_method(view_instance, request, *args, **kwargs)
-            response = view_instance.finalize_response(request, response, *args, **kwargs)
-            response.render()
-
-            if (not (response.status_code >= 400 or self.cache_errors) and
-                    isinstance(response.accepted_renderer, JSONRenderer) and
-                    use_page_cache):
-                # Put the response in the cache only if there are no cache errors, response errors,
-                # and the format is json. We avoid caching for the BrowsableAPIRenderer so that users don't see
-                # different usernames that are cached from the BrowsableAPIRenderer html
-                response_triple = (
-                    zlib.compress(response.rendered_content),
-                    response.status_code,
-                    response._headers.copy(),  # pylint: disable=protected-access
-                )
-                self.cache.set(key, response_triple, self.timeout)
-        else:
-            # If we get data from the cache, we reassemble the data to build a response
-            # We reassemble the pieces from the cache because we can't actually set rendered_content
-            # which is the part of the response that we compress
-            compressed_content, status, headers = response_triple
+            response_triple = self.get_cached_response(key)
 
-            try:
-                decompressed_content = zlib.decompress(compressed_content)
-            except (TypeError, zlib.error):
-                # If we get a type error or a zlib error, the response content was never compressed
-                decompressed_content = compressed_content
-
-            response = HttpResponse(content=decompressed_content, status=status)
-            response._headers = headers  # pylint: disable=protected-access
+            if response_triple:
+                record_api_cache_event('hit')
+                response = self.build_response(request, response_triple)
+            elif settings.API_CACHE_STALE_WHILE_REVALIDATE:
+                response = self.revalidate_response(key, view_instance, view_method, request, args, kwargs)
+            else:
+                record_api_cache_event('miss')
+                response = self.render_and_cache_response(key, view_instance, view_method, request, args, kwargs)
 
         if not hasattr(response, '_closable_objects'):
             response._closable_objects = []  # pylint: disable=protected-access
 
+        api_cache_stats_logger.log_if_due()
+        return response
+
+    def get_cached_response(self, key):
+        response_triple = local_response_cache.get(key)
+        if response_triple is None:
+            response_triple = self.cache.get(key)
+            if response_triple and not can_decode_content(unpack_response_triple(response_triple)[3]):
+                # Treat entries this process can't decode as misses; rendering the response replaces them.
+                response_triple = None
+            if response_triple:
+                local_response_cache.set(key, response_triple)
+
+        return response_triple
+
+    def set_cached_response(self, key, response_triple):
+        self.cache.set(key, response_triple, self.timeout)
+        local_response_cache.set(key, response_triple)
+
+    def calculate_stale_key(self, view_instance, view_method, request, args, kwargs):
+        if self.stale_key_func is None:
+            return None
+
+        return self.stale_key_func(
+            view_instance=view_instance,
+            view_method=view_method,
+            request=request,
+            args=args,
+            kwargs=kwargs
+        )
+
+    def render_response(self, view_instance, view_method, request, args, kwargs):
+        response = view_method(view_instance, request, *args, **kwargs)
+        response = view_instance.finalize_response(request, response, *args, **kwargs)
+        response.render()
+        return response
+
+    def render_and_cache_response(self, key, view_instance, view_method, request, args, kwargs, stale_key=None):
+        response = self.render_response(view_instance, view_method, request, args, kwargs)
+
+        if (not (response.status_code >= 400 or self.cache_errors) and
+                isinstance(response.accepted_renderer, JSONRenderer)):
+            # Put the response in the cache only if there are no cache errors, response errors,
+            # and the format is json. We avoid caching for the BrowsableAPIRenderer so that users don't see
+            # different usernames that are cached from the BrowsableAPIRenderer html
+            # The content is stored encoded with a standard content coding, so that it can be sent
+            # to clients as-is instead of being decompressed here and compressed again downstream.
+            content, encoding = encode_content(response.rendered_content, settings.API_CACHE_CONTENT_ENCODING)
+            etag = get_content_etag(response.rendered_content)
+            last_modified = get_last_modified(getattr(view_instance, 'api_cache_timestamp', None))
+            response_triple = (
+                content,
+                response.status_code,
+                response._headers.copy(),  # pylint: disable=protected-access
+                encoding,
+                etag,
+                last_modified,
+            )
+            self.set_cached_response(key, response_triple)
+
+            if stale_key:
+                # Point the stable key at this generation's entry, rather than storing the content twice.
+                self.cache.set(stale_key, key, None)
+
+            if accepts_encoding(request, encoding):
+                # Send the encoded content as a cache hit would, so that the representation and its ETag
+                # are the same whether or not the response was cached already.
+                return self.build_response(request, response_triple)
+
+            not_modified = get_not_modified_response(request, response.status_code, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            set_response_validators(response, etag, last_modified)
+
+        return response
+
+    def revalidate_response(self, key, view_instance, view_method, request, args, kwargs):
+        """
+        Handle a miss without letting concurrent requests all render the same response.
+
+        The first request to claim the lock renders and caches the response. Everyone else gets
+        the previous generation's entry if there is one, or polls for the new entry until
+        API_CACHE_LOCK_WAIT elapses. If the new entry still isn't there (e.g. the rendering
+        request failed), the waiting request falls back to rendering the response itself.
+        """
+        stale_key = self.calculate_stale_key(view_instance, view_method, request, args, kwargs)
+        lock_key = LOCK_KEY_PREFIX + key
+
+        if self.cache.add(lock_key, True, settings.API_CACHE_LOCK_TIMEOUT):
+            record_api_cache_event('miss')
+            try:
+                return self.render_and_cache_response(
+                    key, view_instance, view_method, request, args, kwargs, stale_key=stale_key
+                )
+            finally:
+                self.cache.delete(lock_key)
+
+        if stale_key:
+            stale_generation_key = self.cache.get(stale_key)
+            response_triple = self.get_cached_response(stale_generation_key) if stale_generation_key else None
+            if response_triple:
+                record_api_cache_event('stale')
+                return self.build_response(request, response_triple)
+
+        record_api_cache_event('lock_wait')
+        deadline = time.time() + settings.API_CACHE_LOCK_WAIT
+        while time.time() < deadline:
+            time.sleep(settings.API_CACHE_LOCK_POLL_INTERVAL)
+            response_triple = self.get_cached_response(key)
+            if response_triple:
+                record_api_cache_event('lock_wait_hit')
+                return self.build_response(request, response_triple)
+            if not self.cache.get(lock_key):
+                # The rendering request finished without caching anything; there is nothing to wait for.
+                break
+
+        record_api_cache_event('lock_wait_timeout')
+        return self.render_and_cache_response(
+            key, view_instance, view_method, request, args, kwargs, stale_key=stale_key
+        )
+
+    def build_response(self, request, response_triple):
+        # If we get data from the cache, we reassemble the data to build a response
+        # We reassemble the pieces from the cache because we can't actually set rendered_content
+        # which is the part of the response that we compress
+        content, status, headers, encoding, etag, last_modified = unpack_response_triple(response_triple)
+        send_encoded = bool(encoding) and accepts_encoding(request, encoding)
+
+        # Answer conditional requests before doing any work on the content.
+        not_modified = get_not_modified_response(
+            request, status, etag, last_modified, encoding if send_encoded else None
+        )
+        if not_modified is not None:
+            return not_modified
+
+        headers = headers.copy()
+        if send_encoded:
+            headers['content-encoding'] = ('Content-Encoding', encoding)
+        else:
+            content = decode_content(content, encoding)
+
+        response = HttpResponse(content=content, status=status)
+        response._headers = headers  # pylint: disable=protected-access
+        set_response_validators(response, etag, last_modified, encoding if send_encoded else None)
+        if encoding:
+            patch_vary_headers(response, ('Accept-Encoding',))
         return response
 
 
@@ -138,21 +771,30 @@ class CompressedCacheResponseMixin():
     """
     Acts like drf-extensions CacheResponseMixin, but with compression into the cache and decompression out of it
     """
+    # Set to one of the *_RESOURCE names to scope cache invalidation to a resource family.
+    # Views without a family are invalidated by any change to course metadata.
+    cache_resource_family = None
     object_cache_key_func = timestamped_object_key_constructor
     list_cache_key_func = timestamped_list_key_constructor
+    object_stale_key_func = stale_object_key_constructor
+    list_stale_key_func = stale_list_key_constructor
     object_cache_timeout = settings.REST_FRAMEWORK_EXTENSIONS['DEFAULT_CACHE_RESPONSE_TIMEOUT']
     list_cache_timeout = settings.REST_FRAMEWORK_EXTENSIONS['DEFAULT_CACHE_RESPONSE_TIMEOUT']
 
     @conditional_decorator(
         settings.USE_API_CACHING,
-        compressed_cache_response(key_func=list_cache_key_func, timeout=list_cache_timeout),
+        compressed_cache_response(
+            key_func=list_cache_key_func, stale_key_func=list_stale_key_func, timeout=list_cache_timeout
+        ),
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
     @conditional_decorator(
         settings.USE_API_CACHING,
-        compressed_cache_response(key_func=object_cache_key_func, timeout=object_cache_timeout),
+        compressed_cache_response(
+            key_func=object_cache_key_func, stale_key_func=object_stale_key_func, timeout=object_cache_timeout
+        ),
     )
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,366 @@
+"""
+Materialized, request-independent JSON documents for course, course run, and program detail responses.
+
+Rendering a detail response walks a large graph of related rows. Instead, the canonical JSON for each object
+is stored in the SerializedDocument table. Documents are deleted when a row they depend on changes, and are
+rebuilt the next time they are requested (or in bulk by the build_serialized_documents management command).
+
+Documents never contain user-specific data. Marketing URLs carry UTM_PARAMS_PLACEHOLDER in place of the UTM
+parameters, and fields like a course's ``editable`` are added when a document is served.
+"""
+import logging
+import uuid
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from course_discovery.apps.api.cache import API_CACHE_DEPENDENCIES, _resolve_partner_id
+from course_discovery.apps.api.models import SerializedDocument
+from course_discovery.apps.api.serializers import (
+    UTM_PARAMS_PLACEHOLDER, CourseDocumentSerializer, CourseRunWithProgramsSerializer, ProgramSerializer,
+    get_utm_source_for_user
+)
+from course_discovery.apps.core.utils import is_history_model
+from course_discovery.apps.course_metadata.choices import ProgramStatus
+from course_discovery.apps.course_metadata.models import Course, CourseEntitlement, CourseRun, Program, Seat
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the output of the document serializers changes. Documents rendered by an older
+# version are ignored, and can be cleaned up with build_serialized_documents --delete_stale_versions.
+DOCUMENT_SERIALIZER_VERSION = '1'
+DOCUMENT_BUILD_CHUNK_SIZE = 100
+# Cache key of a token which changes whenever documents are deleted, so that builds racing a change can tell.
+DOCUMENT_GENERATION_KEY = 'serialized_document_generation'
+
+DOCUMENT_SERIALIZERS = {
+    SerializedDocument.COURSE: CourseDocumentSerializer,
+    SerializedDocument.COURSE_RUN: CourseRunWithProgramsSerializer,
+    SerializedDocument.PROGRAM: ProgramSerializer,
+}
+
+# The fields objects of each document type can be looked up by. Programs don't have keys.
+DOCUMENT_LOOKUP_FIELDS = {
+    SerializedDocument.COURSE: ('uuid', 'key'),
+    SerializedDocument.COURSE_RUN: ('uuid', 'key'),
+    SerializedDocument.PROGRAM: ('uuid',),
+}
+
+
+def get_document_queryset(document_type, partner):
+    """
+    Return the prefetched queryset documents of the given type are rendered from.
+
+    The querysets match the ones the detail endpoints use when no query parameters are given.
+    """
+    if document_type == SerializedDocument.COURSE:
+        return CourseDocumentSerializer.prefetch_queryset(
+            partner=partner,
+            course_runs=CourseRun.objects.filter(course__partner=partner).exclude(hidden=True),
+            programs=Program.objects.exclude(status=ProgramStatus.Deleted),
+        )
+    elif document_type == SerializedDocument.COURSE_RUN:
+        return CourseRunWithProgramsSerializer.prefetch_queryset(
+            queryset=CourseRun.objects.filter(course__partner=partner)
+        )
+
+    return ProgramSerializer.prefetch_queryset(partner=partner)
+
+
+def get_document_request(partner):
+    """
+    Return the request documents are rendered with. It has no user, so marketing URLs get the UTM placeholder.
+    """
+    request = RequestFactory().get('/', HTTP_HOST=partner.site.domain, secure=True)
+    request.site = partner.site
+    request.user = None
+    return request
+
+
+def get_document_generation():
+    """
+    Return the current document generation, which changes whenever documents are deleted because of a change.
+    """
+    return cache.get(DOCUMENT_GENERATION_KEY)
+
+
+def _set_document_generation():
+    cache.set(DOCUMENT_GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+def _build_documents(document_type, partner, uuids=None, keys=None, chunk_size=DOCUMENT_BUILD_CHUNK_SIZE):
+    """
+    Render and store documents a chunk at a time. See build_documents.
+
+    Yields:
+        tuple: The (unsaved) documents rendered from a chunk of objects, and whether they were stored.
+    """
+    queryset = get_document_queryset(document_type, partner)
+    if uuids is not None:
+        queryset = queryset.filter(uuid__in=uuids)
+    if keys is not None:
+        queryset = queryset.filter(key__in=keys)
+
+    serializer_class = DOCUMENT_SERIALIZERS[document_type]
+    context = {'request': get_document_request(partner)}
+    renderer = JSONRenderer()
+
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(pks), chunk_size):
+        generation = get_document_generation()
+        objects = list(queryset.filter(pk__in=pks[start:start + chunk_size]))
+        data = serializer_class(objects, many=True, context=context).data
+        documents = [
+            SerializedDocument(
+                partner=partner,
+                document_type=document_type,
+                uuid=obj.uuid,
+                key=getattr(obj, 'key', None),
+                serializer_version=DOCUMENT_SERIALIZER_VERSION,
+                document=renderer.render(item).decode('utf-8'),
+            )
+            for obj, item in zip(objects, data)
+        ]
+
+        with transaction.atomic():
+            # Documents deleted by a change made while these were rendered may have been rendered from the data
+            # before the change. Storing these would undo the deletion.
+            stored = get_document_generation() == generation
+            if stored:
+                SerializedDocument.objects.filter(
+                    document_type=document_type,
+                    uuid__in=[document.uuid for document in documents],
+                    serializer_version=DOCUMENT_SERIALIZER_VERSION,
+                ).delete()
+                # Another request may have built the same documents in the meantime. Theirs are just as fresh.
+                SerializedDocument.objects.bulk_create(documents, ignore_conflicts=True)
+            else:
+                logger.info('Discarded %d %s documents, which changed while they were rendered.',
+                            len(documents), document_type)
+
+        yield documents, stored
+
+
+def build_documents(document_type, partner, uuids=None, keys=None, chunk_size=DOCUMENT_BUILD_CHUNK_SIZE):
+    """
+    Render and store documents of the given type for a partner.
+
+    Documents which change while they are rendered aren't stored. They're built the next time they're requested.
+
+    Arguments:
+        document_type (str): One of the SerializedDocument document types.
+        partner (Partner): Partner whose objects are rendered.
+
+    Keyword Arguments:
+        uuids (list): If given, only build documents for objects with these UUIDs.
+        keys (list): If given, only build documents for objects with these keys.
+        chunk_size (int): Number of objects prefetched and rendered at a time.
+
+    Returns:
+        int: The number of documents stored.
+    """
+    return sum(
+        len(documents)
+        for documents, stored in _build_documents(document_type, partner, uuids, keys, chunk_size)
+        if stored
+    )
+
+
+def _get_lookup_kwargs(document_type, lookup):
+    """
+    Return the filter kwargs for looking up an object of the given type by UUID or key.
+
+    Returns None if the value isn't valid for any of the document type's lookup fields.
+    """
+    try:
+        return {'uuid': uuid.UUID(str(lookup))}
+    except ValueError:
+        if 'key' in DOCUMENT_LOOKUP_FIELDS[document_type]:
+            return {'key': lookup}
+
+    return None
+
+
+def get_document(document_type, partner, lookup, build=True):
+    """
+    Return the SerializedDocument for the object with the given UUID or key, or None if there is no such object.
+
+    Missing documents are built on demand, unless build is False.
+    """
+    lookup_kwargs = _get_lookup_kwargs(document_type, lookup)
+    if lookup_kwargs is None:
+        return None
+
+    documents = SerializedDocument.objects.filter(
+        partner=partner,
+        document_type=document_type,
+        serializer_version=DOCUMENT_SERIALIZER_VERSION,
+    )
+
+    document = documents.filter(**lookup_kwargs).first()
+    if document is None and build:
+        build_kwargs = {'uuids' if 'uuid' in lookup_kwargs else 'keys': list(lookup_kwargs.values())}
+        for built, stored in _build_documents(document_type, partner, **build_kwargs):
+            # A document which changed while it was rendered isn't stored, but it's served all the same.
+            # It's as fresh as the response would have been without documents.
+            document = documents.filter(**lookup_kwargs).first() if stored else built[0]
+
+    return document
+
+
+def render_document(document, request, exclude_utm=False, extra_fields=None):
+    """
+    Complete a stored document for the given request.
+
+    Arguments:
+        document (SerializedDocument): The stored document.
+        request (Request): The request being served.
+
+    Keyword Arguments:
+        exclude_utm (bool): Whether to exclude UTM parameters from marketing URLs.
+        extra_fields (dict): Request-specific fields to add to the top-level object.
+
+    Returns:
+        str: JSON
+    """
+    content = document.document
+
+    if UTM_PARAMS_PLACEHOLDER in content:
+        if exclude_utm:
+            content = content.replace('?' + UTM_PARAMS_PLACEHOLDER, '')
+        else:
+            # URL encoded values don't need any further escaping to be embedded in a JSON string.
+            params = urlencode({
+                'utm_source': get_utm_source_for_user(document.partner, request.user),
+                'utm_medium': request.user.referral_tracking_id,
+            })
+            content = content.replace(UTM_PARAMS_PLACEHOLDER, params)
+
+    if extra_fields:
+        # Splice the extra fields into the top-level object, rather than parsing and re-encoding the document.
+        extra_content = JSONRenderer().render(extra_fields).decode('utf-8')
+        content = '{},{}'.format(extra_content[:-1], content[1:])
+
+    return content
+
+
+def _get_course_documents(course):
+    return {
+        SerializedDocument.COURSE: {course.uuid},
+        SerializedDocument.COURSE_RUN: set(CourseRun.everything.filter(course=course).values_list('uuid', flat=True)),
+        SerializedDocument.PROGRAM: set(Program.objects.filter(courses=course).values_list('uuid', flat=True)),
+    }
+
+
+def get_affected_documents(instance):
+    """
+    Return the documents that may include the given instance, as a dict of document type to UUIDs.
+
+    Returns None if the instance's dependents aren't tracked, in which case every document of its
+    partner (or of every partner, if the partner can't be determined) should be considered affected.
+    """
+    if getattr(instance, 'draft', False):
+        # Documents only include official versions.
+        return {}
+
+    if isinstance(instance, Seat):
+        instance = instance.course_run
+    elif isinstance(instance, CourseEntitlement):
+        instance = instance.course
+
+    if isinstance(instance, CourseRun):
+        affected = _get_course_documents(instance.course)
+        affected[SerializedDocument.COURSE_RUN].add(instance.uuid)
+        return affected
+    elif isinstance(instance, Course):
+        return _get_course_documents(instance)
+    elif isinstance(instance, Program):
+        courses = Course.everything.filter(programs=instance)
+        return {
+            SerializedDocument.COURSE: set(courses.values_list('uuid', flat=True)),
+            SerializedDocument.COURSE_RUN: set(
+                CourseRun.everything.filter(course__in=courses).values_list('uuid', flat=True)
+            ),
+            SerializedDocument.PROGRAM: {instance.uuid},
+        }
+
+    return None
+
+
+def delete_documents(affected=None, partner_id=None):
+    """
+    Delete documents so that they're rebuilt the next time they're requested.
+
+    Arguments:
+        affected (dict): Document type to UUIDs, as returned by get_affected_documents. If None,
+            every document (of the given partner) is deleted.
+        partner_id (int): Restricts the deletion of all documents to a single partner.
+    """
+    _delete_documents(affected, partner_id)
+
+    if transaction.get_connection().in_atomic_block:
+        # Until the change is committed, other requests may store documents rendered from the data before it.
+        transaction.on_commit(lambda: _delete_documents(affected, partner_id))
+    # Documents being rendered from the data before the change are discarded, rather than stored.
+    transaction.on_commit(_set_document_generation)
+
+
+def _delete_documents(affected, partner_id):
+    if affected is None:
+        documents = SerializedDocument.objects.all()
+        if partner_id is not None:
+            documents = documents.filter(partner_id=partner_id)
+        documents.delete()
+        return
+
+    for document_type, uuids in affected.items():
+        if uuids:
+            SerializedDocument.objects.filter(document_type=document_type, uuid__in=uuids).delete()
+
+
+# pylint: disable=unused-argument
+def serialized_document_change_receiver(sender, instance=None, action=None, **kwargs):
+    """
+    Receiver function for handling post_save, post_delete, and m2m_changed signals emitted by
+    course_metadata models.
+    """
+    if action is not None and not action.startswith('post_'):
+        return
+
+    try:
+        affected = get_affected_documents(instance)
+    except Exception:  # pylint: disable=broad-except
+        # e.g. the instance's parent was deleted in the same cascade. Err on the side of freshness.
+        logger.exception('Failed to determine the serialized documents affected by a change to [%s].', instance)
+        affected = None
+
+    partner_id = None
+    if affected is None and instance is not None:
+        dependency = API_CACHE_DEPENDENCIES.get(instance._meta.label_lower)  # pylint: disable=protected-access
+        partner_id = _resolve_partner_id(instance, dependency.partner_path if dependency else None)
+
+    delete_documents(affected, partner_id)
+
+
+def get_serialized_document_signal_senders():
+    """
+    Return the (signal, sender) pairs serialized_document_change_receiver is connected to.
+    """
+    # History records are written alongside every change to the models they record, so they're ignored.
+    senders = [
+        (signal, model)
+        for model in apps.get_app_config('course_metadata').get_models()
+        if not is_history_model(model)
+        for signal in (post_save, post_delete)
+    ]
+
+    # Changes to these models' many-to-many relations (e.g. a program's courses) also affect documents.
+    for model in (Course, CourseRun, Program):
+        senders += [(m2m_changed, field.remote_field.through) for field in model._meta.many_to_many]
+
+    return senders
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.12 on 2026-10-16 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0018_auto_20200414_0739'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerializedDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('document_type', models.CharField(choices=[('course', 'Course'), ('course_run', 'Course Run'), ('program', 'Program')], max_length=32)),
+                ('uuid', models.UUIDField(verbose_name='UUID')),
+                ('key', models.CharField(blank=True, max_length=255, null=True)),
+                ('serializer_version', models.CharField(max_length=32)),
+                ('document', models.TextField()),
+                ('partner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Partner')),
+            ],
+            options={
+                'unique_together': {('document_type', 'uuid', 'serializer_version')},
+                'index_together': {('document_type', 'key', 'serializer_version')},
+            },
+        ),
+    ]
@@ -3,9 +3,20 @@ Mixins for the API application.
 """
 # pylint: disable=not-callable
 
+import uuid
+
+import waffle
+from django.http import Http404
+from django.utils.translation import ugettext as _
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from course_discovery.apps.api.documents import get_document, render_document
+from course_discovery.apps.api.utils import get_query_param
+
 
 class DetailMixin:
     """Mixin for adding in a detail endpoint using a special detail serializer."""
@@ -54,3 +65,158 @@ class DetailMixin:
             % self.__class__.__name__
         )
         return self.detail_serializer_class
+
+
+class BulkRetrieveMixin:
+    """
+    Mixin for adding a bulk endpoint, which retrieves many objects by key or UUID in a single request.
+
+    The objects are fetched with one query on the view's (prefetched) queryset, and serialized with the
+    detail serializer. Results are returned in the order they were requested. Objects that don't exist are
+    represented by a marker, e.g. ``{"key": "course-v1:Unknown+Course", "detail": "Not found."}``.
+    """
+
+    bulk_lookup_fields = ('key', 'uuid')
+    bulk_max_items = 500
+
+    @action(detail=False, methods=['get', 'post'])
+    def bulk(self, request):
+        """
+        Retrieve details for many objects at once.
+
+        Objects are requested by either keys or UUIDs: as a comma-separated query parameter,
+        or for long lists, as a JSON list in the body of a POST, e.g. {"keys": ["...", "..."]}.
+        ---
+        parameters:
+            - name: keys
+              description: Comma-separated list of keys
+              required: false
+              type: string
+              paramType: query
+              multiple: false
+            - name: uuids
+              description: Comma-separated list of UUIDs
+              required: false
+              type: string
+              paramType: query
+              multiple: false
+        """
+        field, requested, values = self.get_bulk_lookups(request)
+
+        objects = list(self.get_queryset().filter(**{field + '__in': [value for value in values if value]}))
+        serialized = dict(zip(
+            (str(getattr(obj, field)) for obj in objects),
+            self.get_serializer(objects, many=True).data,
+        ))
+
+        results = [
+            serialized.get(value) or {field: requested_value, 'detail': _('Not found.')}
+            for requested_value, value in zip(requested, values)
+        ]
+        return Response(results)
+
+    def get_bulk_lookups(self, request):
+        """
+        Return the field objects are looked up by, the values requested, and the same values normalized
+        for comparison with the objects' fields. Invalid values are normalized to None, and reported as not found.
+        """
+        data = request.data if request.method == 'POST' else request.query_params
+        lookups = {
+            field: data.get(field + 's') for field in self.bulk_lookup_fields if data.get(field + 's')
+        }
+
+        if len(lookups) != 1:
+            raise ValidationError(_('Exactly one of {params} is required.').format(
+                params=', '.join(field + 's' for field in self.bulk_lookup_fields)
+            ))
+
+        field, requested = lookups.popitem()
+        if isinstance(requested, str):
+            requested = [value.strip() for value in requested.split(',') if value.strip()]
+        elif not isinstance(requested, list):
+            raise ValidationError(_('{param} must be a list.').format(param=field + 's'))
+
+        if len(requested) > self.bulk_max_items:
+            raise ValidationError(_('At most {count} objects may be requested at once.').format(
+                count=self.bulk_max_items
+            ))
+
+        if field == 'uuid':
+            values = [self._normalize_uuid(value) for value in requested]
+        else:
+            values = [str(value) for value in requested]
+
+        return field, requested, values
+
+    @staticmethod
+    def _normalize_uuid(value):
+        try:
+            return str(uuid.UUID(str(value)))
+        except ValueError:
+            return None
+
+
+class SerializedDocumentResponse(Response):
+    """A Response whose content was rendered ahead of time, and is sent as-is."""
+
+    def __init__(self, content, **kwargs):
+        super().__init__(**kwargs)
+        self.document_content = content
+
+    @property
+    def rendered_content(self):
+        self['Content-Type'] = JSONRenderer.media_type
+        return self.document_content.encode('utf-8')
+
+
+class SerializedDocumentMixin:
+    """
+    Mixin for serving detail responses from stored serialized documents (see course_discovery.apps.api.documents).
+
+    Documents are only served when the serve_serialized_documents switch is active, the response is rendered
+    as JSON, and the request has no query parameters other than ``document_query_params``. Other requests
+    fall back to the regular serializer.
+    """
+
+    document_type = None
+    document_query_params = ('exclude_utm', 'format')
+
+    def get_document_response(self, request):
+        """
+        Return a response for the requested object built from its serialized document, or None
+        if the request can't be served from a document.
+        """
+        if not waffle.switch_is_active('serve_serialized_documents'):
+            return None
+
+        if request.method not in SAFE_METHODS or set(request.query_params) - set(self.document_query_params):
+            return None
+
+        if not isinstance(getattr(request, 'accepted_renderer', None), JSONRenderer):
+            return None
+
+        partner = request.site.partner
+        document = get_document(self.document_type, partner, self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        if document is None:
+            raise Http404
+
+        content = render_document(
+            document,
+            request,
+            exclude_utm=get_query_param(request, 'exclude_utm'),
+            extra_fields=self.get_document_extra_fields(request, document),
+        )
+        return SerializedDocumentResponse(content)
+
+    def get_document_extra_fields(self, request, document):  # pylint: disable=unused-argument
+        """
+        Return a dict of request-specific fields to add to the document.
+        """
+        return None
+
+    def retrieve(self, request, *args, **kwargs):
+        response = self.get_document_response(request)
+        if response is not None:
+            return response
+
+        return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,40 @@
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+from django_extensions.db.models import TimeStampedModel
+
+from course_discovery.apps.core.models import Partner
+
+
+class SerializedDocument(TimeStampedModel):
+    """
+    Canonical JSON rendering of a course, course run, or program, as returned by its detail endpoint.
+
+    Documents are rendered without any request-specific data. See course_discovery.apps.api.documents
+    for how they are built, invalidated, and completed for a given request.
+    """
+    COURSE = 'course'
+    COURSE_RUN = 'course_run'
+    PROGRAM = 'program'
+    DOCUMENT_TYPE_CHOICES = (
+        (COURSE, _('Course')),
+        (COURSE_RUN, _('Course Run')),
+        (PROGRAM, _('Program')),
+    )
+
+    partner = models.ForeignKey(Partner, models.CASCADE)
+    document_type = models.CharField(max_length=32, choices=DOCUMENT_TYPE_CHOICES)
+    uuid = models.UUIDField(verbose_name=_('UUID'))
+    key = models.CharField(max_length=255, null=True, blank=True)
+    serializer_version = models.CharField(max_length=32)
+    document = models.TextField()
+
+    class Meta:
+        unique_together = (
+            ('document_type', 'uuid', 'serializer_version'),
+        )
+        index_together = (
+            ('document_type', 'key', 'serializer_version'),
+        )
+
+    def __str__(self):
+        return '{document_type}: {uuid}'.format(document_type=self.document_type, uuid=self.uuid)
@@ -1,3 +1,4 @@
+from rest_framework.pagination import CursorPagination as BaseCursorPagination
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.pagination import PageNumberPagination as BasePageNumberPagination
 
@@ -6,6 +7,21 @@ class PageNumberPagination(BasePageNumberPagination):
     page_size_query_param = 'page_size'
 
 
+class CursorPagination(BaseCursorPagination):
+    """
+    Keyset pagination over the primary key.
+
+    Each page is fetched with `WHERE id > <last id of the previous page>` instead of an OFFSET, and no
+    COUNT query is made, so deep pages cost the same as the first one. The ordering requested through
+    the `ordering` query parameter is ignored, since results must be ordered by the cursor's key.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    def get_ordering(self, request, queryset, view):
+        return (self.ordering,)
+
+
 class ProxiedCall:
     """
     Utility class used in conjunction with ProxiedPagination to route method
@@ -41,8 +57,12 @@ class ProxiedCall:
             is_request_stored = hasattr(paginator, 'request')
 
             # If a request is available, look for the presence of a query parameter
-            # indicating that we should use this paginator.
-            is_query_param_present = request and request.query_params.get(query_param)
+            # indicating that we should use this paginator. The first page of a cursor
+            # paginated listing is requested with an empty cursor.
+            is_query_param_present = request and (
+                request.query_params.get(query_param) or
+                (isinstance(paginator, CursorPagination) and query_param in request.query_params)
+            )
 
             if is_request_stored or is_query_param_present:
                 return paginator
@@ -64,16 +84,22 @@ class ProxiedPagination:
         http://api.example.org/accounts/?page=4&page_size=100
         http://api.example.org/accounts/?limit=100
         http://api.example.org/accounts/?offset=400&limit=100
+        http://api.example.org/accounts/?cursor=
+        http://api.example.org/accounts/?cursor=cD0xMjM0&page_size=100
 
     If no query parameters are passed, proxies to LimitOffsetPagination by default.
+    Clients walking every page of a large listing should use CursorPagination, which
+    is requested with an empty `cursor` query parameter and then follows the `next` links.
     """
 
     def __init__(self):
         page_number_paginator = PageNumberPagination()
+        cursor_paginator = CursorPagination()
         limit_offset_paginator = LimitOffsetPagination()
 
         self.paginators = [
             (page_number_paginator, page_number_paginator.page_query_param),
+            (cursor_paginator, cursor_paginator.cursor_query_param),
             (limit_offset_paginator, limit_offset_paginator.limit_query_param),
         ]
 
@@ -12,6 +12,8 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import FieldDoesNotExist
 from django.db.models.query import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.text import slugify
 from django.utils.translation import ugettext_lazy as _
 from drf_dynamic_fields import DynamicFieldsMixin
@@ -116,13 +118,18 @@ def get_default_field_kwargs(model, field):
     return kwargs
 
 
+# Serialized documents (see course_discovery.apps.api.documents) are rendered without a user. Their marketing
+# URLs carry this placeholder in place of the UTM query parameters, which are filled in for each request.
+UTM_PARAMS_PLACEHOLDER = 'utm_params_placeholder'
+
+
 def get_marketing_url_for_user(partner, user, marketing_url, exclude_utm=False, draft=False, official_version=None):
     """
     Return the given marketing URL with affiliate query parameters for the user.
 
     Arguments:
         partner (Partner): Partner instance containing information.
-        user (User): Used to construct UTM query parameters.
+        user (User): Used to construct UTM query parameters. If None, UTM_PARAMS_PLACEHOLDER is used instead.
         marketing_url (str | None): Base URL to which UTM parameters may be appended.
 
     Keyword Arguments:
@@ -136,6 +143,8 @@ def get_marketing_url_for_user(partner, user, marketing_url, exclude_utm=False,
         return None
     elif exclude_utm:
         return marketing_url
+    elif user is None:
+        return '{url}?{params}'.format(url=marketing_url, params=UTM_PARAMS_PLACEHOLDER)
     else:
         params = urlencode({
             'utm_source': get_utm_source_for_user(partner, user),
@@ -1172,6 +1181,17 @@ class CourseWithProgramsSerializer(CourseSerializer):
         )
 
 
+class CourseDocumentSerializer(CourseWithProgramsSerializer):
+    """
+    A ``CourseWithProgramsSerializer`` for serialized documents, which can't contain user-specific fields.
+    ``editable`` is added to the document when it is served.
+    """
+    editable = None
+
+    class Meta(CourseWithProgramsSerializer.Meta):
+        fields = tuple(field for field in CourseWithProgramsSerializer.Meta.fields if field != 'editable')
+
+
 class CatalogCourseSerializer(CourseSerializer):
     """
     A CourseSerializer which only includes course runs that can be enrolled in
@@ -1940,7 +1960,41 @@ class BaseHaystackFacetSerializer(HaystackFacetSerializer):
         return query_data
 
 
-class CourseSearchSerializer(HaystackSerializer):
+class StoredFieldsSearchSerializerMixin:
+    """
+    Mixin for search serializers which can build results from the fields stored in the search index alone.
+
+    The view opts in with the ``stored_fields_only`` serializer context, in which case the indexed objects
+    aren't loaded from the database (see BaseHaystackViewSet).
+    """
+
+    @property
+    def stored_fields_only(self):
+        return self.context.get('stored_fields_only', False)
+
+    @staticmethod
+    def get_stored_course_run(start=None, end=None, enrollment_start=None, enrollment_end=None):
+        """
+        Return an unsaved course run with the given stored dates. Fields which depend on the current time
+        (e.g. availability) are computed from it, rather than read from the index, so they don't go stale.
+        """
+        dates = {
+            'start': start,
+            'end': end,
+            'enrollment_start': enrollment_start,
+            'enrollment_end': enrollment_end,
+        }
+        for name, value in dates.items():
+            if isinstance(value, str):
+                value = parse_datetime(value)
+            # Haystack reads dates back from the index without their (UTC) time zone.
+            if value and timezone.is_naive(value):
+                value = timezone.make_aware(value, pytz.UTC)
+            dates[name] = value
+        return CourseRun(**dates)
+
+
+class CourseSearchSerializer(StoredFieldsSearchSerializerMixin, HaystackSerializer):
     course_runs = serializers.SerializerMethodField()
     seat_types = serializers.SerializerMethodField()
 
@@ -1988,12 +2042,40 @@ class CourseSearchSerializer(HaystackSerializer):
             )
         return course_run_detail
 
+    def stored_course_run_detail(self, detail_fields, course_run_detail):
+        course_run = self.get_stored_course_run(
+            start=course_run_detail['start'],
+            end=course_run_detail['end'],
+            enrollment_start=course_run_detail['enrollment_start'],
+            enrollment_end=course_run_detail['enrollment_end'],
+        )
+        course_run_detail.update({
+            'availability': course_run.availability,
+            'is_enrollable': course_run.is_enrollable,
+        })
+        if not detail_fields:
+            course_run_detail.pop('staff')
+            course_run_detail.pop('content_language')
+        return course_run_detail
+
     def get_course_runs(self, result):
         request = self.context['request']
-        course_runs = result.object.course_runs.all()
         now = datetime.datetime.now(pytz.UTC)
         exclude_expired = request.GET.get("exclude_expired_course_run")
         detail_fields = request.GET.get("detail_fields")
+
+        if self.stored_fields_only:
+            course_run_details = [
+                self.stored_course_run_detail(detail_fields, course_run_detail)
+                for course_run_detail in json.loads(result.course_runs_body)
+            ]
+            return [
+                course_run_detail for course_run_detail in course_run_details
+                if (not exclude_expired or course_run_detail['end'] is None or
+                    parse_datetime(course_run_detail['end']) > now)
+            ]
+
+        course_runs = result.object.course_runs.all()
         return [
             self.course_run_detail(request, detail_fields, course_run)
 
@@ -2005,9 +2087,16 @@ class CourseSearchSerializer(HaystackSerializer):
             if (not exclude_expired or course_run.end is None or course_run.end > now)
         ]
 
+    @staticmethod
+    def course_seat_types(course):
+        seat_types = {seat.slug for course_run in course.course_runs.all() for seat in course_run.seat_types}
+        return sorted(seat_types)
+
     def get_seat_types(self, result):
-        seat_types = [seat.slug for course_run in result.object.course_runs.all() for seat in course_run.seat_types]
-        return list(set(seat_types))
+        if self.stored_fields_only:
+            return result.course_run_seat_types or []
+
+        return self.course_seat_types(result.object)
 
     class Meta:
         field_aliases = COMMON_SEARCH_FIELD_ALIASES
@@ -2044,23 +2133,37 @@ class CourseFacetSerializer(BaseHaystackFacetSerializer):
         }
 
 
-class CourseRunSearchSerializer(HaystackSerializer):
+class CourseRunSearchSerializer(StoredFieldsSearchSerializerMixin, HaystackSerializer):
     availability = serializers.SerializerMethodField()
     first_enrollable_paid_seat_price = serializers.SerializerMethodField()
     type = serializers.SerializerMethodField()
     is_enrollable = serializers.SerializerMethodField()
 
+    def get_course_run(self, result):
+        if self.stored_fields_only:
+            return self.get_stored_course_run(
+                start=result.start,
+                end=result.end,
+                enrollment_start=result.enrollment_start,
+                enrollment_end=result.enrollment_end,
+            )
+        return result.object
+
     def get_availability(self, result):
-        return result.object.availability
+        return self.get_course_run(result).availability
 
     def get_first_enrollable_paid_seat_price(self, result):
+        if self.stored_fields_only:
+            return result.first_enrollable_paid_seat_price
         return result.object.first_enrollable_paid_seat_price
 
     def get_type(self, result):
+        if self.stored_fields_only:
+            return result.type
         return result.object.type_legacy
 
     def get_is_enrollable(self, result):
-        return result.object.is_enrollable
+        return self.get_course_run(result).is_enrollable
 
     class Meta:
         field_aliases = COMMON_SEARCH_FIELD_ALIASES
@@ -2131,10 +2234,12 @@ class CourseRunFacetSerializer(BaseHaystackFacetSerializer):
         }
 
 
-class PersonSearchSerializer(HaystackSerializer):
+class PersonSearchSerializer(StoredFieldsSearchSerializerMixin, HaystackSerializer):
     profile_image_url = serializers.SerializerMethodField()
 
     def get_profile_image_url(self, result):
+        if self.stored_fields_only:
+            return result.get_profile_image_url
         return result.object.get_profile_image_url
 
     @staticmethod
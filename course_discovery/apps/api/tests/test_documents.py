@@ -0,0 +1,157 @@
+import json
+
+import mock
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from course_discovery.apps.api.documents import (
+    DOCUMENT_SERIALIZER_VERSION, build_documents, get_affected_documents, get_document, get_document_request,
+    render_document
+)
+from course_discovery.apps.api.models import SerializedDocument
+from course_discovery.apps.api.serializers import (
+    UTM_PARAMS_PLACEHOLDER, CourseRunWithProgramsSerializer, CourseWithProgramsSerializer
+)
+from course_discovery.apps.api.tests.mixins import SiteMixin
+from course_discovery.apps.core.tests.factories import UserFactory
+from course_discovery.apps.course_metadata.tests.factories import (
+    CourseFactory, CourseRunFactory, ProgramFactory, SeatFactory
+)
+
+
+class SerializedDocumentTests(SiteMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = CourseFactory(partner=self.partner)
+        self.course_run = CourseRunFactory(course=self.course)
+        self.program = ProgramFactory(courses=[self.course], partner=self.partner)
+
+        self.user = UserFactory()
+        self.request = get_document_request(self.partner)
+        self.request.user = self.user
+
+    def get_documents(self, document_type=None):
+        documents = SerializedDocument.objects.filter(serializer_version=DOCUMENT_SERIALIZER_VERSION)
+        if document_type:
+            documents = documents.filter(document_type=document_type)
+        return documents
+
+    def test_build_documents(self):
+        assert build_documents(SerializedDocument.COURSE, self.partner) == 1
+        assert build_documents(SerializedDocument.COURSE_RUN, self.partner) == 1
+        assert build_documents(SerializedDocument.PROGRAM, self.partner) == 1
+
+        document = self.get_documents(SerializedDocument.COURSE_RUN).get()
+        assert document.uuid == self.course_run.uuid
+        assert document.key == self.course_run.key
+        assert document.partner == self.partner
+
+        # Rebuilding replaces the existing documents.
+        build_documents(SerializedDocument.COURSE_RUN, self.partner)
+        assert self.get_documents(SerializedDocument.COURSE_RUN).count() == 1
+
+    def test_build_documents_concurrently(self):
+        """ Verify documents built by another request in the meantime don't make the build fail. """
+        build_documents(SerializedDocument.COURSE, self.partner)
+
+        # The other request's document isn't visible to this one until it commits.
+        with mock.patch('django.db.models.query.QuerySet.delete'):
+            assert build_documents(SerializedDocument.COURSE, self.partner) == 1
+
+        assert self.get_documents(SerializedDocument.COURSE).count() == 1
+
+    @mock.patch('course_discovery.apps.api.documents.get_document_generation', side_effect=['before', 'after'])
+    def test_build_documents_discards_changed(self, __):
+        """ Verify documents aren't stored if documents were deleted because of a change while they were rendered. """
+        assert build_documents(SerializedDocument.COURSE, self.partner) == 0
+        assert not self.get_documents().exists()
+
+    @mock.patch('course_discovery.apps.api.documents.get_document_generation', side_effect=['before', 'after'])
+    def test_get_document_serves_changed(self, __):
+        """ Verify a document which changed while it was built is served, though it isn't stored. """
+        document = get_document(SerializedDocument.COURSE, self.partner, self.course.key)
+        assert document.pk is None
+        assert document.uuid == self.course.uuid
+        assert not self.get_documents().exists()
+
+    def test_invalidation_ignores_history(self):
+        """ Verify the history records written with a change don't delete every partner's documents. """
+        other_program = ProgramFactory()
+        build_documents(SerializedDocument.PROGRAM, other_program.partner)
+
+        self.course.title = 'Changed'
+        self.course.save()
+
+        assert self.course.history.exists()
+        assert self.get_documents().filter(uuid=other_program.uuid).exists()
+
+    def test_get_document(self):
+        """ Verify documents are looked up by UUID or key, and built if they don't exist. """
+        assert get_document(SerializedDocument.COURSE, self.partner, self.course.key, build=False) is None
+
+        document = get_document(SerializedDocument.COURSE, self.partner, self.course.key)
+        assert document.uuid == self.course.uuid
+        assert get_document(SerializedDocument.COURSE, self.partner, str(self.course.uuid)) == document
+
+        assert get_document(SerializedDocument.COURSE, self.partner, 'course-v1:Unknown+Course') is None
+
+    def test_get_document_invalid_lookup(self):
+        """ Verify lookups that aren't valid for the document type find nothing, rather than failing. """
+        assert get_document(SerializedDocument.PROGRAM, self.partner, str(self.program.uuid)) is not None
+        assert get_document(SerializedDocument.PROGRAM, self.partner, 'abcdef') is None
+        assert not self.get_documents(SerializedDocument.PROGRAM).exclude(uuid=self.program.uuid).exists()
+
+    def test_render_document(self):
+        """ Verify rendered documents match the output of the regular serializer. """
+        document = get_document(SerializedDocument.COURSE, self.partner, self.course.key)
+        assert UTM_PARAMS_PLACEHOLDER in document.document
+
+        content = render_document(document, self.request, extra_fields={'editable': False})
+        expected = CourseWithProgramsSerializer(self.course, context={'request': self.request}).data
+        assert json.loads(content) == json.loads(JSONRenderer().render(expected).decode('utf-8'))
+
+    def test_render_document_exclude_utm(self):
+        document = get_document(SerializedDocument.COURSE_RUN, self.partner, self.course_run.key)
+
+        content = render_document(document, self.request, exclude_utm=True)
+        expected = CourseRunWithProgramsSerializer(
+            self.course_run, context={'request': self.request, 'exclude_utm': 1}
+        ).data
+        assert json.loads(content)['marketing_url'] == expected['marketing_url']
+        assert UTM_PARAMS_PLACEHOLDER not in content
+
+    def test_get_affected_documents(self):
+        seat = SeatFactory(course_run=self.course_run)
+        expected = {
+            SerializedDocument.COURSE: {self.course.uuid},
+            SerializedDocument.COURSE_RUN: {self.course_run.uuid},
+            SerializedDocument.PROGRAM: {self.program.uuid},
+        }
+
+        for instance in (seat, self.course_run, self.course, self.program):
+            assert get_affected_documents(instance) == expected
+
+        self.course_run.draft = True
+        assert get_affected_documents(self.course_run) == {}
+
+    def test_invalidation(self):
+        """ Verify documents are deleted when something they include changes. """
+        other_course = CourseFactory(partner=self.partner)
+        for document_type in (SerializedDocument.COURSE, SerializedDocument.COURSE_RUN, SerializedDocument.PROGRAM):
+            build_documents(document_type, self.partner)
+
+        self.course_run.title_override = 'Changed'
+        self.course_run.save()
+
+        assert not self.get_documents().exclude(uuid=other_course.uuid).exists()
+        assert self.get_documents().filter(uuid=other_course.uuid).exists()
+
+    def test_m2m_invalidation(self):
+        other_course = CourseFactory(partner=self.partner)
+        build_documents(SerializedDocument.COURSE, self.partner)
+        build_documents(SerializedDocument.PROGRAM, self.partner)
+
+        self.program.courses.add(other_course)
+
+        assert not self.get_documents(SerializedDocument.PROGRAM).exists()
+        assert not self.get_documents(SerializedDocument.COURSE).filter(uuid=self.course.uuid).exists()
@@ -1,9 +1,13 @@
+from urllib.parse import parse_qs, urlparse
+
 from django.test import TestCase
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.request import Request
 from rest_framework.test import APIRequestFactory
 
-from course_discovery.apps.api.pagination import PageNumberPagination, ProxiedPagination
+from course_discovery.apps.api.pagination import CursorPagination, PageNumberPagination, ProxiedPagination
+from course_discovery.apps.core.models import User
+from course_discovery.apps.core.tests.factories import UserFactory
 
 
 class ProxiedPaginationTests(TestCase):
@@ -64,6 +68,28 @@ class ProxiedPaginationTests(TestCase):
         request = self.get_request(limit=2)
         self.assert_proxied(self.limit_offset_paginator, request)
 
+    def test_cursor_pagination(self):
+        """
+        Verify that ProxiedPagination proxies to CursorPagination when a `cursor`
+        query parameter is present, even if it's empty.
+        """
+        self.queryset = User.objects.all()
+        users = sorted(UserFactory.create_batch(5), key=lambda user: user.id)
+
+        request = self.get_request(cursor='', page_size=2)
+        with self.assertNumQueries(1):
+            page = self.paginate_queryset(self.proxied_paginator, request)
+        self.assertEqual(page, users[:2])
+
+        data = self.get_paginated_content(self.proxied_paginator, page)
+        self.assertNotIn('count', data)
+        self.assertEqual(data['results'], users[:2])
+
+        cursor = parse_qs(urlparse(data['next']).query)['cursor'][0]
+        request = self.get_request(cursor=cursor, page_size=2)
+        self.assert_proxied(CursorPagination(), request)
+        self.assertEqual(self.paginate_queryset(ProxiedPagination(), request), users[2:4])
+
     def test_noncallable_attribute_access(self):
         """
         Verify that attempts to access noncallable attributes are proxied to
@@ -0,0 +1,325 @@
+"""
+Query-count and latency benchmarks for the v1 API.
+
+A synthetic catalog is seeded at a given scale, and each endpoint is requested at several page sizes. The number
+of queries, wall time, and response size of each request are compared against a checked-in baseline, so that
+prefetching regressions (e.g. a serializer field that triggers a query per result) fail loudly.
+
+See test_benchmarks.py for how the benchmarks are run, and how the baseline is updated.
+"""
+import json
+import os
+import statistics
+import time
+from collections import namedtuple
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from haystack import connections as haystack_connections
+
+from course_discovery.apps.catalogs.tests.factories import CatalogFactory
+from course_discovery.apps.core.tests.factories import PartnerFactory
+from course_discovery.apps.course_metadata.models import Course, CourseRun, Person, Program
+from course_discovery.apps.course_metadata.tests.factories import (
+    CourseFactory, CourseRunFactory, OrganizationFactory, PathwayFactory, PersonFactory, ProgramFactory,
+    ProgramTypeFactory, SeatFactory, SubjectFactory, TopicFactory
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+
+CatalogScale = namedtuple('CatalogScale', ['partners', 'courses', 'runs', 'seats', 'programs'])
+
+# Each scale is benchmarked separately. Comparing counts across scales shows whether the number of
+# queries grows with the size of the catalog, rather than with the number of endpoints hit.
+SCALES = {
+    'small': CatalogScale(partners=1, courses=4, runs=2, seats=2, programs=2),
+    'medium': CatalogScale(partners=2, courses=20, runs=3, seats=3, programs=5),
+}
+
+PAGE_SIZES = (1, 20, 100)
+
+# Allowed growth relative to the baseline, before a measurement is considered a regression.
+# Query counts and response sizes are deterministic, but factories generate slightly different data on
+# every run. Wall time is only compared when explicitly requested, since it depends on the machine.
+QUERY_TOLERANCE = 0.1
+QUERY_SLACK = 2
+BYTES_TOLERANCE = 0.1
+TIME_TOLERANCE = 0.5
+
+Endpoint = namedtuple('Endpoint', ['url_name', 'lookup', 'params'])
+
+
+def _lookup(kwarg, attribute=None, name=None):
+    """
+    Return a function which builds URL kwargs for an endpoint from the seeded catalog.
+
+    The seeded object is the one recorded under the endpoint's name, unless another name is given.
+    """
+    def get_kwargs(catalog, url_name):
+        return {kwarg: getattr(catalog[name or url_name], attribute or kwarg)}
+    return get_kwargs
+
+
+def _bulk_params(param, attribute):
+    """
+    Return a function which builds the query parameters of a bulk endpoint, requesting every object recorded
+    under the endpoint's name in the seeded catalog.
+    """
+    def get_params(catalog, url_name):
+        return {param: ','.join(str(getattr(obj, attribute)) for obj in catalog[url_name])}
+    return get_params
+
+
+# List endpoints are requested at each of PAGE_SIZES. Detail endpoints name the seeded object they retrieve.
+# Params are either a dict, or a function which builds them from the seeded catalog, like lookups.
+# Not covered: comments (needs a Salesforce backend), the affiliate window feeds, catalog query_contains,
+# currency (needs exchange rate data), and endpoints which only accept writes (e.g. replace_usernames).
+LIST_ENDPOINTS = (
+    Endpoint('catalog-list', None, {}),
+    Endpoint('catalog-courses', _lookup('id', name='catalog-detail'), {}),
+    Endpoint('course-list', None, {}),
+    Endpoint('course_editor-list', None, {}),
+    Endpoint('course_run-list', None, {}),
+    Endpoint('level_type-list', None, {}),
+    Endpoint('organization-list', None, {}),
+    Endpoint('pathway-list', None, {}),
+    Endpoint('person-list', None, {}),
+    Endpoint('program-list', None, {}),
+    Endpoint('program_type-list', None, {}),
+    Endpoint('subject-list', None, {}),
+    Endpoint('topic-list', None, {}),
+    Endpoint('search-all-list', None, {}),
+    Endpoint('search-all-facets', None, {}),
+    Endpoint('search-courses-list', None, {}),
+    Endpoint('search-courses-facets', None, {}),
+    Endpoint('search-course_runs-list', None, {}),
+    Endpoint('search-course_runs-facets', None, {}),
+    Endpoint('search-limited-list', None, {}),
+    Endpoint('search-limited-facets', None, {}),
+    Endpoint('search-people-list', None, {}),
+    Endpoint('search-people-facets', None, {}),
+    Endpoint('search-programs-list', None, {}),
+    Endpoint('search-programs-facets', None, {}),
+)
+
+DETAIL_ENDPOINTS = (
+    Endpoint('catalog-detail', _lookup('id'), {}),
+    Endpoint('catalog-contains', _lookup('id', name='catalog-detail'), {'course_id': 'course-v1:Benchmark+Course'}),
+    Endpoint('catalog-csv', _lookup('id', name='catalog-detail'), {}),
+    Endpoint('course-detail', _lookup('key'), {}),
+    Endpoint('course_run-detail', _lookup('key'), {}),
+    Endpoint('organization-detail', _lookup('uuid'), {}),
+    Endpoint('pathway-detail', _lookup('pk', 'id'), {}),
+    Endpoint('person-detail', _lookup('uuid'), {}),
+    Endpoint('program-detail', _lookup('uuid'), {}),
+    Endpoint('course-bulk', None, _bulk_params('keys', 'key')),
+    Endpoint('course_run-bulk', None, _bulk_params('keys', 'key')),
+    Endpoint('program-bulk', None, _bulk_params('uuids', 'uuid')),
+    Endpoint('program_type-detail', _lookup('slug'), {}),
+    Endpoint('subject-detail', _lookup('uuid'), {}),
+    Endpoint('topic-detail', _lookup('uuid'), {}),
+    Endpoint('search-typeahead', None, {'q': 'test'}),
+    Endpoint('person-search-typeahead', None, {'q': 'test'}),
+)
+
+
+def seed_catalog(scale, partner):
+    """
+    Create a synthetic catalog of the given scale.
+
+    The given partner (whose site the benchmark requests are made against) gets a full catalog. Additional
+    partners get identical catalogs, so that endpoints which fail to filter by partner stand out.
+
+    Returns:
+        dict: A representative object of each type, used to build detail URLs, and the lists of objects
+        requested from the bulk endpoints.
+    """
+    partners = [partner] + PartnerFactory.create_batch(scale.partners - 1)
+    catalog = {}
+
+    for current_partner in reversed(partners):
+        organization = OrganizationFactory(partner=current_partner)
+        subject = SubjectFactory(partner=current_partner)
+        topic = TopicFactory(partner=current_partner)
+        person = PersonFactory(partner=current_partner)
+        program_type = ProgramTypeFactory()
+
+        courses = []
+        course_runs = []
+        for __ in range(scale.courses):
+            course = CourseFactory(partner=current_partner, authoring_organizations=[organization])
+            course.subjects.add(subject)
+            course.topics.add(topic)
+
+            for __ in range(scale.runs):
+                course_run = CourseRunFactory(course=course, staff=[person])
+                SeatFactory.create_batch(scale.seats, course_run=course_run)
+                course_runs.append(course_run)
+
+            courses.append(course)
+
+        programs = [
+            ProgramFactory(
+                partner=current_partner,
+                type=program_type,
+                courses=courses[index::scale.programs],
+                authoring_organizations=[organization],
+            )
+            for index in range(scale.programs)
+        ]
+        pathway = PathwayFactory(partner=current_partner)
+        pathway.programs.add(*programs)
+
+        catalog = {
+            'catalog-detail': CatalogFactory(),
+            'course-detail': courses[0],
+            'course_run-detail': courses[0].course_runs.first(),
+            'organization-detail': organization,
+            'pathway-detail': pathway,
+            'person-detail': person,
+            'program-detail': programs[0],
+            'program_type-detail': program_type,
+            'subject-detail': subject,
+            'topic-detail': topic,
+            'course-bulk': courses,
+            'course_run-bulk': course_runs,
+            'program-bulk': programs,
+        }
+
+    return catalog
+
+
+def index_catalog():
+    """ Index the seeded catalog, so that the search endpoints have something to return. """
+    unified_index = haystack_connections['default'].get_unified_index()
+    for model in (Course, CourseRun, Person, Program):
+        unified_index.get_index(model).update()
+
+
+def get_benchmark_urls(catalog):
+    """
+    Return the benchmarked URLs, keyed by the name they're recorded under in the baseline.
+    """
+    def get_path_and_params(endpoint):
+        kwargs = endpoint.lookup(catalog, endpoint.url_name) if endpoint.lookup else {}
+        params = endpoint.params(catalog, endpoint.url_name) if callable(endpoint.params) else endpoint.params
+        return reverse('api:v1:' + endpoint.url_name, kwargs=kwargs), params
+
+    urls = {}
+    for endpoint in LIST_ENDPOINTS:
+        path, params = get_path_and_params(endpoint)
+        for page_size in PAGE_SIZES:
+            name = '{}?page_size={}'.format(endpoint.url_name, page_size)
+            urls[name] = (path, dict(params, page=1, page_size=page_size))
+
+    for endpoint in DETAIL_ENDPOINTS:
+        urls[endpoint.url_name] = get_path_and_params(endpoint)
+
+    return urls
+
+
+def measure(client, path, params, repeat=3):
+    """
+    Request the given URL and record the cost of the request.
+
+    The query count and size come from the first request. Wall time is the median of all requests,
+    to smooth out the noise of a shared machine.
+
+    Returns:
+        dict: with status, queries, bytes, and time (in milliseconds).
+    """
+    durations = []
+    result = {}
+    for __ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(path, params)
+            durations.append((time.perf_counter() - start) * 1000)
+
+        if not result:
+            result = {
+                'status': response.status_code,
+                'queries': len(queries),
+                'bytes': len(response.content),
+            }
+
+    result['time'] = round(statistics.median(durations), 1)
+    return result
+
+
+def run_benchmarks(client, catalog, repeat=3):
+    return {
+        name: measure(client, path, params, repeat=repeat)
+        for name, (path, params) in sorted(get_benchmark_urls(catalog).items())
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(scale_name, results, path=BASELINE_PATH):
+    """ Replace the baseline of one scale with the given results, leaving the other scales untouched. """
+    baseline = load_baseline(path)
+    baseline[scale_name] = results
+
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def _exceeds(measured, expected, tolerance, slack=0):
+    return measured > max(expected * (1 + tolerance), expected + slack)
+
+
+def find_regressions(results, baseline, check_time=False):
+    """
+    Compare benchmark results against their baseline.
+
+    Endpoints missing from the baseline are reported as regressions too, since they'd otherwise go unchecked.
+    New endpoints are added to the baseline by recording it again (see `make benchmark_baseline`).
+
+    Returns:
+        list[str]: A description of each regression.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        expected = baseline.get(name)
+        if expected is None:
+            regressions.append('{}: not in the baseline'.format(name))
+            continue
+
+        if result['status'] != expected['status']:
+            regressions.append('{}: status {} != {}'.format(name, result['status'], expected['status']))
+
+        if _exceeds(result['queries'], expected['queries'], QUERY_TOLERANCE, QUERY_SLACK):
+            regressions.append('{}: {} queries, baseline {}'.format(name, result['queries'], expected['queries']))
+
+        if _exceeds(result['bytes'], expected['bytes'], BYTES_TOLERANCE):
+            regressions.append('{}: {} bytes, baseline {}'.format(name, result['bytes'], expected['bytes']))
+
+        if check_time and _exceeds(result['time'], expected['time'], TIME_TOLERANCE):
+            regressions.append('{}: {} ms, baseline {} ms'.format(name, result['time'], expected['time']))
+
+    return regressions
+
+
+def format_results(results, baseline=None):
+    """ Return a table of results, with the baseline values alongside, for the test output. """
+    baseline = baseline or {}
+    lines = ['{:<40} {:>6} {:>14} {:>20} {:>18}'.format('endpoint', 'status', 'queries', 'bytes', 'ms')]
+    for name, result in sorted(results.items()):
+        expected = baseline.get(name, {})
+        lines.append('{:<40} {:>6} {:>14} {:>20} {:>18}'.format(
+            name,
+            result['status'],
+            '{} ({})'.format(result['queries'], expected.get('queries', '-')),
+            '{} ({})'.format(result['bytes'], expected.get('bytes', '-')),
+            '{} ({})'.format(result['time'], expected.get('time', '-')),
+        ))
+    return '\n'.join(lines)
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from course_discovery.apps.api.v1.tests.benchmarks import (
+    SCALES, find_regressions, format_results, index_catalog, load_baseline, run_benchmarks, save_baseline,
+    seed_catalog
+)
+from course_discovery.apps.core.tests.factories import USER_PASSWORD, UserFactory
+
+# The benchmarks seed large catalogs, so they're only run on request (see `make benchmark`).
+# Set UPDATE_API_BENCHMARK_BASELINE to record the results as the new baseline instead of comparing against it,
+# and CHECK_API_BENCHMARK_TIME to also fail on wall time regressions.
+run_benchmarks_only_on_request = pytest.mark.skipif(
+    not os.environ.get('RUN_API_BENCHMARKS'), reason='API benchmarks were not requested.'
+)
+
+
+@run_benchmarks_only_on_request
+@pytest.mark.django_db
+@pytest.mark.usefixtures('haystack_default_connection')
+@pytest.mark.parametrize('scale_name', sorted(SCALES))
+def test_api_benchmarks(client, partner, scale_name):
+    user = UserFactory(is_staff=True, is_superuser=True)
+    client.login(username=user.username, password=USER_PASSWORD)
+
+    catalog = seed_catalog(SCALES[scale_name], partner)
+    index_catalog()
+
+    results = run_benchmarks(client, catalog)
+    baseline = load_baseline().get(scale_name, {})
+    print(format_results(results, baseline))
+
+    if os.environ.get('UPDATE_API_BENCHMARK_BASELINE'):
+        save_baseline(scale_name, results)
+        return
+
+    assert baseline, 'No baseline is recorded for the {} scale. Run `make benchmark_baseline`.'.format(scale_name)
+    regressions = find_regressions(results, baseline, check_time=bool(os.environ.get('CHECK_API_BENCHMARK_TIME')))
+    assert not regressions, '\n'.join(regressions)
+
+
+def test_find_regressions():
+    baseline = {
+        'course-list?page_size=20': {'status': 200, 'queries': 30, 'bytes': 1000, 'time': 100.0},
+        'program-detail': {'status': 200, 'queries': 50, 'bytes': 5000, 'time': 200.0},
+    }
+    results = {
+        'course-list?page_size=20': {'status': 200, 'queries': 300, 'bytes': 1050, 'time': 400.0},
+        'program-detail': {'status': 200, 'queries': 52, 'bytes': 6000, 'time': 210.0},
+        'topic-list?page_size=20': {'status': 200, 'queries': 5, 'bytes': 100, 'time': 10.0},
+    }
+
+    assert find_regressions(results, baseline) == [
+        'course-list?page_size=20: 300 queries, baseline 30',
+        'program-detail: 6000 bytes, baseline 5000',
+        'topic-list?page_size=20: not in the baseline',
+    ]
+    regressions = find_regressions(results, baseline, check_time=True)
+    assert regressions[1] == 'course-list?page_size=20: 400.0 ms, baseline 100.0 ms'
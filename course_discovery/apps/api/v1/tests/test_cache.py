@@ -1,6 +1,8 @@
+import gzip
 import zlib
 
 import ddt
+import mock
 from django.core.cache import cache
 from django.test import TestCase, override_settings
 from rest_framework import permissions, views
@@ -9,7 +11,12 @@ from rest_framework.response import Response
 from rest_framework_extensions.test import APIRequestFactory
 from waffle.testutils import override_flag
 
-from course_discovery.apps.api.cache import compressed_cache_response
+from course_discovery.apps.api.cache import (
+    API_TIMESTAMP_KEY, COURSES_RESOURCE, LOCK_KEY_PREFIX, PEOPLE_RESOURCE, ApiCacheStatsLogger, ApiTimestampKeyBit,
+    LocalResponseCache, accepts_encoding, compressed_cache_response, get_api_cache_stats, local_response_cache,
+    record_api_cache_event, set_api_resource_timestamps, set_api_timestamp
+)
+from course_discovery.apps.core.tests.factories import PartnerFactory
 
 factory = APIRequestFactory()
 
@@ -81,6 +88,162 @@ class CompressedCacheResponseTest(TestCase):
         response = view_instance.dispatch(request=self.request)
         self.assertEqual(response.content.decode('utf-8'), '"compressed cached test response"')
 
+    def get_cached_view_instance(self):
+        def key_func(**kwargs):  # pylint: disable=unused-argument
+            return self.cache_response_key
+
+        class TestView(views.APIView):
+            permission_classes = [permissions.AllowAny]
+            renderer_classes = [JSONRenderer]
+
+            @compressed_cache_response(key_func=key_func)
+            def get(self, request, *args, **kwargs):
+                return Response('test response')
+
+        view_instance = TestView()
+        view_instance.headers = {}  # pylint: disable=attribute-defined-outside-init
+        return view_instance
+
+    def test_should_serve_gzip_encoded_response_from_cache(self):
+        """ Verify that cached content is served without decompression to clients accepting gzip """
+        cache.clear()
+        self.get_cached_view_instance().dispatch(request=self.request)
+
+        request = factory.get('', HTTP_ACCEPT_ENCODING='deflate, gzip;q=0.8')
+        response = self.get_cached_view_instance().dispatch(request=request)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content).decode('utf-8'), '"test response"')
+
+    def test_should_decode_cached_response_for_other_clients(self):
+        """ Verify that cached content is decompressed for clients that don't accept its encoding """
+        cache.clear()
+        self.get_cached_view_instance().dispatch(request=self.request)
+
+        request = factory.get('', HTTP_ACCEPT_ENCODING='gzip;q=0, br')
+        response = self.get_cached_view_instance().dispatch(request=request)
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content.decode('utf-8'), '"test response"')
+
+    def test_should_treat_undecodable_entries_as_misses(self):
+        """ Verify that brotli encoded entries are re-rendered by processes without brotli """
+        cache.clear()
+        cache.set(self.cache_response_key, (b'not really brotli', 200, {}, 'br', 'etag', None))
+
+        with mock.patch('course_discovery.apps.api.cache.brotli', None):
+            response = self.get_cached_view_instance().dispatch(request=self.request)
+
+        self.assertEqual(response.content.decode('utf-8'), '"test response"')
+        self.assertEqual(cache.get(self.cache_response_key)[3], 'gzip')
+
+    def test_should_answer_if_none_match_from_cache(self):
+        """ Verify that conditional requests matching the cached ETag get a 304 """
+        cache.clear()
+        response = self.get_cached_view_instance().dispatch(request=self.request)
+        etag = response['ETag']
+
+        request = factory.get('', HTTP_IF_NONE_MATCH=etag)
+        response = self.get_cached_view_instance().dispatch(request=request)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        # The gzip representation has its own ETag.
+        request = factory.get('', HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING='gzip')
+        response = self.get_cached_view_instance().dispatch(request=request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], etag[:-1] + '-gzip"')
+
+        request = factory.get('', HTTP_IF_NONE_MATCH='"other"')
+        response = self.get_cached_view_instance().dispatch(request=request)
+        self.assertEqual(response.status_code, 200)
+
+    @ddt.data(('gzip', 'gzip'), ('', None))
+    @ddt.unpack
+    def test_fresh_and_cached_responses_match(self, accept_encoding, content_encoding):
+        """ Verify that a freshly rendered response has the same encoding and ETag as the cached one """
+        cache.clear()
+        request = factory.get('', HTTP_ACCEPT_ENCODING=accept_encoding)
+        fresh = self.get_cached_view_instance().dispatch(request=request)
+        cached = self.get_cached_view_instance().dispatch(request=request)
+
+        self.assertEqual(fresh.get('Content-Encoding'), content_encoding)
+        self.assertEqual(fresh.get('Content-Encoding'), cached.get('Content-Encoding'))
+        self.assertEqual(fresh['ETag'], cached['ETag'])
+        self.assertEqual(fresh['ETag'].endswith('-gzip"'), bool(content_encoding))
+        self.assertEqual(fresh.content, cached.content)
+
+    def test_should_answer_if_modified_since_from_cache(self):
+        """ Verify that Last-Modified is derived from the cache timestamp and honored """
+        cache.clear()
+
+        def key_func(view_instance, **kwargs):  # pylint: disable=unused-argument
+            view_instance.api_cache_timestamp = 1500000000.5
+            return self.cache_response_key
+
+        class TestView(views.APIView):
+            permission_classes = [permissions.AllowAny]
+            renderer_classes = [JSONRenderer]
+
+            @compressed_cache_response(key_func=key_func)
+            def get(self, request, *args, **kwargs):
+                return Response('test response')
+
+        response = TestView().dispatch(request=self.request)
+        last_modified = response['Last-Modified']
+        # Fractional timestamps are rounded up, so that later changes within the same second aren't missed.
+        self.assertEqual(last_modified, 'Fri, 14 Jul 2017 02:40:01 GMT')
+
+        response = TestView().dispatch(request=factory.get('', HTTP_IF_MODIFIED_SINCE=last_modified))
+        self.assertEqual(response.status_code, 304)
+
+        response = TestView().dispatch(request=factory.get('', HTTP_IF_MODIFIED_SINCE='Thu, 13 Jul 2017 00:00:00 GMT'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_should_omit_last_modified_within_the_changed_second(self):
+        """ Verify that responses rendered before the rounded-up Last-Modified time rely on their ETag """
+        cache.clear()
+
+        def key_func(view_instance, **kwargs):  # pylint: disable=unused-argument
+            view_instance.api_cache_timestamp = 1500000000.5
+            return self.cache_response_key
+
+        class TestView(views.APIView):
+            permission_classes = [permissions.AllowAny]
+            renderer_classes = [JSONRenderer]
+
+            @compressed_cache_response(key_func=key_func)
+            def get(self, request, *args, **kwargs):
+                return Response('test response')
+
+        with mock.patch('course_discovery.apps.api.cache.time.time', return_value=1500000000.7):
+            response = TestView().dispatch(request=self.request)
+
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertTrue(response.has_header('ETag'))
+
+        request = factory.get('', HTTP_IF_MODIFIED_SINCE='Fri, 14 Jul 2017 02:40:01 GMT')
+        response = TestView().dispatch(request=request)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    @ddt.data(
+        ('', False),
+        ('gzip', True),
+        ('GZIP', True),
+        ('deflate, gzip;q=1.0', True),
+        ('gzip;q=0', False),
+        ('gzip;q=0.0, *', False),
+        ('br, *;q=0.5', True),
+        ('identity', False),
+    )
+    @ddt.unpack
+    def test_accepts_encoding(self, header, expected):
+        request = factory.get('', HTTP_ACCEPT_ENCODING=header)
+        self.assertEqual(accepts_encoding(request, 'gzip'), expected)
+
     def test_should_not_cache_for_non_json_responses(self):
         """ Verify that the decorator does not cache if the response is not json """
         def key_func(**kwargs):  # pylint: disable=unused-argument
@@ -126,3 +289,266 @@ class CompressedCacheResponseTest(TestCase):
             self.assertIsNot(cache.get(self.cache_response_key), None)
         else:
             self.assertIs(cache.get(self.cache_response_key), None)
+
+
+class ApiTimestampKeyBitTest(TestCase):
+    def setUp(self):
+        super(ApiTimestampKeyBitTest, self).setUp()
+        cache.clear()
+        self.partner = PartnerFactory()
+        self.other_partner = PartnerFactory()
+
+    def get_key_data(self, resource, partner=None):
+        view_instance = mock.Mock(cache_resource_family=resource)
+        request = mock.Mock(site=mock.Mock(partner=partner or self.partner))
+        return ApiTimestampKeyBit().get_data(view_instance=view_instance, request=request)
+
+    def test_unscoped_view_uses_global_timestamp(self):
+        """ Verify that views without a resource family fall back to the global timestamp. """
+        data = self.get_key_data(None)
+        self.assertEqual(data, cache.get(API_TIMESTAMP_KEY))
+
+    def test_global_timestamp_invalidates_all_resources(self):
+        courses = self.get_key_data(COURSES_RESOURCE)
+        people = self.get_key_data(PEOPLE_RESOURCE)
+
+        with mock.patch('time.time', return_value=courses[0] + 1):
+            set_api_timestamp()
+
+        self.assertNotEqual(self.get_key_data(COURSES_RESOURCE), courses)
+        self.assertNotEqual(self.get_key_data(PEOPLE_RESOURCE), people)
+
+    def test_resource_timestamp_is_scoped_to_family_and_partner(self):
+        courses = self.get_key_data(COURSES_RESOURCE)
+        other_courses = self.get_key_data(COURSES_RESOURCE, partner=self.other_partner)
+        people = self.get_key_data(PEOPLE_RESOURCE)
+
+        with mock.patch('time.time', return_value=courses[0] + 1):
+            set_api_resource_timestamps([COURSES_RESOURCE], self.partner.id)
+
+        self.assertNotEqual(self.get_key_data(COURSES_RESOURCE), courses)
+        self.assertEqual(self.get_key_data(COURSES_RESOURCE, partner=self.other_partner), other_courses)
+        self.assertEqual(self.get_key_data(PEOPLE_RESOURCE), people)
+
+    def test_resource_timestamp_without_partner_invalidates_all_partners(self):
+        courses = self.get_key_data(COURSES_RESOURCE)
+        other_courses = self.get_key_data(COURSES_RESOURCE, partner=self.other_partner)
+
+        with mock.patch('time.time', return_value=courses[0] + 1):
+            set_api_resource_timestamps([COURSES_RESOURCE])
+
+        self.assertNotEqual(self.get_key_data(COURSES_RESOURCE), courses)
+        self.assertNotEqual(self.get_key_data(COURSES_RESOURCE, partner=self.other_partner), other_courses)
+
+
+@override_settings(
+    USE_API_CACHING=True,
+    API_CACHE_STALE_WHILE_REVALIDATE=True,
+    API_CACHE_LOCK_WAIT=1,
+    API_CACHE_RECORD_STATS=True,
+)
+class StaleWhileRevalidateTest(TestCase):
+    cache_response_key = 'cache_response_key'
+    stale_cache_response_key = 'stale.cache_response_key'
+    previous_cache_response_key = 'previous_cache_response_key'
+
+    def setUp(self):
+        super(StaleWhileRevalidateTest, self).setUp()
+        cache.clear()
+        self.request = factory.get('')
+        self.render_count = 0
+
+    def get_view_instance(self):
+        test = self
+
+        def key_func(**kwargs):  # pylint: disable=unused-argument
+            return test.cache_response_key
+
+        def stale_key_func(**kwargs):  # pylint: disable=unused-argument
+            return test.stale_cache_response_key
+
+        class TestView(views.APIView):
+            permission_classes = [permissions.AllowAny]
+            renderer_classes = [JSONRenderer]
+
+            @compressed_cache_response(key_func=key_func, stale_key_func=stale_key_func)
+            def get(self, request, *args, **kwargs):
+                test.render_count += 1
+                return Response('fresh response')
+
+        view_instance = TestView()
+        view_instance.headers = {}  # pylint: disable=attribute-defined-outside-init
+        return view_instance
+
+    def cache_previous_generation(self):
+        response = Response('stale response')
+        self.get_view_instance().finalize_response(request=self.request, response=response)
+        response.render()
+        cache.set(self.previous_cache_response_key, (
+            zlib.compress(response.rendered_content),
+            response.status_code,
+            response._headers.copy(),  # pylint: disable=protected-access
+        ))
+        cache.set(self.stale_cache_response_key, self.previous_cache_response_key)
+
+    def test_miss_renders_and_records_generation(self):
+        """ Verify that the request holding the lock renders, caches, and releases the lock. """
+        response = self.get_view_instance().dispatch(request=self.request)
+
+        self.assertEqual(response.content.decode('utf-8'), '"fresh response"')
+        self.assertEqual(self.render_count, 1)
+        self.assertIsNotNone(cache.get(self.cache_response_key))
+        self.assertEqual(cache.get(self.stale_cache_response_key), self.cache_response_key)
+        self.assertIsNone(cache.get(LOCK_KEY_PREFIX + self.cache_response_key))
+        self.assertEqual(get_api_cache_stats()['miss'], 1)
+
+    def test_locked_miss_serves_stale(self):
+        """ Verify that concurrent requests get the previous generation while another request renders. """
+        self.cache_previous_generation()
+        cache.add(LOCK_KEY_PREFIX + self.cache_response_key, True)
+
+        response = self.get_view_instance().dispatch(request=self.request)
+
+        self.assertEqual(response.content.decode('utf-8'), '"stale response"')
+        self.assertEqual(self.render_count, 0)
+        self.assertEqual(get_api_cache_stats()['stale'], 1)
+
+    def test_locked_miss_waits_for_render(self):
+        """ Verify that requests without a stale copy wait for the rendering request's entry. """
+        cache.add(LOCK_KEY_PREFIX + self.cache_response_key, True)
+        self.cache_previous_generation()
+        cache.delete(self.stale_cache_response_key)
+
+        def finish_render(_seconds):
+            cache.set(self.cache_response_key, cache.get(self.previous_cache_response_key))
+
+        with mock.patch('time.sleep', side_effect=finish_render):
+            response = self.get_view_instance().dispatch(request=self.request)
+
+        self.assertEqual(response.content.decode('utf-8'), '"stale response"')
+        self.assertEqual(self.render_count, 0)
+        stats = get_api_cache_stats()
+        self.assertEqual(stats['lock_wait'], 1)
+        self.assertEqual(stats['lock_wait_hit'], 1)
+
+    @override_settings(API_CACHE_LOCK_WAIT=0)
+    def test_locked_miss_renders_after_wait(self):
+        """ Verify that waiting requests render the response themselves if the lock is never released. """
+        cache.add(LOCK_KEY_PREFIX + self.cache_response_key, True)
+
+        response = self.get_view_instance().dispatch(request=self.request)
+
+        self.assertEqual(response.content.decode('utf-8'), '"fresh response"')
+        self.assertEqual(self.render_count, 1)
+        self.assertEqual(get_api_cache_stats()['lock_wait_timeout'], 1)
+
+
+@override_settings(API_CACHE_RECORD_STATS=True, API_CACHE_LOCAL_MAX_BYTES=0)
+class ApiCacheStatsLoggerTest(TestCase):
+    def setUp(self):
+        super(ApiCacheStatsLoggerTest, self).setUp()
+        cache.clear()
+        # The shared local cache keeps the stats of every test that used it.
+        local_cache_patcher = mock.patch('course_discovery.apps.api.cache.local_response_cache', LocalResponseCache())
+        local_cache_patcher.start()
+        self.addCleanup(local_cache_patcher.stop)
+        with mock.patch('time.monotonic', return_value=1000):
+            self.stats_logger = ApiCacheStatsLogger()
+
+    def log_at(self, now):
+        with mock.patch('time.monotonic', return_value=now):
+            self.stats_logger.log_if_due()
+
+    @mock.patch('course_discovery.apps.api.cache.logger')
+    def test_log_if_due(self, mock_logger):
+        """ Verify the stats are logged at most once per interval, and not at all when the interval is 0. """
+        record_api_cache_event('hit')
+
+        with override_settings(API_CACHE_STATS_LOG_INTERVAL=0):
+            self.log_at(1100)
+        mock_logger.info.assert_not_called()
+
+        with override_settings(API_CACHE_STATS_LOG_INTERVAL=60):
+            for now in (1030, 1061, 1090):
+                self.log_at(now)
+
+        mock_logger.info.assert_called_once_with(
+            'API cache stats: %s. Local response cache stats: %s',
+            'hit=1, stale=0, miss=0, lock_wait=0, lock_wait_hit=0, lock_wait_timeout=0',
+            'hits=0, misses=0, evictions=0, entries=0, bytes=0, max_bytes=0',
+        )
+
+
+class LocalResponseCacheTest(TestCase):
+    def setUp(self):
+        super(LocalResponseCacheTest, self).setUp()
+        self.local_cache = LocalResponseCache()
+
+    def response_triple(self, size):
+        return (b'x' * size, 200, {})
+
+    @override_settings(API_CACHE_LOCAL_MAX_BYTES=0)
+    def test_disabled(self):
+        self.local_cache.set('key', self.response_triple(10))
+        self.assertIsNone(self.local_cache.get('key'))
+        self.assertEqual(self.local_cache.stats()['entries'], 0)
+
+    @override_settings(API_CACHE_LOCAL_MAX_BYTES=3 * (LocalResponseCache.ENTRY_OVERHEAD_BYTES + 100))
+    def test_evicts_least_recently_used(self):
+        for key in ('a', 'b', 'c'):
+            self.local_cache.set(key, self.response_triple(100))
+
+        # Touch 'a' so that 'b' becomes the least recently used entry.
+        self.assertIsNotNone(self.local_cache.get('a'))
+        self.local_cache.set('d', self.response_triple(100))
+
+        self.assertIsNone(self.local_cache.get('b'))
+        for key in ('a', 'c', 'd'):
+            self.assertIsNotNone(self.local_cache.get(key))
+
+        stats = self.local_cache.stats()
+        self.assertEqual(stats['entries'], 3)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hits'], 4)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['bytes'], 3 * (LocalResponseCache.ENTRY_OVERHEAD_BYTES + 100))
+
+    @override_settings(API_CACHE_LOCAL_MAX_BYTES=LocalResponseCache.ENTRY_OVERHEAD_BYTES + 100)
+    def test_skips_entries_larger_than_budget(self):
+        self.local_cache.set('a', self.response_triple(50))
+        self.local_cache.set('b', self.response_triple(200))
+
+        self.assertIsNotNone(self.local_cache.get('a'))
+        self.assertIsNone(self.local_cache.get('b'))
+
+    @override_settings(USE_API_CACHING=True, API_CACHE_LOCAL_MAX_BYTES=1024 * 1024)
+    def test_serves_from_local_tier(self):
+        """ Verify that responses are served from the local tier without reading the shared cache. """
+        cache.clear()
+        local_response_cache.clear()
+
+        def key_func(**kwargs):  # pylint: disable=unused-argument
+            return 'local_cache_response_key'
+
+        render_count = []
+
+        class TestView(views.APIView):
+            permission_classes = [permissions.AllowAny]
+            renderer_classes = [JSONRenderer]
+
+            @compressed_cache_response(key_func=key_func)
+            def get(self, request, *args, **kwargs):
+                render_count.append(1)
+                return Response('test response')
+
+        view_instance = TestView()
+        view_instance.headers = {}  # pylint: disable=attribute-defined-outside-init
+        view_instance.dispatch(request=factory.get(''))
+
+        # Entries which are only in the local tier are still served.
+        cache.clear()
+        response = view_instance.dispatch(request=factory.get(''))
+
+        self.assertEqual(response.content.decode('utf-8'), '"test response"')
+        self.assertEqual(len(render_count), 1)
+        local_response_cache.clear()
@@ -131,6 +131,34 @@ class CourseRunViewSetTests(SerializationMixin, ElasticsearchTestMixin, OAuth2Mi
             self.serialize_course_run(self.course_run, extra_context={'include_unpublished_programs': True})
 
     @responses.activate
+    def test_bulk(self):
+        """ Verify the bulk endpoint returns course runs in the requested order, marking those not found. """
+        url = reverse('api:v1:course_run-bulk')
+        keys = [self.course_run_2.key, 'course-v1:Unknown+Course+Run', self.course_run.key]
+
+        response = self.client.get(url, {'keys': ','.join(keys)})
+        assert response.status_code == 200
+        assert response.data == [
+            self.serialize_course_run(self.course_run_2),
+            {'key': 'course-v1:Unknown+Course+Run', 'detail': 'Not found.'},
+            self.serialize_course_run(self.course_run),
+        ]
+
+        # Long lists can be POSTed instead. This doesn't switch the endpoint to editing drafts.
+        uuids = [str(self.course_run.uuid), 'not-a-uuid', str(self.draft_course_run.uuid)]
+        response = self.client.post(url, {'uuids': uuids}, format='json')
+        assert response.status_code == 200
+        assert response.data == [
+            self.serialize_course_run(self.course_run),
+            {'uuid': 'not-a-uuid', 'detail': 'Not found.'},
+            {'uuid': str(self.draft_course_run.uuid), 'detail': 'Not found.'},
+        ]
+
+    @ddt.data({}, {'keys': 'a', 'uuids': 'b'})
+    def test_bulk_requires_one_lookup(self, params):
+        response = self.client.get(reverse('api:v1:course_run-bulk'), params)
+        assert response.status_code == 400
+
     def test_create_minimum(self):
         """ Verify the endpoint supports creating a course_run with the least info. """
         course = self.draft_course_run.course
@@ -1222,6 +1250,15 @@ class CourseRunViewSetTests(SerializationMixin, ElasticsearchTestMixin, OAuth2Mi
 
         self.assertEqual(str(exc.value), 'Specifying both editable=1 and a q parameter is not supported.')
 
+    @ddt.data('', 'cD0xMjM0')
+    def test_list_query_with_cursor(self, cursor):
+        """ Verify the endpoint returns HTTP 400 if both a q param and a cursor are passed in. """
+        query = {'q': 'title:Some random title', 'cursor': cursor}
+        response = self.client.get(reverse('api:v1:course_run-list'), query)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, ['Specifying both a cursor and a q parameter is not supported.'])
+
     @ddt.data(
         ({
             'staff': True,
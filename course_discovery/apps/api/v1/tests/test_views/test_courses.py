@@ -68,6 +68,45 @@ class CourseViewSetTests(OAuth2Mixin, SerializationMixin, APITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data, self.serialize_course(self.course))
 
+    def test_bulk(self):
+        """ Verify the bulk endpoint returns courses in the requested order, marking those not found. """
+        url = reverse('api:v1:course-bulk')
+        other_course = CourseFactory(partner=self.partner)
+        keys = [other_course.key, 'edX+Unknown101', self.course.key]
+
+        response = self.client.get(url, {'keys': ','.join(keys)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [
+            self.serialize_course(other_course),
+            {'key': 'edX+Unknown101', 'detail': 'Not found.'},
+            self.serialize_course(self.course),
+        ])
+
+        # Long lists can be POSTed instead. This doesn't switch the endpoint to editing drafts.
+        uuids = [str(self.course.uuid), 'not-a-uuid', '00000000-0000-0000-0000-000000000000']
+        response = self.client.post(url, {'uuids': uuids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [
+            self.serialize_course(self.course),
+            {'uuid': 'not-a-uuid', 'detail': 'Not found.'},
+            {'uuid': '00000000-0000-0000-0000-000000000000', 'detail': 'Not found.'},
+        ])
+
+    @ddt.data({}, {'keys': 'a', 'uuids': 'b'})
+    def test_bulk_requires_one_lookup(self, params):
+        response = self.client.get(reverse('api:v1:course-bulk'), params)
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_max_items(self):
+        """ Verify the number of courses requested at once is limited. """
+        url = reverse('api:v1:course-bulk')
+        with mock.patch('course_discovery.apps.api.v1.views.courses.CourseViewSet.bulk_max_items', 1):
+            response = self.client.get(url, {'keys': self.course.key})
+            self.assertEqual(response.status_code, 200)
+
+            response = self.client.get(url, {'keys': '{},edX+Unknown101'.format(self.course.key)})
+            self.assertEqual(response.status_code, 400)
+
     def test_get_exclude_deleted_programs(self):
         """ Verify the endpoint returns no deleted associated programs """
         ProgramFactory(courses=[self.course], status=ProgramStatus.Deleted)
@@ -1,9 +1,12 @@
 import urllib.parse
 
+import mock
 import pytest
 from django.test import RequestFactory
 from django.urls import reverse
+from waffle.testutils import override_switch
 
+from course_discovery.apps.api.models import SerializedDocument
 from course_discovery.apps.api.serializers import MinimalProgramSerializer
 from course_discovery.apps.api.v1.tests.test_views.mixins import FuzzyInt, SerializationMixin
 from course_discovery.apps.api.v1.views.programs import ProgramViewSet
@@ -115,6 +118,62 @@ class TestProgramViewSet(SerializationMixin):
         response = self.assert_retrieve_success(program, querystring={'use_full_course_serializer': 1})
         assert response.data == self.serialize_program(program, extra_context={'use_full_course_serializer': 1})
 
+    def test_retrieve_from_serialized_document(self):
+        """ Verify the endpoint serves the same content from serialized documents. """
+        program = self.create_program()
+        expected = self.assert_retrieve_success(program).json()
+
+        with override_switch('serve_serialized_documents', True):
+            response = self.assert_retrieve_success(program, querystring={'exclude_utm': 1})
+            assert response.json() == self.assert_retrieve_success(program, querystring={'exclude_utm': 0}).json()
+            assert SerializedDocument.objects.filter(uuid=program.uuid).exists()
+
+            assert self.assert_retrieve_success(program).json() == expected
+
+    def test_retrieve_from_serialized_document_not_found(self):
+        """ Verify lookups that aren't program UUIDs are a 404 when serving serialized documents. """
+        with override_switch('serve_serialized_documents', True):
+            response = self.client.get(reverse('api:v1:program-detail', kwargs={'uuid': 'abcdef'}))
+            assert response.status_code == 404
+
+    def test_bulk(self):
+        """ Verify the bulk endpoint returns programs in the requested order, marking those not found. """
+        url = reverse('api:v1:program-bulk')
+        programs = [self.create_program(), self.create_program()]
+        unknown_uuid = '00000000-0000-0000-0000-000000000000'
+        uuids = [str(programs[1].uuid), unknown_uuid, str(programs[0].uuid)]
+        expected = [
+            self.serialize_program(Program.objects.get(pk=programs[1].pk)),
+            {'uuid': unknown_uuid, 'detail': 'Not found.'},
+            self.serialize_program(Program.objects.get(pk=programs[0].pk)),
+        ]
+
+        response = self.client.get(url, {'uuids': ','.join(uuids)})
+        assert response.status_code == 200
+        assert response.data == expected
+
+        # Long lists can be POSTed instead.
+        response = self.client.post(url, {'uuids': uuids + ['abcdef']}, content_type='application/json')
+        assert response.status_code == 200
+        assert response.data == expected + [{'uuid': 'abcdef', 'detail': 'Not found.'}]
+
+    @pytest.mark.parametrize('params', [{}, {'keys': 'a'}])
+    def test_bulk_requires_uuids(self, params):
+        """ Verify programs can only be requested by UUID, since they don't have keys. """
+        response = self.client.get(reverse('api:v1:program-bulk'), params)
+        assert response.status_code == 400
+
+    def test_bulk_max_items(self):
+        """ Verify the number of programs requested at once is limited. """
+        url = reverse('api:v1:program-bulk')
+        program = self.create_program()
+        with mock.patch.object(ProgramViewSet, 'bulk_max_items', 1):
+            response = self.client.get(url, {'uuids': str(program.uuid)})
+            assert response.status_code == 200
+
+            response = self.client.get(url, {'uuids': '{},{}'.format(program.uuid, program.uuid)})
+            assert response.status_code == 400
+
     def test_retrieve_basic_curriculum(self, django_assert_num_queries):
         program = self.create_program(courses=[])
         self.create_curriculum(program)
@@ -3,20 +3,27 @@ import json
 import urllib.parse
 
 import ddt
+import mock
 import pytz
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from haystack import connections as haystack_connections
+from haystack.query import SearchQuerySet
 from rest_framework.renderers import JSONRenderer
+from waffle.testutils import override_switch
 
 from course_discovery.apps.api import serializers
+from course_discovery.apps.api.cache import typeahead_cache
 from course_discovery.apps.api.v1.tests.test_views import mixins
-from course_discovery.apps.api.v1.views.search import BrowsableAPIRendererWithoutForms, TypeaheadSearchView
+from course_discovery.apps.api.v1.views.search import (
+    AggregateSearchViewSet, BrowsableAPIRendererWithoutForms, PersonTypeaheadSearchView, TypeaheadSearchView
+)
 from course_discovery.apps.core.tests.factories import USER_PASSWORD, PartnerFactory, UserFactory
 from course_discovery.apps.core.tests.mixins import ElasticsearchTestMixin
 from course_discovery.apps.course_metadata.choices import CourseRunStatus, ProgramStatus
-from course_discovery.apps.course_metadata.models import CourseRun
+from course_discovery.apps.course_metadata.models import Course, CourseRun, Person, Program, Seat
 from course_discovery.apps.course_metadata.tests.factories import (
-    CourseFactory, CourseRunFactory, OrganizationFactory, PersonFactory, PositionFactory, ProgramFactory
+    CourseFactory, CourseRunFactory, OrganizationFactory, PersonFactory, PositionFactory, ProgramFactory, SeatFactory
 )
 from course_discovery.apps.publisher.tests import factories as publisher_factories
 
@@ -111,6 +118,23 @@ class CourseRunSearchViewSetTests(mixins.SerializationMixin, mixins.LoginMixin,
         }
         self.assertDictContainsSubset(expected, response_data['fields']['pacing_type'][0])
 
+    @ddt.data(list_path, faceted_path)
+    def test_single_search_request(self, path):
+        """ Verify the page of results, the hit count, and the facets are fetched with one search request. """
+        for __ in range(3):
+            CourseRunFactory(course__partner=self.partner, course__title='Software Testing',
+                             status=CourseRunStatus.Published)
+
+        backend = haystack_connections['default'].get_backend()
+        with mock.patch.object(backend.conn, 'search', wraps=backend.conn.search) as mock_search:
+            response = self.client.get(path, {'q': 'software', 'page_size': 2, 'page': 2})
+
+        assert response.status_code == 200
+        results = response.data['objects'] if path == self.faceted_path else response.data
+        assert results['count'] == 3
+        assert len(results['results']) == 1
+        assert mock_search.call_count == 1
+
     def test_invalid_query_facet(self):
         """ Verify the endpoint returns HTTP 400 if an invalid facet is requested. """
         facet = 'not-a-facet'
@@ -391,6 +415,51 @@ class AggregateSearchViewSetTests(mixins.SerializationMixin, mixins.LoginMixin,
         expected = [self.serialize_course_run_search(course_run) for course_run in course_runs]
         assert response.data['objects']['results'] == expected
 
+    def test_stored_fields_only(self):
+        """ Verify list results can be built from the fields stored in the index, without any database queries. """
+        course_run = CourseRunFactory(course__partner=self.partner, status=CourseRunStatus.Published)
+        ProgramFactory(partner=self.partner, status=ProgramStatus.Active, courses=[course_run.course])
+        PersonFactory(partner=self.partner)
+
+        unified_index = haystack_connections['default'].get_unified_index()
+        for model in (Course, CourseRun, Person, Program):
+            unified_index.get_index(model).update()
+        self.refresh_index()
+
+        expected = self.get_response(endpoint='api:v1:search-all-list').json()
+        assert expected['results']
+        with override_switch(AggregateSearchViewSet.stored_fields_switch, True):
+            assert self.get_response(endpoint='api:v1:search-all-list').json() == expected
+
+        results = list(SearchQuerySet().models(Course, CourseRun, Person, Program))
+        assert {result.model for result in results} == {Course, CourseRun, Person, Program}
+        context = {'request': RequestFactory().get('/'), 'stored_fields_only': True}
+        with self.assertNumQueries(0):
+            data = serializers.AggregateSearchSerializer(results, many=True, context=context).data
+            JSONRenderer().render(data)
+
+    def test_stored_fields_only_seat_types(self):
+        """ Verify stored course results list the seat types of all of the course's runs, like loaded ones do. """
+        course = CourseFactory(partner=self.partner)
+        SeatFactory(course_run=CourseRunFactory(course=course, status=CourseRunStatus.Published))
+        SeatFactory(course_run=CourseRunFactory(course=course, status=CourseRunStatus.Unpublished, hidden=True))
+        SeatFactory(course_run=CourseRunFactory(course=course, type__is_marketable=False))
+
+        haystack_connections['default'].get_unified_index().get_index(Course).update()
+        self.refresh_index()
+
+        result = SearchQuerySet().models(Course).filter(key=course.key)[0]
+        request = RequestFactory().get('/')
+        loaded = serializers.CourseSearchSerializer(result, context={'request': request}).data
+        stored = serializers.CourseSearchSerializer(
+            result, context={'request': request, 'stored_fields_only': True}
+        ).data
+
+        expected = sorted(seat.type.slug for seat in Seat.objects.filter(course_run__course=course))
+        assert len(expected) == 3
+        assert loaded['seat_types'] == expected
+        assert stored['seat_types'] == expected
+
     def test_results_include_aggregation_key(self):
         """ Verify the search results only include the aggregation_key for each document. """
         course_run = CourseRunFactory(course__partner=self.partner, status=CourseRunStatus.Published)
@@ -680,6 +749,29 @@ class TypeaheadSearchViewTests(mixins.TypeaheadSerializationMixin, mixins.LoginM
         }
         self.assertDictEqual(response.data, expected)
 
+    @override_settings(TYPEAHEAD_CACHE_MAX_ENTRIES=10)
+    def test_typeahead_cache(self):
+        """ Verify typeahead responses are cached per normalized query, partner, and index generation. """
+        typeahead_cache.clear()
+        self.addCleanup(typeahead_cache.clear)
+        course_run = CourseRunFactory(title='Python', course__partner=self.partner)
+        expected = {'course_runs': [self.serialize_course_run_search(course_run)], 'programs': []}
+
+        get_results = TypeaheadSearchView().get_results
+        with mock.patch.object(TypeaheadSearchView, 'get_results', wraps=get_results) as mock_get:
+            assert self.get_response({'q': 'Python'}).data == expected
+            assert self.get_response({'q': ' python '}).data == expected
+            assert mock_get.call_count == 1
+
+            self.get_response({'q': 'Pyth'})
+            assert mock_get.call_count == 2
+
+            # Swapping the alias to a newly built index invalidates the cached responses.
+            with mock.patch('course_discovery.apps.api.v1.views.search.get_index_generation',
+                            return_value='swapped_index'):
+                assert self.get_response({'q': 'Python'}).data == expected
+            assert mock_get.call_count == 3
+
     def test_typeahead_org_course_runs_come_up_first(self):
         """ Test typeahead response to ensure org is taken into account. """
         MITx = OrganizationFactory(key='MITx')
@@ -750,7 +842,7 @@ class TestPersonFacetSearchViewSet(mixins.SerializationMixin, mixins.LoginMixin,
         self.assertEqual(response_data['objects']['results'][0]['full_name'], person1.full_name)
 
 
-class AutoCompletePersonTests(mixins.APITestCase):
+class AutoCompletePersonTests(ElasticsearchTestMixin, mixins.APITestCase):
     """
     Tests for person autocomplete lookups
     """
@@ -825,6 +917,12 @@ class AutoCompletePersonTests(mixins.APITestCase):
         response = self.query('instructor first')
         self._assert_response(response, 1)
 
+    def test_instructor_autocomplete_result_count(self):
+        """ Verify instructor autocomplete returns a limited number of results. """
+        with mock.patch.object(PersonTypeaheadSearchView, 'RESULT_COUNT', 1):
+            response = self.query('ins')
+        self._assert_response(response, 1)
+
     def test_instructor_position_in_label(self):
         """ Verify that instructor label contains position of instructor if it exists."""
         position_title = 'professor'
@@ -13,7 +13,9 @@ from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
 
 from course_discovery.apps.api import filters, serializers
-from course_discovery.apps.api.pagination import ProxiedPagination
+from course_discovery.apps.api.mixins import BulkRetrieveMixin, SerializedDocumentMixin
+from course_discovery.apps.api.models import SerializedDocument
+from course_discovery.apps.api.pagination import CursorPagination, ProxiedPagination
 from course_discovery.apps.api.permissions import IsCourseRunEditorOrDjangoOrReadOnly
 from course_discovery.apps.api.serializers import MetadataWithRelatedChoices
 from course_discovery.apps.api.utils import StudioAPI, get_query_param, reviewable_data_has_changed
@@ -44,7 +46,7 @@ def writable_request_wrapper(method):
 
 
 # pylint: disable=useless-super-delegation
-class CourseRunViewSet(viewsets.ModelViewSet):
+class CourseRunViewSet(SerializedDocumentMixin, BulkRetrieveMixin, viewsets.ModelViewSet):
     """ CourseRun resource. """
     filter_backends = (DjangoFilterBackend, OrderingFilter)
     filterset_class = filters.CourseRunFilter
@@ -58,6 +60,7 @@ class CourseRunViewSet(viewsets.ModelViewSet):
     metadata_related_choices_whitelist = (
         'content_language', 'level_type', 'transcript_languages', 'expected_program_type', 'type'
     )
+    document_type = SerializedDocument.COURSE_RUN
 
     # Explicitly support PageNumberPagination and LimitOffsetPagination. Future
     # versions of this API should only support the system default, PageNumberPagination.
@@ -76,7 +79,9 @@ class CourseRunViewSet(viewsets.ModelViewSet):
         """
         q = self.request.query_params.get('q')
         partner = self.request.site.partner
-        edit_mode = get_query_param(self.request, 'editable') or self.request.method not in SAFE_METHODS
+        # Bulk retrieval accepts POSTs only to allow long lists of keys, it doesn't edit anything.
+        edit_method = self.request.method not in SAFE_METHODS and self.action != 'bulk'
+        edit_mode = get_query_param(self.request, 'editable') or edit_method
 
         if edit_mode and q:
             raise EditableAndQUnsupported()
@@ -91,6 +96,10 @@ class CourseRunViewSet(viewsets.ModelViewSet):
             queryset = self.queryset
 
         if q:
+            # Search results are ordered by relevance, and can't be filtered on a primary key cursor.
+            if CursorPagination.cursor_query_param in self.request.query_params:
+                raise ValidationError(_('Specifying both a cursor and a q parameter is not supported.'))
+
             qs = SearchQuerySetWrapper(CourseRun.search(q).filter(partner=partner.short_code))
             # This is necessary to avoid issues with the filter backend.
             qs.model = self.queryset.model
@@ -19,7 +19,9 @@ from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
 
 from course_discovery.apps.api import filters, serializers
-from course_discovery.apps.api.cache import CompressedCacheResponseMixin
+from course_discovery.apps.api.cache import COURSES_RESOURCE, CompressedCacheResponseMixin
+from course_discovery.apps.api.mixins import BulkRetrieveMixin, SerializedDocumentMixin
+from course_discovery.apps.api.models import SerializedDocument
 from course_discovery.apps.api.pagination import ProxiedPagination
 from course_discovery.apps.api.permissions import IsCourseEditorOrReadOnly
 from course_discovery.apps.api.serializers import CourseEntitlementSerializer, MetadataWithType
@@ -58,7 +60,7 @@ def writable_request_wrapper(method):
 
 
 # pylint: disable=useless-super-delegation
-class CourseViewSet(CompressedCacheResponseMixin, viewsets.ModelViewSet):
+class CourseViewSet(CompressedCacheResponseMixin, SerializedDocumentMixin, BulkRetrieveMixin, viewsets.ModelViewSet):
     """ Course resource. """
 
     filter_backends = (DjangoFilterBackend, rest_framework_filters.OrderingFilter)
@@ -69,6 +71,8 @@ class CourseViewSet(CompressedCacheResponseMixin, viewsets.ModelViewSet):
     serializer_class = serializers.CourseWithProgramsSerializer
     metadata_class = MetadataWithType
     metadata_related_choices_whitelist = ('mode', 'level_type', 'subjects',)
+    cache_resource_family = COURSES_RESOURCE
+    document_type = SerializedDocument.COURSE
 
     course_key_regex = re.compile(COURSE_ID_REGEX)
     course_uuid_regex = re.compile(COURSE_UUID_REGEX)
@@ -101,7 +105,8 @@ class CourseViewSet(CompressedCacheResponseMixin, viewsets.ModelViewSet):
         # We don't want to create an additional elasticsearch index right now for draft courses, so we
         # try to implement a basic search behavior with this pubq parameter here against key and name.
         pub_q = self.request.query_params.get('pubq')
-        edit_method = self.request.method not in SAFE_METHODS
+        # Bulk retrieval accepts POSTs only to allow long lists of keys, it doesn't edit anything.
+        edit_method = self.request.method not in SAFE_METHODS and self.action != 'bulk'
         edit_mode = get_query_param(self.request, 'editable') or edit_method
 
         if edit_mode and q:
@@ -163,6 +168,13 @@ class CourseViewSet(CompressedCacheResponseMixin, viewsets.ModelViewSet):
 
         return context
 
+    def get_document_extra_fields(self, request, document):
+        if request.user.is_staff:
+            return {'editable': True}
+
+        course = Course.objects.get(uuid=document.uuid)
+        return {'editable': CourseEditor.is_course_editable(request.user, course)}
+
     def get_course_key(self, data):
         return '{org}+{number}'.format(org=data['org'], number=data['number'])
 
@@ -456,8 +468,9 @@ class CourseViewSet(CompressedCacheResponseMixin, viewsets.ModelViewSet):
         # to entitlements and subsequent calls will not make further objects.
         # This was deemed simpler than faking that an entitlement exists in the response and making the object when
         # a client calls PATCH.
-        course = self.get_object()
-        if get_query_param(request, 'editable') and not course.entitlements.exists():
-            create_missing_entitlement(course)
+        if get_query_param(request, 'editable'):
+            course = self.get_object()
+            if not course.entitlements.exists():
+                create_missing_entitlement(course)
 
         return super(CourseViewSet, self).retrieve(request, *args, **kwargs)
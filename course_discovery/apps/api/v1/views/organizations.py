@@ -4,7 +4,7 @@ from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 
 from course_discovery.apps.api import filters, serializers
-from course_discovery.apps.api.cache import CompressedCacheResponseMixin
+from course_discovery.apps.api.cache import ORGANIZATIONS_RESOURCE, CompressedCacheResponseMixin
 from course_discovery.apps.api.pagination import ProxiedPagination
 from course_discovery.apps.publisher.models import OrganizationExtension
 
@@ -19,6 +19,7 @@ class OrganizationViewSet(CompressedCacheResponseMixin, viewsets.ReadOnlyModelVi
     lookup_value_regex = '[0-9a-f-]+'
     permission_classes = (IsAuthenticated,)
     serializer_class = serializers.OrganizationSerializer
+    cache_resource_family = ORGANIZATIONS_RESOURCE
 
     # Explicitly support PageNumberPagination and LimitOffsetPagination. Future
     # versions of this API should only support the system default, PageNumberPagination.
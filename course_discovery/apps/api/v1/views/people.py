@@ -6,7 +6,7 @@ from rest_framework.permissions import DjangoModelPermissions
 from rest_framework.response import Response
 
 from course_discovery.apps.api import filters, serializers
-from course_discovery.apps.api.cache import CompressedCacheResponseMixin
+from course_discovery.apps.api.cache import PEOPLE_RESOURCE, CompressedCacheResponseMixin
 from course_discovery.apps.api.pagination import PageNumberPagination
 from course_discovery.apps.api.serializers import MetadataWithRelatedChoices
 from course_discovery.apps.course_metadata.exceptions import MarketingSiteAPIClientException, PersonToMarketingException
@@ -28,6 +28,7 @@ class PersonViewSet(CompressedCacheResponseMixin, viewsets.ModelViewSet):
     pagination_class = PageNumberPagination
     metadata_class = MetadataWithRelatedChoices
     metadata_related_choices_whitelist = ('organization',)
+    cache_resource_family = PEOPLE_RESOURCE
 
     def create(self, request, *args, **kwargs):
         """
@@ -5,19 +5,25 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from course_discovery.apps.api import filters, serializers
-from course_discovery.apps.api.cache import CompressedCacheResponseMixin
+from course_discovery.apps.api.cache import PROGRAMS_RESOURCE, CompressedCacheResponseMixin
+from course_discovery.apps.api.mixins import BulkRetrieveMixin, SerializedDocumentMixin
+from course_discovery.apps.api.models import SerializedDocument
 from course_discovery.apps.api.pagination import ProxiedPagination
 from course_discovery.apps.api.utils import get_query_param
 from course_discovery.apps.course_metadata.models import Program
 
 
-class ProgramViewSet(CompressedCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class ProgramViewSet(CompressedCacheResponseMixin, SerializedDocumentMixin, BulkRetrieveMixin,
+                     viewsets.ReadOnlyModelViewSet):
     """ Program resource. """
     lookup_field = 'uuid'
     lookup_value_regex = '[0-9a-f-]+'
     permission_classes = (IsAuthenticated,)
     filter_backends = (DjangoFilterBackend, rest_framework_filters.OrderingFilter)
     filterset_class = filters.ProgramFilter
+    cache_resource_family = PROGRAMS_RESOURCE
+    document_type = SerializedDocument.PROGRAM
+    bulk_lookup_fields = ('uuid',)
 
     # Explicitly support PageNumberPagination and LimitOffsetPagination. Future
     # versions of this API should only support the system default, PageNumberPagination.
@@ -1,25 +1,30 @@
+import json
 import uuid
 
-from django.db.models import Q
+import waffle
 from django.http import QueryDict
 from drf_haystack.filters import HaystackFilter
 from drf_haystack.mixins import FacetMixin
 from drf_haystack.viewsets import HaystackViewSet
+from haystack import connections as haystack_connections
 from haystack.backends import SQ
-from haystack.inputs import AutoQuery
+from haystack.inputs import AutoQuery, Exact
 from haystack.query import SearchQuerySet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ParseError, ValidationError
 from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from course_discovery.apps.api import filters, mixins, serializers
+from course_discovery.apps.api.cache import typeahead_cache
 from course_discovery.apps.course_metadata.choices import ProgramStatus
 from course_discovery.apps.course_metadata.models import Course, CourseRun, Person, Program
+from course_discovery.apps.edx_haystack_extensions.distinct_counts.backends import get_index_generation
 
 
 # pylint: disable=useless-super-delegation
@@ -28,10 +33,55 @@ class BaseHaystackViewSet(mixins.DetailMixin, FacetMixin, HaystackViewSet):
     facet_filter_backends = [filters.HaystackFacetFilterWithQueries, filters.HaystackFilter, OrderingFilter]
     ordering_fields = ('start',)
 
-    load_all = True
     lookup_field = 'key'
     permission_classes = (IsAuthenticated,)
     ensure_published = True
+    # Waffle switch which, when active, serves list results from the fields stored in the search index,
+    # instead of loading every result from the database.
+    stored_fields_switch = None
+
+    @property
+    def stored_fields_only(self):
+        return (
+            getattr(self, 'action', None) in ('list', 'create') and
+            self.stored_fields_switch is not None and
+            waffle.switch_is_active(self.stored_fields_switch)
+        )
+
+    @property
+    def load_all(self):
+        return not self.stored_fields_only
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['stored_fields_only'] = self.stored_fields_only
+        return context
+
+    def fill_page_cache(self, queryset):
+        """
+        Fetch the requested page of results with a single search request.
+
+        The hits, the total hit count, and the counts of every field and query facet attached to the queryset
+        all come back in the same response. Otherwise, counting the results, fetching the page, and computing
+        the facets are each a round trip to Elasticsearch.
+        """
+        if not isinstance(self.paginator, PageNumberPagination) or queryset.query.has_run():
+            return
+
+        page_size = self.paginator.get_page_size(self.request)
+        try:
+            page_number = int(self.request.query_params.get(self.paginator.page_query_param, 1))
+        except ValueError:
+            # e.g. page=last, which can't be resolved before the results are counted.
+            return
+
+        if page_size and page_number > 0:
+            start = (page_number - 1) * page_size
+            queryset._fill_cache(start, start + page_size)  # pylint: disable=protected-access
+
+    def paginate_queryset(self, queryset):
+        self.fill_page_cache(queryset)
+        return super().paginate_queryset(queryset)
 
     def list(self, request, *args, **kwargs):
         """
@@ -74,7 +124,20 @@ class BaseHaystackViewSet(mixins.DetailMixin, FacetMixin, HaystackViewSet):
                 pytype: str
               required: false
         """
-        return super(BaseHaystackViewSet, self).facets(request)
+        queryset = self.filter_facet_queryset(self.get_queryset())
+
+        for facet in request.query_params.getlist(self.facet_query_params_text):
+            if ':' not in facet:
+                continue
+
+            field, value = facet.split(':', 1)
+            if value:
+                queryset = queryset.narrow('{field}:"{value}"'.format(field=field, value=queryset.query.clean(value)))
+
+        # Facet counts are computed along with the requested page, rather than by a separate query.
+        self.fill_page_cache(queryset)
+        serializer = self.get_facet_serializer(queryset.facet_counts(), objects=queryset, many=False)
+        return Response(serializer.data)
 
     def filter_facet_queryset(self, queryset):
         queryset = super().filter_facet_queryset(queryset)
@@ -142,6 +205,7 @@ class CourseSearchViewSet(BaseHaystackViewSet):
     detail_serializer_class = serializers.CourseSearchModelSerializer
     facet_serializer_class = serializers.CourseFacetSerializer
     serializer_class = serializers.CourseSearchSerializer
+    stored_fields_switch = 'serve_course_search_from_index'
 
 
 class CourseRunSearchViewSet(BaseHaystackViewSet):
@@ -149,6 +213,7 @@ class CourseRunSearchViewSet(BaseHaystackViewSet):
     detail_serializer_class = serializers.CourseRunSearchModelSerializer
     facet_serializer_class = serializers.CourseRunFacetSerializer
     serializer_class = serializers.CourseRunSearchSerializer
+    stored_fields_switch = 'serve_course_run_search_from_index'
 
 
 class ProgramSearchViewSet(BaseHaystackViewSet):
@@ -158,6 +223,7 @@ class ProgramSearchViewSet(BaseHaystackViewSet):
     detail_serializer_class = serializers.ProgramSearchModelSerializer
     facet_serializer_class = serializers.ProgramFacetSerializer
     serializer_class = serializers.ProgramSearchSerializer
+    stored_fields_switch = 'serve_program_search_from_index'
 
 
 class AggregateSearchViewSet(BaseHaystackViewSet, CatalogDataViewSet):
@@ -165,6 +231,7 @@ class AggregateSearchViewSet(BaseHaystackViewSet, CatalogDataViewSet):
     detail_serializer_class = serializers.AggregateSearchModelSerializer
     facet_serializer_class = serializers.AggregateFacetSearchSerializer
     serializer_class = serializers.AggregateSearchSerializer
+    stored_fields_switch = 'serve_aggregate_search_from_index'
 
 
 class LimitedAggregateSearchView(FacetMixin, HaystackViewSet):
@@ -201,6 +268,7 @@ class PersonSearchViewSet(BaseHaystackViewSet):
     detail_serializer_class = serializers.PersonSearchModelSerializer
     facet_serializer_class = serializers.PersonFacetSerializer
     serializer_class = serializers.PersonSearchSerializer
+    stored_fields_switch = 'serve_person_search_from_index'
     ensure_published = False
     document_uid = 'uuid'
     lookup_field = 'uuid'
@@ -208,11 +276,12 @@ class PersonSearchViewSet(BaseHaystackViewSet):
 
 class PersonTypeaheadSearchView(APIView):
     """ Typeahead for people. """
+    RESULT_COUNT = 20
     permission_classes = (IsAuthenticated,)
 
     def get(self, request, *args, **kwargs):
         """
-        Typeahead uses the ngram_analyzer as the index_analyzer to generate ngrams of the title during indexing.
+        Typeahead uses the ngram_analyzer as the index_analyzer to generate ngrams of the full name during indexing.
         i.e. Data Science -> da, dat, at, ata, data, etc...
         Typeahead uses the lowercase analyzer as the search_analyzer.
         The ngram_analyzer uses the lowercase filter as well, which makes typeahead case insensitive.
@@ -235,33 +304,22 @@ class PersonTypeaheadSearchView(APIView):
         query = request.query_params.get('q')
         if not query:
             raise ValidationError("The 'q' querystring parameter is required for searching.")
-        words = query.split()
         org_keys = self.request.GET.getlist('org', None)
 
-        queryset = Person.objects.all()
+        sqs = SearchQuerySet().models(Person)
+        try:
+            sqs = sqs.filter(uuid=Exact(str(uuid.UUID(query))))
+        except ValueError:
+            # Every word must match part of the person's name.
+            for word in query.split():
+                sqs = sqs.filter(full_name_autocomplete=sqs.query.clean(word))
 
         if org_keys:
-            # We are pulling the people who are part of course runs belonging to the given organizations.
-            # This blank order_by is there to offset the default ordering on people since
-            # we don't care about the order in which they are returned.
-            queryset = queryset.filter(
-                courses_staffed__course__authoring_organizations__key__in=org_keys
-            ).distinct().order_by()
-
-        for word in words:
-            # Progressively filter the same queryset - every word must match something
-            queryset = queryset.filter(Q(given_name__icontains=word) | Q(family_name__icontains=word))
-
-        # No match? Maybe they gave us a UUID...
-        if not queryset:
-            try:
-                q_uuid = uuid.UUID(query).hex
-                queryset = Person.objects.filter(uuid=q_uuid)
-            except ValueError:
-                pass
-
-        context = {'request': self.request}
-        serialized_people = [serializers.PersonSerializer(p, context=context).data for p in queryset]
+            # People who are staff on course runs belonging to the given organizations.
+            sqs = sqs.filter(organizations_exact__in=org_keys)
+
+        # People are serialized when they're indexed, so the response doesn't touch the database.
+        serialized_people = [json.loads(result.typeahead_body) for result in sqs[:self.RESULT_COUNT]]
         return Response(serialized_people, status=status.HTTP_200_OK)
 
 
@@ -270,6 +328,37 @@ class TypeaheadSearchView(APIView):
     RESULT_COUNT = 3
     permission_classes = (IsAuthenticated,)
 
+    def get_course_runs(self, course_runs):
+        """
+        Return the best matching run of each of the best matching courses.
+
+        Runs are deduplicated by Elasticsearch, rather than by paging through the matching runs: a terms
+        aggregation groups them by course key, ordered by the best score within each course, and a top hits
+        aggregation picks the best run of each course.
+        """
+        query = course_runs.query
+        backend = query.backend
+        search_kwargs = backend.build_search_kwargs(query.build_query(), **query.build_params())
+        search_kwargs['size'] = 0
+        search_kwargs['aggs'] = {
+            'courses': {
+                'terms': {'field': 'course_key_exact', 'size': self.RESULT_COUNT, 'order': {'top_score': 'desc'}},
+                'aggs': {
+                    'top_run': {'top_hits': {'size': 1}},
+                    # Expression scripts are sandboxed, and enabled by default.
+                    'top_score': {'max': {'lang': 'expression', 'script': '_score'}},
+                },
+            },
+        }
+
+        raw_results = backend.conn.search(body=search_kwargs, index=backend.index_name, doc_type='modelresult')
+        hits = [
+            bucket['top_run']['hits']['hits'][0]
+            for bucket in raw_results.get('aggregations', {}).get('courses', {}).get('buckets', [])
+        ]
+        process_results = backend._process_results  # pylint: disable=protected-access
+        return process_results({'hits': {'hits': hits, 'total': len(hits)}})['results']
+
     def get_results(self, query, partner):
         sqs = SearchQuerySet()
         clean_query = sqs.query.clean(query)
@@ -280,20 +369,7 @@ class TypeaheadSearchView(APIView):
             SQ(authoring_organizations_autocomplete=clean_query)
         )
         course_runs = course_runs.filter(published=True).exclude(hidden=True).filter(partner=partner.short_code)
-
-        # Get first three results after deduplicating by course key.
-        seen_course_keys, course_run_list = set(), []
-        for course_run in course_runs:
-            course_key = course_run.course_key
-
-            if course_key in seen_course_keys:
-                continue
-
-            seen_course_keys.add(course_key)
-            course_run_list.append(course_run)
-
-            if len(course_run_list) == self.RESULT_COUNT:
-                break
+        course_run_list = self.get_course_runs(course_runs)
 
         programs = sqs.models(Program).filter(
             SQ(title_autocomplete=clean_query) |
@@ -330,7 +406,15 @@ class TypeaheadSearchView(APIView):
         partner = request.site.partner
         if not query:
             raise ValidationError("The 'q' querystring parameter is required for searching.")
-        course_runs, programs = self.get_results(query, partner)
-        data = {'course_runs': course_runs, 'programs': programs}
-        serializer = serializers.TypeaheadSearchSerializer(data)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+        # Keyed by the index behind the search alias, so responses aren't served from before the last reindex.
+        index_generation = get_index_generation(haystack_connections['default'].get_backend())
+        cache_key = typeahead_cache.get_key(query, partner, index_generation) if index_generation else None
+        data = typeahead_cache.get(cache_key) if cache_key else None
+        if data is None:
+            course_runs, programs = self.get_results(query, partner)
+            data = serializers.TypeaheadSearchSerializer({'course_runs': course_runs, 'programs': programs}).data
+            if cache_key:
+                typeahead_cache.set(cache_key, data)
+
+        return Response(data, status=status.HTTP_200_OK)
@@ -48,7 +48,8 @@ class PartnerAdmin(admin.ModelAdmin):
                        'lms_coursemode_api_url',
                        'ecommerce_api_url',
                        'organizations_api_url',
-                       'programs_api_url',)
+                       'programs_api_url',
+                       'data_loader_requests_per_minute',)
         }),
         (_('Marketing Site Configuration'), {
             'description': _('Configure the marketing site URLs that will be used to retrieve data and create URLs.'),
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.12 on 2026-10-16 12:00
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_auto_20200414_0739'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalpartner',
+            name='data_loader_requests_per_minute',
+            field=models.PositiveSmallIntegerField(blank=True, help_text="Overrides the number of requests per minute the data loaders may make to each of this partner's API hosts.", null=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Data Loader Requests per Minute'),
+        ),
+        migrations.AddField(
+            model_name='partner',
+            name='data_loader_requests_per_minute',
+            field=models.PositiveSmallIntegerField(blank=True, help_text="Overrides the number of requests per minute the data loaders may make to each of this partner's API hosts.", null=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Data Loader Requests per Minute'),
+        ),
+    ]
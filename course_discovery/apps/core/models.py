@@ -5,6 +5,7 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.contrib.sites.models import Site
 from django.core.cache import cache
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
@@ -98,6 +99,11 @@ class Partner(TimeStampedModel):
     )
     analytics_url = models.URLField(max_length=255, blank=True, verbose_name=_('Analytics API URL'), default='')
     analytics_token = models.CharField(max_length=255, blank=True, verbose_name=_('Analytics Access Token'), default='')
+    data_loader_requests_per_minute = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1)], verbose_name=_('Data Loader Requests per Minute'),
+        help_text=_('Overrides the number of requests per minute the data loaders may make to each of this '
+                    'partner\'s API hosts.'),
+    )
 
     history = HistoricalRecords()
 
@@ -1,8 +1,12 @@
+import ddt
+import mock
 from django.db import models
 from django.test import TestCase
 from haystack.query import SearchQuerySet
 
-from course_discovery.apps.core.utils import SearchQuerySetWrapper, delete_orphans, get_all_related_field_names
+from course_discovery.apps.core.utils import (
+    ElasticsearchUtils, SearchQuerySetWrapper, delete_orphans, get_all_related_field_names
+)
 from course_discovery.apps.course_metadata.models import CourseRun, Video
 from course_discovery.apps.course_metadata.tests.factories import CourseRunFactory, VideoFactory
 
@@ -79,3 +83,38 @@ class SearchQuerySetWrapperTests(TestCase):
 
     def test_getitem(self):
         self.assertEqual(self.course_runs[0], self.wrapper[0])
+
+
+@ddt.ddt
+class ElasticsearchUtilsTests(TestCase):
+    def get_connection(self, data_nodes, replicas):
+        es_connection = mock.Mock()
+        es_connection.cluster.health.return_value = {
+            'number_of_data_nodes': data_nodes, 'status': 'yellow', 'timed_out': False,
+        }
+        es_connection.indices.get_settings.return_value = {
+            'test_index': {'settings': {'index': {'number_of_replicas': str(replicas)}}},
+        }
+        return es_connection
+
+    @ddt.data(
+        ('green', 1, 1, 'yellow'),
+        ('green', 2, 1, 'green'),
+        ('green', 1, 0, 'green'),
+        ('yellow', 1, 1, 'yellow'),
+    )
+    @ddt.unpack
+    def test_wait_for_status(self, status, data_nodes, replicas, expected_status):
+        """ Verify green is only waited for when the cluster has enough data nodes to allocate every replica. """
+        es_connection = self.get_connection(data_nodes, replicas)
+
+        assert ElasticsearchUtils.wait_for_status(es_connection, 'test_index', status, 30)
+        es_connection.cluster.health.assert_called_with(
+            index='test_index', wait_for_status=expected_status, timeout='30s', request_timeout=40
+        )
+
+    def test_wait_for_status_timed_out(self):
+        es_connection = self.get_connection(data_nodes=2, replicas=1)
+        es_connection.cluster.health.return_value['timed_out'] = True
+
+        assert not ElasticsearchUtils.wait_for_status(es_connection, 'test_index', 'green', 30)
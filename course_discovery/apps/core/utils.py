@@ -1,12 +1,21 @@
+import copy
 import datetime
 import logging
 
 from django.conf import settings
+from simple_history.models import HistoricalChanges
 
 from course_discovery.settings.process_synonyms import get_synonyms
 
 logger = logging.getLogger(__name__)
 
+# Index settings applied while an index is bulk loaded: no replicas to copy each write to, and no refreshes.
+BULK_LOAD_INDEX_SETTINGS = {
+    'number_of_replicas': 0,
+    'refresh_interval': '-1',
+}
+DEFAULT_REFRESH_INTERVAL = '1s'
+
 
 def serialize_datetime(d):
     return d.strftime('%Y-%m-%dT%H:%M:%SZ') if d else None
@@ -33,7 +42,7 @@ class ElasticsearchUtils:
             logger.info('...alias updated.')
 
     @classmethod
-    def create_index(cls, es_connection, prefix):
+    def create_index(cls, es_connection, prefix, bulk_load=False):
         """
         Creates a new index whose name is prefixed with the specified value.
 
@@ -41,6 +50,8 @@ class ElasticsearchUtils:
             es_connection (Elasticsearch): Elasticsearch connection - the connection object as created in the
              ElasticsearchSearchBackend class - the 'conn' attribute
             prefix (str): Alias for the connection, used as prefix for the index name
+            bulk_load (bool): Create the index with BULK_LOAD_INDEX_SETTINGS. Call finish_bulk_load once the
+             index is loaded, to restore the configured settings.
 
         Returns:
             index_name (str): Name of the new index.
@@ -49,10 +60,76 @@ class ElasticsearchUtils:
         index_name = '{alias}_{timestamp}'.format(alias=prefix, timestamp=timestamp)
         index_settings = settings.ELASTICSEARCH_INDEX_SETTINGS
         index_settings['settings']['analysis']['filter']['synonym']['synonyms'] = get_synonyms(es_connection)
+        if bulk_load:
+            index_settings = copy.deepcopy(index_settings)
+            index_settings['settings']['index'].update(BULK_LOAD_INDEX_SETTINGS)
         es_connection.indices.create(index=index_name, body=index_settings)
         logger.info('...index [%s] created.', index_name)
         return index_name
 
+    @classmethod
+    def start_bulk_load(cls, es_connection, index):
+        """ Applies BULK_LOAD_INDEX_SETTINGS to an existing index. """
+        es_connection.indices.put_settings(index=index, body={'index': BULK_LOAD_INDEX_SETTINGS})
+
+    @classmethod
+    def finish_bulk_load(cls, es_connection, index):
+        """
+        Restores the replica count and refresh interval of a bulk loaded index, and refreshes it.
+
+        https://www.elastic.co/guide/en/elasticsearch/reference/1.7/indices-update-settings.html#bulk
+        """
+        index_settings = settings.ELASTICSEARCH_INDEX_SETTINGS['settings']['index']
+        es_connection.indices.put_settings(index=index, body={
+            'index': {
+                'number_of_replicas': index_settings['number_of_replicas'],
+                'refresh_interval': index_settings.get('refresh_interval', DEFAULT_REFRESH_INTERVAL),
+            }
+        })
+        es_connection.indices.refresh(index=index)
+
+    @classmethod
+    def wait_for_status(cls, es_connection, index, status, timeout):
+        """
+        Waits, up to timeout seconds, for the index to reach the given health status.
+
+        An index can't go green on a cluster with fewer data nodes than copies of each shard, since a replica is
+        never allocated to the node holding its primary. In that case, this waits for yellow instead.
+
+        Returns:
+            bool: Whether the status was reached.
+        """
+        if status == 'green':
+            data_nodes = es_connection.cluster.health()['number_of_data_nodes']
+            index_settings = next(iter(es_connection.indices.get_settings(index=index).values()))
+            replicas = int(index_settings['settings']['index']['number_of_replicas'])
+            if data_nodes < replicas + 1:
+                logger.info('Index [%s] has [%d] replicas, but the cluster has only [%d] data nodes. '
+                            'Waiting for status [yellow] instead.', index, replicas, data_nodes)
+                status = 'yellow'
+
+        logger.info('Waiting for index [%s] to reach status [%s]...', index, status)
+        health = es_connection.cluster.health(
+            index=index, wait_for_status=status, timeout='{}s'.format(timeout), request_timeout=timeout + 10
+        )
+        if health.get('timed_out'):
+            logger.warning('...index [%s] is [%s] after [%d] seconds.', index, health.get('status'), timeout)
+            return False
+
+        logger.info('...index [%s] is [%s].', index, health.get('status'))
+        return True
+
+    @classmethod
+    def force_merge(cls, es_connection, index, timeout):
+        """
+        Merges the segments of the index into one. Only worth doing for indexes that are no longer written to.
+
+        https://www.elastic.co/guide/en/elasticsearch/reference/1.7/indices-optimize.html
+        """
+        logger.info('Merging the segments of index [%s]...', index)
+        es_connection.indices.optimize(index=index, max_num_segments=1, request_timeout=timeout)
+        logger.info('...index merged.')
+
     @classmethod
     def delete_index(cls, es_connection, index):
         logger.info('Deleting index [%s]...', index)
@@ -87,6 +164,13 @@ def get_all_related_field_names(model):
     return list(names)
 
 
+def is_history_model(model):
+    """
+    Returns True if the model is one of the Historical* models django-simple-history creates to record changes.
+    """
+    return issubclass(model, HistoricalChanges)
+
+
 def delete_orphans(model, exclude=None):
     """
     Deletes all instances of the given model with no relationships to other models.
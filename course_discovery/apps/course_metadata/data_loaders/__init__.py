@@ -1,9 +1,18 @@
 import abc
+import logging
+from urllib.parse import urlparse
 
 from dateutil.parser import parse
+from django.db import router
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
 from edx_rest_framework_extensions.auth.jwt.decoder import configured_jwt_decode_handler
 
-from course_discovery.apps.course_metadata.models import Image, Video
+from course_discovery.apps.course_metadata.data_loaders.rate_limiter import get_rate_limiter
+from course_discovery.apps.course_metadata.data_loaders.record_hashes import RecordHashes
+from course_discovery.apps.course_metadata.models import CachedMixin, DataLoaderConfig, Image, Video
+
+logger = logging.getLogger(__name__)
 
 
 class AbstractDataLoader(metaclass=abc.ABCMeta):
@@ -13,17 +22,20 @@ class AbstractDataLoader(metaclass=abc.ABCMeta):
         api_url (str): URL of the API from which data is loaded
         partner (Partner): Partner which owns the data for this data loader
         PAGE_SIZE (int): Number of items to load per API call
+        RECORD_SOURCES (tuple): Sources of the upstream records whose hashes are stored, to skip unchanged records
     """
 
     PAGE_SIZE = 50
+    RECORD_SOURCES = ()
 
-    def __init__(self, partner, api_url, max_workers=None, is_threadsafe=False):
+    def __init__(self, partner, api_url, max_workers=None, is_threadsafe=False, force=False):
         """
         Arguments:
             partner (Partner): Partner which owns the APIs and data being loaded
             api_url (str): URL of the API from which data is loaded
             max_workers (int): Number of worker threads to use when traversing paginated responses.
             is_threadsafe (bool): True if multiple threads can be used to write data.
+            force (bool): True to process every upstream record, including those unchanged since the last load.
         """
         self.partner = partner
         self.api_url = api_url.strip('/')
@@ -33,10 +45,128 @@ class AbstractDataLoader(metaclass=abc.ABCMeta):
         self.max_workers = max_workers
         self.is_threadsafe = is_threadsafe
 
+        requests_per_minute = (
+            partner.data_loader_requests_per_minute or DataLoaderConfig.get_solo().requests_per_minute
+        )
+        self.rate_limiter = get_rate_limiter(self.api_url, requests_per_minute)
+
+        context = self.get_record_hash_context()
+        self.record_hashes = {
+            source: RecordHashes(partner, source, force=force, context=context) for source in self.RECORD_SOURCES
+        }
+
     @abc.abstractmethod
     def ingest(self):  # pragma: no cover
         """ Load data for all supported objects (e.g. courses, runs). """
 
+    def get_record_hash_context(self):
+        """ Return anything besides the upstream records themselves that the result of processing them depends on. """
+        return None
+
+    def api_get(self, url, **kwargs):
+        """
+        Make a GET request with the API client, through the rate limiter shared by the requests to the API's host.
+        Throttled requests are retried, and the last response is returned either way.
+        """
+        return self.rate_limiter.request(self.api_client.get, url, **kwargs)
+
+    def log_request_stats(self):
+        """ Log how many requests were made to each of this loader's endpoints, and how many were throttled. """
+        api_path = urlparse(self.api_url).path
+        for endpoint, stats in sorted(self.rate_limiter.get_stats().items()):
+            if not endpoint.startswith(api_path):
+                continue
+
+            logger.info(
+                'Made %d requests to [%s], of which %d were throttled, waiting %.1f seconds for the rate limiter.',
+                stats['requests'], endpoint, stats['throttled'], stats['wait_seconds']
+            )
+
+    def log_record_stats(self):
+        """ Log how many upstream records were processed, and how many were skipped as unchanged. """
+        for source, record_hashes in sorted(self.record_hashes.items()):
+            logger.info(
+                'Processed %d [%s] records, and skipped %d which were unchanged since the last load.',
+                record_hashes.processed, source, record_hashes.skipped
+            )
+
+    @staticmethod
+    def _send_save_signal(signal, model, instances, **kwargs):
+        for instance in instances:
+            signal.send(
+                sender=model, instance=instance, raw=False, using=router.db_for_write(model, instance=instance),
+                **kwargs
+            )
+
+    @staticmethod
+    def _reset_cached_fields(instances):
+        """ Reset the saved field values of CachedMixin instances, as CachedMixin.save() does. """
+        for instance in instances:
+            if isinstance(instance, CachedMixin):
+                instance.__dict__.pop('_cache', None)
+                instance._cache = dict(instance.__dict__)  # pylint: disable=protected-access
+
+    @classmethod
+    def bulk_update(cls, model, instances, fields):
+        """
+        Write the given fields of existing instances with bulk UPDATE queries, rather than a save() per instance.
+
+        bulk_update() bypasses save() and its signals, so they're sent here instead: pre_save for each instance
+        before any of them are written (a receiver raising aborts the whole write), and post_save for each once
+        they're written. Receivers of either (validation, history, API cache invalidation, search indexing,
+        Salesforce) still see every change. The instances' modified timestamps are set here, and the values
+        CachedMixin.did_change() compares against are reset after post_save, as save() would.
+        """
+        if not instances:
+            return
+
+        now = timezone.now()
+        for instance in instances:
+            instance.modified = now
+
+        fields = frozenset(fields) | {'modified'}
+        cls._send_save_signal(pre_save, model, instances, update_fields=fields)
+
+        # The base manager, since the default managers of draft models exclude drafts.
+        model._base_manager.bulk_update(instances, fields)  # pylint: disable=protected-access
+
+        cls._send_save_signal(post_save, model, instances, created=False, update_fields=fields)
+        cls._reset_cached_fields(instances)
+
+    @classmethod
+    def bulk_create(cls, model, instances, unique_fields):
+        """
+        Insert new instances with bulk INSERT queries, rather than a save() per instance.
+
+        Like bulk_update(), this bypasses save(), so pre_save and post_save are sent for each instance around the
+        write. MySQL doesn't return the IDs of bulk inserted rows, so they're looked up by the given fields
+        (attribute names, e.g. course_id), which must identify the rows uniquely.
+        """
+        if not instances:
+            return
+
+        cls._send_save_signal(pre_save, model, instances, update_fields=None)
+
+        manager = model._base_manager  # pylint: disable=protected-access
+        manager.bulk_create(instances)
+
+        missing_ids = {
+            tuple(getattr(instance, field) for field in unique_fields): instance
+            for instance in instances if instance.pk is None
+        }
+        if missing_ids:
+            first_field = unique_fields[0]
+            rows = manager.filter(**{
+                first_field + '__in': {getattr(instance, first_field) for instance in missing_ids.values()}
+            }).values_list('pk', *unique_fields)
+            for row in rows:
+                instance = missing_ids.get(tuple(row[1:]))
+                if instance is not None:
+                    instance.pk = row[0]
+
+        cls._send_save_signal(post_save, model, instances, created=True, update_fields=None)
+        cls._reset_cached_fields(instances)
+
     def get_username_from_client(self, client):
         token = client.get_jwt_access_token()
         decoded_jwt = configured_jwt_decode_handler(token)
@@ -1,11 +1,13 @@
 import datetime
 import logging
+from collections import defaultdict
 
 import pytz
 from analyticsclient.client import Client
+from django.utils import timezone
 
 from course_discovery.apps.course_metadata.data_loaders import AbstractDataLoader
-from course_discovery.apps.course_metadata.models import CourseRun
+from course_discovery.apps.course_metadata.models import Course, CourseRun, Program
 
 logger = logging.getLogger(__name__)
 
@@ -13,14 +15,12 @@ logger = logging.getLogger(__name__)
 class AnalyticsAPIDataLoader(AbstractDataLoader):
 
     API_TIMEOUT = 120  # time in seconds
+    # The number of rows looked up, or written, per query.
+    CHUNK_SIZE = 1000
+    COUNT_FIELDS = ('enrollment_count', 'recent_enrollment_count')
 
-    def __init__(self, partner, api_url, max_workers=None, is_threadsafe=False):
-        super(AnalyticsAPIDataLoader, self).__init__(partner, api_url, max_workers, is_threadsafe)
-
-        # uuid: {course, count, recent_count}
-        self.course_dictionary = {}
-        # uuid: {program, count, recent_count}
-        self.program_dictionary = {}
+    def __init__(self, partner, api_url, max_workers=None, is_threadsafe=False, force=False):
+        super(AnalyticsAPIDataLoader, self).__init__(partner, api_url, max_workers, is_threadsafe, force)
 
         if not (self.partner.analytics_url and self.partner.analytics_token):
             msg = 'Analytics API credentials are not properly configured for Partner [{partner}]!'.format(
@@ -45,61 +45,104 @@ class AnalyticsAPIDataLoader(AbstractDataLoader):
                                                                                   'count',
                                                                                   'recent_count_change'])
 
-        for course_run_summary in course_run_summaries:
-            self._process_course_run_summary(course_run_summary=course_run_summary)
-
-        for course_dict in self.course_dictionary.values():
-            self._process_course_enrollment_count(course_dict['course'],
-                                                  course_dict['count'],
-                                                  course_dict['recent_count'])
-
-        for program_dict in self.program_dictionary.values():
-            # Update program count
-            program = program_dict['program']
-            program.enrollment_count = program_dict['count']
-            program.recent_enrollment_count = program_dict['recent_count']
-            program.save(suppress_publication=True)
-            logger.info('Updating program: {program_uuid}'.format(program_uuid=program.uuid))
-
-    def _process_course_run_summary(self, course_run_summary):
-        # Get course run object from course run key
-        course_run_key = course_run_summary['course_id']
-        course_run_count = int(course_run_summary['count'])
-        course_run_recent_count = int(course_run_summary['recent_count_change'])
-        try:
-            course_run = CourseRun.objects.get(key__iexact=course_run_key)
-        except CourseRun.DoesNotExist:
-            logger.info('Course run: [{course_run_key}] not found in DB.'.format(course_run_key=course_run_key))
-            return
-
-        course = course_run.course
-        # Update course run counts
-        course_run.enrollment_count = course_run_count
-        course_run.recent_enrollment_count = course_run_recent_count
-        course_run.save(suppress_publication=True)
-
-        # Add course run total to course total in dictionary
-        if course.uuid in self.course_dictionary:
-            self.course_dictionary[course.uuid]['count'] += course_run_count
-            self.course_dictionary[course.uuid]['recent_count'] += course_run_recent_count
-        else:
-            self.course_dictionary[course.uuid] = {'course': course,
-                                                   'count': course_run_count,
-                                                   'recent_count': course_run_recent_count}
-
-    def _process_course_enrollment_count(self, course, count, recent_count):
-        # update course count
-        course.enrollment_count = count
-        course.recent_enrollment_count = recent_count
-        course.save()
-
-        # Add course count to program dictionary for all programs
-        for program in course.programs.all():
-            # add course total to program total in dictionary
-            if program.uuid in self.program_dictionary:
-                self.program_dictionary[program.uuid]['count'] += count
-                self.program_dictionary[program.uuid]['recent_count'] += recent_count
-            else:
-                self.program_dictionary[program.uuid] = {'program': program,
-                                                         'count': count,
-                                                         'recent_count': recent_count}
+        # Course run keys are matched case insensitively. Lowercase key: (count, recent count)
+        summary_counts = {
+            summary['course_id'].lower(): (int(summary['count']), int(summary['recent_count_change']))
+            for summary in course_run_summaries
+        }
+        summary_keys = {summary['course_id'].lower(): summary['course_id'] for summary in course_run_summaries}
+
+        course_runs = self._get_course_runs(summary_keys.values())
+        found_keys = {course_run.key.lower() for course_run in course_runs}
+        for course_run_key in sorted(summary_counts.keys() - found_keys):
+            logger.info('Course run: [{course_run_key}] not found in DB.'.format(
+                course_run_key=summary_keys[course_run_key]
+            ))
+
+        course_run_counts = {course_run.pk: summary_counts[course_run.key.lower()] for course_run in course_runs}
+        course_counts = self._sum_counts(
+            (course_run.course_id, course_run_counts[course_run.pk]) for course_run in course_runs
+        )
+        program_counts = self._sum_counts(
+            (program_id, course_counts[course_id])
+            for program_id, course_id in Program.courses.through.objects.filter(
+                course_id__in=list(course_counts)
+            ).values_list('program_id', 'course_id')
+        )
+
+        updated_course_runs = self._update_counts(CourseRun, course_runs, course_run_counts)
+        updated_courses = self._update_counts(Course, self._get_instances(Course, course_counts), course_counts)
+        updated_programs = self._update_counts(Program, self._get_instances(Program, program_counts), program_counts)
+        logger.info(
+            'Updated the enrollment counts of %d of %d course runs, %d of %d courses, and %d of %d programs.',
+            updated_course_runs, len(course_run_counts), updated_courses, len(course_counts),
+            updated_programs, len(program_counts)
+        )
+
+    def _get_course_runs(self, keys):
+        """
+        Return the course runs with the given keys, with only the fields needed to update them.
+
+        Keys are looked up as given, so that the key index is used. Callers match them case insensitively.
+        """
+        keys = list(keys)
+        course_runs = []
+        for start in range(0, len(keys), self.CHUNK_SIZE):
+            course_runs.extend(
+                CourseRun.objects.filter(
+                    key__in=keys[start:start + self.CHUNK_SIZE]
+                ).only('key', 'course', *self.COUNT_FIELDS)
+            )
+        return course_runs
+
+    def _get_instances(self, model, counts):
+        instances = []
+        ids = list(counts)
+        for start in range(0, len(ids), self.CHUNK_SIZE):
+            instances.extend(
+                model._base_manager.filter(  # pylint: disable=protected-access
+                    pk__in=ids[start:start + self.CHUNK_SIZE]
+                ).only(*self.COUNT_FIELDS)
+            )
+        return instances
+
+    @staticmethod
+    def _sum_counts(items):
+        """
+        Arguments:
+            items (iterable): (ID, (count, recent count)) tuples, with any number of tuples per ID.
+
+        Returns:
+            dict: ID to the sums of its counts, as a (count, recent count) tuple.
+        """
+        totals = defaultdict(lambda: (0, 0))
+        for pk, (count, recent_count) in items:
+            total_count, total_recent_count = totals[pk]
+            totals[pk] = (total_count + count, total_recent_count + recent_count)
+        return dict(totals)
+
+    def _update_counts(self, model, instances, counts):
+        """
+        Write the enrollment counts which changed with bulk UPDATE queries.
+
+        Counts are statistics rather than edits, so they're written without save(), its signals, or history records.
+        They aren't indexed for search, and refresh_course_metadata invalidates the API cache and the serialized
+        documents once everything has been loaded.
+
+        Returns:
+            int: The number of instances whose counts changed.
+        """
+        now = timezone.now()
+        changed = []
+        for instance in instances:
+            count, recent_count = counts[instance.pk]
+            if (instance.enrollment_count, instance.recent_enrollment_count) != (count, recent_count):
+                instance.enrollment_count = count
+                instance.recent_enrollment_count = recent_count
+                instance.modified = now
+                changed.append(instance)
+
+        model._base_manager.bulk_update(  # pylint: disable=protected-access
+            changed, self.COUNT_FIELDS + ('modified',), batch_size=self.CHUNK_SIZE
+        )
+        return len(changed)
@@ -2,11 +2,10 @@ import concurrent.futures
 import logging
 import math
 import threading
-import time
+from collections import OrderedDict, defaultdict
 from decimal import Decimal
 from io import BytesIO
 
-import backoff
 import requests
 from django.conf import settings
 from django.core.files import File
@@ -18,6 +17,7 @@ from course_discovery.apps.core.models import Currency
 from course_discovery.apps.course_metadata.choices import CourseRunPacing, CourseRunStatus
 from course_discovery.apps.course_metadata.data_loaders import AbstractDataLoader
 from course_discovery.apps.course_metadata.data_loaders.course_type import calculate_course_type
+from course_discovery.apps.course_metadata.data_loaders.lookup_tables import LookupTable
 from course_discovery.apps.course_metadata.models import (
     Course, CourseEntitlement, CourseRun, CourseRunType, CourseType, Organization, Program, ProgramType, Seat, SeatType,
     Video
@@ -27,8 +27,39 @@ from course_discovery.apps.course_metadata.utils import push_to_ecommerce_for_co
 logger = logging.getLogger(__name__)
 
 
+class PendingUpdates:
+    """
+    New rows, and changes to existing rows, collected while a page of API data is processed and written once the
+    whole page has been processed.
+    """
+
+    def __init__(self):
+        # Instance to the names of its changed fields, in the order the instances were changed.
+        self.changed_fields = OrderedDict()
+        # New instances, in the order they were created.
+        self.created = []
+        # (official, draft) versions of the course runs whose end dates changed.
+        self.ended_runs = []
+
+    def add(self, instance, fields):
+        self.changed_fields.setdefault(instance, set()).update(fields)
+
+    def create(self, instance):
+        self.created.append(instance)
+
+    def update(self, instance, values):
+        """ Set the given field values on an existing or new instance, recording the ones which changed. """
+        changed = [attr for attr, value in values.items() if getattr(instance, attr) != value]
+        for attr in changed:
+            setattr(instance, attr, values[attr])
+
+        if changed and instance.pk is not None:
+            self.add(instance, changed)
+
+
 class CoursesApiDataLoader(AbstractDataLoader):
     """ Loads course runs from the Courses API. """
+    RECORD_SOURCES = ('courses_api',)
 
     def ingest(self):
         logger.info('Refreshing Courses and CourseRuns from %s...', self.partner.courses_api_url)
@@ -44,13 +75,8 @@ class CoursesApiDataLoader(AbstractDataLoader):
 
         with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:  # pragma: no cover
             if self.is_threadsafe:
+                # Requests are spaced out by the loader's rate limiter, rather than when they're submitted.
                 for page in pagerange:
-                    # This time.sleep is to make it very likely that this method does not encounter a 429 status
-                    # code by increasing the amount of time between each code. More details at LEARNER-5560
-                    # The current crude estimation is for ~3000 courses with a PAGE_SIZE=50 which means this method
-                    # will take ~30 minutes.
-                    # TODO Ticket to gracefully handle 429 https://openedx.atlassian.net/browse/LEARNER-5565
-                    time.sleep(30)
                     executor.submit(self._load_data, page)
             else:
                 for future in [executor.submit(self._make_request, page) for page in pagerange]:
@@ -64,53 +90,53 @@ class CoursesApiDataLoader(AbstractDataLoader):
         response = self._make_request(page)
         self._process_response(response)
 
-    def _fatal_code(ex):  # pylint: disable=no-self-argument
-        return ex.response.status_code != 429 and ex.response.status_code != 504  # pylint: disable=no-member
-
-    # The courses endpoint has a 40 requests/minute rate limit.
-    # This will back off at a rate of 60/120/240 seconds (from the factor 60 and default value of base 2).
-    # This backoff code can still fail because of the concurrent requests all requesting at the same time.
-    # So even in the case of entering into the next minute, if we still exceed our limit for that min,
-    # any requests that failed in both limits are still approaching their max_tries limit.
-    @backoff.on_exception(
-        backoff.expo,
-        factor=60,
-        jitter=None,
-        max_tries=4,
-        exception=requests.exceptions.RequestException,
-        giveup=_fatal_code,
-    )
     def _make_request(self, page):
         logger.info('Requesting course run page %d...', page)
         params = {'page': page, 'page_size': self.PAGE_SIZE, 'username': self.username}
-        response = self.api_client.get(self.api_url + '/courses/', params=params)
+        # Throttled (429 and 504) responses are retried by the rate limiter, which slows down as it does so.
+        response = self.api_get(self.api_url + '/courses/', params=params)
         response.raise_for_status()
         return response.json()
 
+    def get_record_hash_context(self):
+        # Without publisher, more of the course and run data is loaded from Studio.
+        return {'uses_publisher': bool(self.partner.uses_publisher)}
+
     def _process_response(self, response):
         results = response['results']
         logger.info('Retrieved %d course runs...', len(results))
 
-        for body in results:
-            course_run_id = body['id']
+        record_hashes = self.record_hashes['courses_api']
+        # Unchanged records are loaded again if their runs were deleted locally since they were last loaded.
+        runs = self.get_course_runs(results)
+        missing = {body['id'] for body in results if self.clean_string(body['id']).lower() not in runs}
+        changed, __ = record_hashes.get_changed([(body['id'], body) for body in results], missing_ids=missing)
+        updates = PendingUpdates()
+        processed = {}
 
+        for course_run_id, body, content_hash in changed:
             try:
                 body = self.clean_strings(body)
-                official_run, draft_run = self.get_course_run(body)
+                official_run, draft_run = runs.get(body['id'].lower(), (None, None))
                 if official_run or draft_run:
-                    self.update_course_run(official_run, draft_run, body)
+                    self.update_course_run(official_run, draft_run, body, updates)
                     if not self.partner.uses_publisher:
                         # Without publisher, we'll use Studio as the source of truth for course data
                         official_course = getattr(official_run, 'canonical_for_course', None)
                         draft_course = getattr(draft_run, 'canonical_for_course', None)
                         if official_course or draft_course:
-                            self.update_course(official_course, draft_course, body)
+                            self.update_course(official_course, draft_course, body, updates)
                 else:
                     course, created = self.get_or_create_course(body)
                     course_run = self.create_course_run(course, body)
                     if created:
                         course.canonical_course_run = course_run
                         course.save()
+
+                    # The same run may appear again later in the page.
+                    runs[body['id'].lower()] = (course_run, course_run.draft_version)
+
+                processed[course_run_id] = content_hash
             except Exception:  # pylint: disable=broad-except
                 msg = 'An error occurred while updating {course_run} from {api_url}'.format(
                     course_run=course_run_id,
@@ -118,36 +144,128 @@ class CoursesApiDataLoader(AbstractDataLoader):
                 )
                 logger.exception(msg)
 
-    def get_course_run(self, body):
+        if self.save_updates(updates):
+            record_hashes.save(processed)
+
+    def get_course_runs(self, bodies):
         """
+        Look up the existing course runs for a page of API data, with one query.
+
         Returns:
-            Tuple of (official, draft) versions of the run.
+            dict: Lowercase course run key to a tuple of the (official, draft) versions of the run.
         """
-        course_run_key = body['id']
-        run = CourseRun.objects.filter_drafts(key__iexact=course_run_key).first()
-        if not run:
-            return None, None
-        elif run.draft:
-            return run.official_version, run
-        else:
-            return run, run.draft_version
+        keys = {self.clean_string(body['id']) for body in bodies}
+        # Keys are looked up as given, so that the key index is used, and matched case insensitively here.
+        queryset = CourseRun.objects.filter_drafts().filter(key__in=keys).select_related(
+            'course', 'video', 'canonical_for_course',
+            '_official_version__course', '_official_version__video', '_official_version__canonical_for_course',
+        ).order_by('pk')
+
+        runs = {}
+        for run in queryset:
+            lower_key = run.key.lower()
+            if lower_key in runs:
+                continue
+            elif run.draft:
+                runs[lower_key] = (run.official_version, run)
+            else:
+                runs[lower_key] = (run, run.draft_version)
+
+        return runs
 
-    def update_course_run(self, official_run, draft_run, body):
+    def update_course_run(self, official_run, draft_run, body, updates):
         run = draft_run or official_run
 
         validated_data = self.format_course_run_data(body)
         end_has_updated = validated_data.get('end') != run.end
-        self._update_instance(official_run, validated_data, suppress_publication=True)
-        self._update_instance(draft_run, validated_data, suppress_publication=True)
+        self._update_instance(official_run, validated_data, updates)
+        self._update_instance(draft_run, validated_data, updates)
         if end_has_updated:
-            self._update_verified_deadline_for_course_run(official_run)
-            self._update_verified_deadline_for_course_run(draft_run)
-            has_upgrade_deadline_override = run.seats.filter(upgrade_deadline_override__isnull=False)
-            if not has_upgrade_deadline_override and official_run:
-                push_to_ecommerce_for_course_run(official_run)
+            updates.ended_runs.append((official_run, draft_run))
 
         logger.info('Processed course run with UUID [%s].', run.uuid)
 
+    def save_updates(self, updates):
+        """
+        Write the changes collected from a page of API data, and then update the verified upgrade deadlines and push
+        to ecommerce for the runs whose end dates changed.
+
+        Returns:
+            bool: True if everything was written without errors.
+        """
+        success = True
+        batches = defaultdict(list)
+        for instance, fields in updates.changed_fields.items():
+            if isinstance(instance, CourseRun) and 'status' in fields:
+                # Status changes are handled by CourseRun.save() (e.g. go-live emails for drafts).
+                success = self._save_instance(instance, suppress_publication=True) and success
+            else:
+                batches[(type(instance), frozenset(fields))].append(instance)
+
+        for (model, fields), instances in batches.items():
+            try:
+                self.bulk_update(model, instances, fields)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to update %d %s rows in bulk. Saving them one at a time.',
+                                 len(instances), model.__name__)
+                save_kwargs = {'suppress_publication': True} if model is CourseRun else {}
+                for instance in instances:
+                    success = self._save_instance(instance, **save_kwargs) and success
+
+        if updates.ended_runs:
+            try:
+                self._update_verified_deadlines(run for runs in updates.ended_runs for run in runs)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to update the verified upgrade deadlines of %d course runs.',
+                                 len(updates.ended_runs))
+                success = False
+
+            success = self._push_ended_runs_to_ecommerce(updates.ended_runs) and success
+
+        return success
+
+    def _save_instance(self, instance, **kwargs):
+        try:
+            instance.save(**kwargs)
+            return True
+        except Exception:  # pylint: disable=broad-except
+            msg = 'An error occurred while updating {instance} from {api_url}'.format(
+                instance=instance.key,
+                api_url=self.partner.courses_api_url
+            )
+            logger.exception(msg)
+            return False
+
+    def _update_verified_deadlines(self, course_runs):
+        runs = {run.pk: run for run in course_runs if run and run.end}
+        seats = []
+        for seat in Seat.everything.filter(course_run__in=list(runs), type=Seat.VERIFIED):
+            upgrade_deadline = subtract_deadline_delta(runs[seat.course_run_id].end,
+                                                       settings.PUBLISHER_UPGRADE_DEADLINE_DAYS)
+            if seat.upgrade_deadline != upgrade_deadline:
+                seat.upgrade_deadline = upgrade_deadline
+                seats.append(seat)
+
+        self.bulk_update(Seat, seats, ['_upgrade_deadline'])
+
+    def _push_ended_runs_to_ecommerce(self, ended_runs):
+        # Runs with an overridden upgrade deadline aren't affected by the end date, so there's nothing to push.
+        overridden = set(Seat.everything.filter(
+            course_run__in=[(draft_run or official_run).pk for official_run, draft_run in ended_runs],
+            upgrade_deadline_override__isnull=False,
+        ).values_list('course_run_id', flat=True))
+
+        success = True
+        for official_run, draft_run in ended_runs:
+            if official_run and (draft_run or official_run).pk not in overridden:
+                try:
+                    push_to_ecommerce_for_course_run(official_run)
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception('Failed to push course run [%s] to ecommerce.', official_run.key)
+                    success = False
+
+        return success
+
     def create_course_run(self, course, body):
         defaults = self.format_course_run_data(body, course=course)
 
@@ -195,35 +313,17 @@ class CoursesApiDataLoader(AbstractDataLoader):
 
         return (course, created)
 
-    def update_course(self, official_course, draft_course, body):
+    def update_course(self, official_course, draft_course, body, updates):
         validated_data = self.format_course_data(body)
-        self._update_instance(official_course, validated_data)
-        self._update_instance(draft_course, validated_data)
+        self._update_instance(official_course, validated_data, updates)
+        self._update_instance(draft_course, validated_data, updates)
 
         course = official_course or draft_course
         logger.info('Processed course with key [%s].', course.key)
 
-    def _update_verified_deadline_for_course_run(self, course_run):
-        seats = course_run.seats.filter(type=Seat.VERIFIED) if course_run and course_run.end else []
-        for seat in seats:
-            seat.upgrade_deadline = subtract_deadline_delta(
-                seat.course_run.end, settings.PUBLISHER_UPGRADE_DEADLINE_DAYS
-            )
-            seat.save()
-
-    def _update_instance(self, instance, validated_data, **kwargs):
-        if not instance:
-            return
-
-        updated = False
-
-        for attr, value in validated_data.items():
-            if getattr(instance, attr) != value:
-                setattr(instance, attr, value)
-                updated = True
-
-        if updated:
-            instance.save(**kwargs)
+    def _update_instance(self, instance, validated_data, updates):
+        if instance:
+            updates.update(instance, validated_data)
 
     def format_course_run_data(self, body, course=None):
         defaults = {
@@ -290,9 +390,15 @@ class EcommerceApiDataLoader(AbstractDataLoader):
     """ Loads course seats, entitlements, and enrollment codes from the E-Commerce API. """
 
     LOADER_MAX_RETRY = 2
-
-    def __init__(self, partner, api_url, max_workers=None, is_threadsafe=False, **kwargs):
-        super(EcommerceApiDataLoader, self).__init__(partner, api_url, max_workers, is_threadsafe, **kwargs)
+    RECORD_SOURCES = ('ecommerce_course_runs', 'ecommerce_entitlements', 'ecommerce_enrollment_codes')
+    # Fields which identify seats and entitlements, used to find the IDs of the ones created in bulk.
+    UNIQUE_FIELDS = {
+        Seat: ('course_run_id', 'type_id', 'currency_id', 'credit_provider', 'draft'),
+        CourseEntitlement: ('course_id', 'draft'),
+    }
+
+    def __init__(self, partner, api_url, max_workers=None, is_threadsafe=False, force=False, **kwargs):
+        super(EcommerceApiDataLoader, self).__init__(partner, api_url, max_workers, is_threadsafe, force, **kwargs)
         self.initial_page = 1
         self.enrollment_skus = []
         self.entitlement_skus = []
@@ -301,6 +407,14 @@ class EcommerceApiDataLoader(AbstractDataLoader):
         self.entitlement_count = 0
         self.enrollment_code_count = 0
 
+        # The rows products are matched against, loaded by _load_lookup_tables() when data is loaded.
+        self.currencies = LookupTable(Currency.objects.all(), 'code')
+        self.seat_types = LookupTable(SeatType.objects.all(), 'slug')
+        self.course_run_types = LookupTable(CourseRunType.objects.prefetch_related('tracks'), 'pk')
+        self.course_types = LookupTable(CourseType.objects.prefetch_related('entitlement_types'), 'pk')
+        self.courses = LookupTable(Course.objects.all(), 'uuid', normalize=lambda uuid: str(uuid).lower())
+        self.course_runs = LookupTable(CourseRun.objects.all(), 'key', lookup='key__iexact', normalize=str.lower)
+
         # Thread locks to protect access to the counts
         self.course_run_count_lock = threading.Lock()
         self.entitlement_count_lock = threading.Lock()
@@ -329,7 +443,18 @@ class EcommerceApiDataLoader(AbstractDataLoader):
             else:
                 self._delete_entitlements()
 
+    def _load_lookup_tables(self):
+        for lookup_table in (self.currencies, self.seat_types, self.course_run_types, self.course_types):
+            lookup_table.load()
+
+        # Products of other partners' courses are still found, since missing keys are looked up in the database.
+        self.courses.load(Course.objects.filter(partner=self.partner))
+        self.course_runs.load(CourseRun.objects.filter(course__partner=self.partner))
+
     def _load_ecommerce_data(self):
+        # Reloaded on each attempt, since course types are upgraded at the end of the previous one.
+        self._load_lookup_tables()
+
         course_runs = self._request_course_runs(self.initial_page)
         entitlements = self._request_entitlements(self.initial_page)
         enrollment_codes = self._request_enrollment_codes(self.initial_page)
@@ -444,15 +569,15 @@ class EcommerceApiDataLoader(AbstractDataLoader):
 
     def _request_course_runs(self, page):
         params = {'page': page, 'page_size': self.PAGE_SIZE, 'include_products': True}
-        return self.api_client.get(self.api_url + '/courses/', params=params).json()
+        return self.api_get(self.api_url + '/courses/', params=params).json()
 
     def _request_entitlements(self, page):
         params = {'page': page, 'page_size': self.PAGE_SIZE, 'product_class': 'Course Entitlement'}
-        return self.api_client.get(self.api_url + '/products/', params=params).json()
+        return self.api_get(self.api_url + '/products/', params=params).json()
 
     def _request_enrollment_codes(self, page):
         params = {'page': page, 'page_size': self.PAGE_SIZE, 'product_class': 'Enrollment Code'}
-        return self.api_client.get(self.api_url + '/products/', params=params).json()
+        return self.api_get(self.api_url + '/products/', params=params).json()
 
     def _process_course_runs(self, response):
         results = response['results']
@@ -461,9 +586,23 @@ class EcommerceApiDataLoader(AbstractDataLoader):
         self.course_run_count_lock.acquire()
         self.course_run_count += len(results)
         self.course_run_count_lock.release()
-        for body in results:
+
+        record_hashes = self.record_hashes['ecommerce_course_runs']
+        # Seats are validated against the type of their course run, which can change locally between refreshes.
+        records = [(body.get('id'), body) for body in results]
+        run_types = {course_run_key: self._get_type_id(self.course_runs.get(course_run_key))
+                     for course_run_key, __ in records}
+        changed, __ = record_hashes.get_changed(records, record_contexts=run_types)
+        seats = self._get_seats(self.course_runs.get(course_run_key) for course_run_key, __, __ in changed)
+        updates = PendingUpdates()
+        processed = {}
+        for course_run_key, body, content_hash in changed:
             body = self.clean_strings(body)
-            self.update_seats(body)
+            if self.update_seats(body, seats, updates):
+                processed[course_run_key] = content_hash
+
+        if self.save_updates(updates):
+            record_hashes.save(processed)
 
     def _process_entitlements(self, response):
         results = response['results']
@@ -473,9 +612,28 @@ class EcommerceApiDataLoader(AbstractDataLoader):
         self.entitlement_count += len(results)
         self.entitlement_count_lock.release()
 
-        for body in results:
+        record_hashes = self.record_hashes['ecommerce_entitlements']
+        # Entitlements are validated against the type of their course, which can change locally between refreshes.
+        records = [(self._get_product_sku(body), body) for body in results]
+        course_types = {sku: self._get_type_id(self.courses.get(self._get_attributes(body).get('UUID')))
+                        for sku, body in records}
+        changed, skipped_skus = record_hashes.get_changed(records, record_contexts=course_types)
+        # Only the hashes of entitlements which were loaded are stored, so the skipped ones must be kept too.
+        self.entitlement_skus.extend(skipped_skus)
+        entitlements = self._get_entitlements(
+            self.courses.get(self._get_attributes(body).get('UUID')) for __, body, __ in changed
+        )
+        updates = PendingUpdates()
+        processed = {}
+        for sku, body, content_hash in changed:
             body = self.clean_strings(body)
-            self.entitlement_skus.append(self.update_entitlement(body))
+            loaded_sku = self.update_entitlement(body, entitlements, updates)
+            self.entitlement_skus.append(loaded_sku)
+            if loaded_sku:
+                processed[sku] = content_hash
+
+        if self.save_updates(updates):
+            record_hashes.save(processed)
 
     def _process_enrollment_codes(self, response):
         results = response['results']
@@ -484,9 +642,103 @@ class EcommerceApiDataLoader(AbstractDataLoader):
         self.enrollment_code_count += len(results)
         self.enrollment_code_lock.release()
 
-        for body in results:
+        record_hashes = self.record_hashes['ecommerce_enrollment_codes']
+        changed, skipped_skus = record_hashes.get_changed([(self._get_product_sku(body), body) for body in results])
+        self.enrollment_skus.extend(skipped_skus)
+        processed = {}
+        for sku, body, content_hash in changed:
             body = self.clean_strings(body)
-            self.enrollment_skus.append(self.update_enrollment_code(body))
+            loaded_sku = self.update_enrollment_code(body)
+            self.enrollment_skus.append(loaded_sku)
+            if loaded_sku:
+                processed[sku] = content_hash
+
+        record_hashes.save(processed)
+
+    @staticmethod
+    def _get_product_sku(body):
+        """ Return the SKU of a product, which identifies it in the record hashes, or None if it has no valid SKU. """
+        stockrecords = body.get('stockrecords') or []
+        return stockrecords[0].get('partner_sku') if len(stockrecords) == 1 else None
+
+    @staticmethod
+    def _get_type_id(instance):
+        return str(instance.type_id) if instance is not None else None
+
+    @staticmethod
+    def _get_attributes(body):
+        return {attribute['name']: attribute['value'] for attribute in body['attribute_values']}
+
+    @staticmethod
+    def _get_seats(course_runs):
+        """
+        Returns:
+            dict: The ID of each of the given course runs to a dict of its seats by (type, credit provider, currency).
+        """
+        seats = {course_run.pk: {} for course_run in course_runs if course_run}
+        for seat in Seat.everything.filter(course_run__in=list(seats)):
+            seats[seat.course_run_id][(seat.type_id, seat.credit_provider, seat.currency_id)] = seat
+        return seats
+
+    @staticmethod
+    def _get_entitlements(courses):
+        """
+        Returns:
+            dict: The ID of each of the given courses to a dict of its entitlements by mode ID.
+        """
+        entitlements = {course.pk: {} for course in courses if course}
+        for entitlement in CourseEntitlement.everything.filter(course__in=list(entitlements)):
+            entitlements[entitlement.course_id][entitlement.mode_id] = entitlement
+        return entitlements
+
+    def save_updates(self, updates):
+        """
+        Write the seats or entitlements created and changed while processing a page of products. Failures block the
+        deletion of stale entitlements, like any other processing failure.
+
+        Returns:
+            bool: True if everything was written without errors.
+        """
+        success = True
+        created = defaultdict(list)
+        for instance in updates.created:
+            created[type(instance)].append(instance)
+
+        for model, instances in created.items():
+            try:
+                self.bulk_create(model, instances, self.UNIQUE_FIELDS[model])
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to create %d %s rows in bulk. Saving them one at a time.',
+                                 len(instances), model.__name__)
+                for instance in instances:
+                    success = self._save_instance(instance) and success
+
+        batches = defaultdict(list)
+        for instance, fields in updates.changed_fields.items():
+            batches[(type(instance), frozenset(fields))].append(instance)
+
+        for (model, fields), instances in batches.items():
+            try:
+                self.bulk_update(model, instances, fields)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to update %d %s rows in bulk. Saving them one at a time.',
+                                 len(instances), model.__name__)
+                for instance in instances:
+                    success = self._save_instance(instance) and success
+
+        if not success:
+            self.processing_failure_occurred = True
+
+        return success
+
+    def _save_instance(self, instance):
+        try:
+            instance.save()
+            return True
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('An error occurred while saving %s with sku [%s] from %s',
+                             type(instance).__name__, instance.sku, self.partner.ecommerce_api_url)
+            return False
 
     def _delete_entitlements(self):
         entitlements_to_delete = CourseEntitlement.objects.filter(
@@ -515,64 +767,94 @@ class EcommerceApiDataLoader(AbstractDataLoader):
             # Protect against deletes if exceptions occurred
             self.processing_failure_occurred = True
 
-    def update_seats(self, body):
+    def update_seats(self, body, seats, updates):
+        """
+        Arguments:
+            body (dict): Course run data from ecommerce, with its products
+            seats (dict): Existing seats, as returned by _get_seats(). Seats created for the course run are added.
+            updates (PendingUpdates): Where the seats to create and update are collected
+
+        Returns:
+            bool: True if the course run was found, and all of its seats were loaded.
+        """
         course_run_key = body['id']
-        try:
-            course_run = CourseRun.objects.get(key__iexact=course_run_key)
-        except CourseRun.DoesNotExist:
+        course_run = self.course_runs.get(course_run_key)
+        if course_run is None:
             logger.warning('Could not find course run [%s]', course_run_key)
-            return
+            return False
+
+        if course_run.pk not in seats:
+            seats.update(self._get_seats([course_run]))
+        course_run_seats = seats[course_run.pk]
 
+        success = True
         for product_body in body['products']:
             if product_body['structure'] != 'child':
                 continue
             product_body = self.clean_strings(product_body)
-            self.update_seat(course_run, product_body)
+            success = self.update_seat(course_run, product_body, course_run_seats, updates) and success
 
         # Remove seats which no longer exist for that course run
         certificate_types = [self.get_certificate_type(product) for product in body['products']
                              if product['structure'] == 'child']
 
-        seats_to_remove = course_run.seats.exclude(type__slug__in=certificate_types)
-        if seats_to_remove.count() > 0:
+        seats_to_remove = {
+            seat_key: seat for seat_key, seat in course_run_seats.items()
+            if seat.pk is not None and seat.type_id not in certificate_types
+        }
+        if seats_to_remove:
             logger.info(
                 'Removing seats [%s] for course run with key [%s].',
-                ', '.join(s.type.slug for s in seats_to_remove),
+                ', '.join(seat.type_id for seat in seats_to_remove.values()),
                 course_run_key,
             )
-        seats_to_remove.delete()
+            Seat.everything.filter(pk__in=[seat.pk for seat in seats_to_remove.values()]).delete()
+            for seat_key in seats_to_remove:
+                del course_run_seats[seat_key]
+
+        return success
 
-    def update_seat(self, course_run, product_body):
+    def update_seat(self, course_run, product_body, seats, updates):
+        """
+        Arguments:
+            course_run (CourseRun): The course run the seat is for
+            product_body (dict): Seat product data from ecommerce
+            seats (dict): The course run's seats, by (type, credit provider, currency)
+            updates (PendingUpdates): Where the seats to create and update are collected
+
+        Returns:
+            bool: True if the seat was loaded.
+        """
         stock_record = product_body['stockrecords'][0]
         currency_code = stock_record['price_currency']
         price = Decimal(stock_record['price_excl_tax'])
         sku = stock_record['partner_sku']
 
-        try:
-            currency = Currency.objects.get(code=currency_code)
-        except Currency.DoesNotExist:
+        currency = self.currencies.get(currency_code)
+        if currency is None:
             logger.warning("Could not find currency [%s]", currency_code)
-            return
+            return False
 
-        attributes = {attribute['name']: attribute['value'] for attribute in product_body['attribute_values']}
+        attributes = self._get_attributes(product_body)
 
         certificate_type = attributes.get('certificate_type', Seat.AUDIT)
-        try:
-            seat_type = SeatType.objects.get(slug=certificate_type)
-        except SeatType.DoesNotExist:
+        seat_type = self.seat_types.get(certificate_type)
+        if seat_type is None:
             msg = ('Could not find seat type {seat_type} while loading seat with sku {sku} for course run with key '
                    '{key}'.format(seat_type=certificate_type, sku=sku, key=course_run.key))
             logger.warning(msg)
             self.processing_failure_occurred = True
-            return
-        if not course_run.type.empty and not course_run.type.tracks.filter(seat_type=seat_type).exists():
+            return False
+
+        run_type = self.course_run_types.get(course_run.type_id)
+        if not run_type.empty and seat_type.pk not in {track.seat_type_id for track in run_type.tracks.all()}:
             logger.warning(
                 'Seat type {seat_type} is not compatible with course run type {run_type} for course run {key}'.format(
-                    seat_type=seat_type.slug, run_type=course_run.type.slug, key=course_run.key,
+                    seat_type=seat_type.slug, run_type=run_type.slug, key=course_run.key,
                 )
             )
             self.processing_failure_occurred = True
-            return
+            return False
 
         credit_provider = attributes.get('credit_provider')
 
@@ -583,20 +865,22 @@ class EcommerceApiDataLoader(AbstractDataLoader):
         defaults = {
             'price': price,
             'sku': sku,
-            'upgrade_deadline': self.parse_date(product_body.get('expires')),
+            '_upgrade_deadline': self.parse_date(product_body.get('expires')),
             'credit_hours': credit_hours,
         }
 
-        _, created = course_run.seats.update_or_create(
-            type=seat_type,
-            credit_provider=credit_provider,
-            currency=currency,
-            defaults=defaults
-        )
-
-        if created:
+        seat_key = (seat_type.slug, credit_provider, currency.code)
+        seat = seats.get(seat_key)
+        if seat is None:
+            seat = seats[seat_key] = Seat(
+                course_run=course_run, type=seat_type, credit_provider=credit_provider, currency=currency
+            )
+            updates.create(seat)
             logger.info('Created seat for course with key [%s] and sku [%s].', course_run.key, sku)
 
+        updates.update(seat, defaults)
+        return True
+
     def validate_stockrecord(self, stockrecords, title, product_class):
         """
         Argument:
@@ -647,9 +931,7 @@ class EcommerceApiDataLoader(AbstractDataLoader):
             logger.warning(msg)
             return None
 
-        try:
-            Currency.objects.get(code=currency_code)
-        except Currency.DoesNotExist:
+        if self.currencies.get(currency_code) is None:
             msg = 'Could not find currency {code} while loading {product} {title} with sku {sku}'.format(
                 product=product_class['value'], code=currency_code, title=title, sku=sku
             )
@@ -659,14 +941,16 @@ class EcommerceApiDataLoader(AbstractDataLoader):
         # All validation checks passed!
         return True
 
-    def update_entitlement(self, body):
+    def update_entitlement(self, body, entitlements, updates):
         """
         Argument:
             body (dict): entitlement product data from ecommerce
+            entitlements (dict): Existing entitlements, as returned by _get_entitlements(). New ones are added.
+            updates (PendingUpdates): Where the entitlements to create and update are collected
         Returns:
             entitlement product sku if no exceptions, else None
         """
-        attributes = {attribute['name']: attribute['value'] for attribute in body['attribute_values']}
+        attributes = self._get_attributes(body)
         course_uuid = attributes.get('UUID')
         title = body['title']
         stockrecords = body['stockrecords']
@@ -679,18 +963,16 @@ class EcommerceApiDataLoader(AbstractDataLoader):
         price = Decimal(stock_record['price_excl_tax'])
         sku = stock_record['partner_sku']
 
-        try:
-            course = Course.objects.get(uuid=course_uuid)
-        except Course.DoesNotExist:
+        course = self.courses.get(course_uuid)
+        if course is None:
             msg = 'Could not find course {uuid} while loading entitlement {title} with sku {sku}'.format(
                 uuid=course_uuid, title=title, sku=sku
             )
             logger.warning(msg)
             return None
 
-        try:
-            currency = Currency.objects.get(code=currency_code)
-        except Currency.DoesNotExist:
+        currency = self.currencies.get(currency_code)
+        if currency is None:
             msg = 'Could not find currency {code} while loading entitlement {title} with sku {sku}'.format(
                 code=currency_code, title=title, sku=sku
             )
@@ -698,35 +980,46 @@ class EcommerceApiDataLoader(AbstractDataLoader):
             return None
 
         mode_name = attributes.get('certificate_type')
-        try:
-            mode = SeatType.objects.get(slug=mode_name)
-        except SeatType.DoesNotExist:
+        mode = self.seat_types.get(mode_name)
+        if mode is None:
             msg = 'Could not find mode {mode} while loading entitlement {title} with sku {sku}'.format(
                 mode=mode_name, title=title, sku=sku
             )
             logger.warning(msg)
             self.processing_failure_occurred = True
             return None
-        if not course.type.empty and mode not in course.type.entitlement_types.all():
+
+        course_type = self.course_types.get(course.type_id)
+        if not course_type.empty and mode not in course_type.entitlement_types.all():
             logger.warning(
                 'Seat type {seat_type} is not compatible with course type {course_type} for course {uuid}'.format(
-                    seat_type=mode.slug, course_type=course.type.slug, uuid=course_uuid,
+                    seat_type=mode.slug, course_type=course_type.slug, uuid=course_uuid,
                 )
             )
             self.processing_failure_occurred = True
             return None
 
         defaults = {
-            'partner': self.partner,
+            'partner_id': self.partner.pk,
             'price': price,
-            'currency': currency,
+            'currency_id': currency.code,
             'sku': sku,
         }
         msg = 'Creating entitlement {title} with sku {sku} for partner {partner}'.format(
             title=title, sku=sku, partner=self.partner
         )
         logger.info(msg)
-        course.entitlements.update_or_create(mode=mode, defaults=defaults)
+
+        if course.pk not in entitlements:
+            entitlements.update(self._get_entitlements([course]))
+        course_entitlements = entitlements[course.pk]
+
+        entitlement = course_entitlements.get(mode.pk)
+        if entitlement is None:
+            entitlement = course_entitlements[mode.pk] = CourseEntitlement(course=course, mode=mode)
+            updates.create(entitlement)
+
+        updates.update(entitlement, defaults)
         return sku
 
     def update_enrollment_code(self, body):
@@ -747,9 +1040,11 @@ class EcommerceApiDataLoader(AbstractDataLoader):
         stock_record = stockrecords[0]
         sku = stock_record['partner_sku']
 
-        try:
-            course_run = CourseRun.objects.get(key=course_key)
-        except CourseRun.DoesNotExist:
+        course_run = self.course_runs.get(course_key)
+        if course_run is not None and course_run.key != course_key:
+            # The lookup table ignores case, but enrollment codes' course keys must match exactly.
+            course_run = CourseRun.objects.filter(key=course_key).first()
+        if course_run is None:
             msg = 'Could not find course run {key} while loading enrollment code {title} with sku {sku}'.format(
                 key=course_key, title=title, sku=sku
             )
@@ -786,12 +1081,13 @@ class EcommerceApiDataLoader(AbstractDataLoader):
 
 class ProgramsApiDataLoader(AbstractDataLoader):
     """ Loads programs from the Programs API. """
+    RECORD_SOURCES = ('programs_api',)
     image_width = 1440
     image_height = 480
     XSERIES = None
 
-    def __init__(self, partner, api_url, max_workers=None, is_threadsafe=False):
-        super(ProgramsApiDataLoader, self).__init__(partner, api_url, max_workers, is_threadsafe)
+    def __init__(self, partner, api_url, max_workers=None, is_threadsafe=False, force=False):
+        super(ProgramsApiDataLoader, self).__init__(partner, api_url, max_workers, is_threadsafe, force)
         self.XSERIES = ProgramType.objects.get(translations__name_t='XSeries')
 
     def ingest(self):
@@ -803,7 +1099,7 @@ class ProgramsApiDataLoader(AbstractDataLoader):
 
         while page:
             params = {'page': page, 'page_size': self.PAGE_SIZE}
-            response = self.api_client.get(self.api_url + '/programs/', params=params).json()
+            response = self.api_get(self.api_url + '/programs/', params=params).json()
             count = response['count']
             results = response['results']
             logger.info('Retrieved %d programs...', len(results))
@@ -813,16 +1109,50 @@ class ProgramsApiDataLoader(AbstractDataLoader):
             else:
                 page = None
 
-            for program in results:
+            record_hashes = self.record_hashes['programs_api']
+            changed, skipped = record_hashes.get_changed([(program.get('uuid'), program) for program in results])
+            processed = {}
+            for uuid, program, content_hash in changed:
                 program = self.clean_strings(program)
-                self.update_program(program)
+                if self.update_program(program):
+                    processed[uuid] = content_hash
+
+            record_hashes.save(processed)
+            skipped = set(skipped)
+            self._update_skipped_programs([program for program in results if program.get('uuid') in skipped])
 
         logger.info('Retrieved %d programs from %s.', count, api_url)
 
+    def _update_skipped_programs(self, bodies):
+        """
+        Bring the courses and excluded course runs of unchanged programs up to date.
+
+        They're derived from the course runs loaded locally, which may have changed since the program was loaded:
+        new runs of its courses must be excluded, and run modes whose courses didn't exist yet must be linked.
+        """
+        if not bodies:
+            return
+
+        programs = Program.objects.filter(partner=self.partner, uuid__in=[body['uuid'] for body in bodies])
+        programs = {str(program.uuid): program for program in programs}
+        for body in bodies:
+            program = programs.get(str(body['uuid']))
+            if program is None:
+                continue
+
+            try:
+                self._update_program_courses_and_runs(body, program)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to update the courses of program %s', body['uuid'])
+
     def _get_uuid(self, body):
         return body['uuid']
 
     def update_program(self, body):
+        """
+        Returns:
+            bool: True if the program was loaded, with all of its organizations.
+        """
         uuid = self._get_uuid(body)
 
         try:
@@ -840,12 +1170,14 @@ class ProgramsApiDataLoader(AbstractDataLoader):
                 partner=self.partner,
                 defaults=defaults
             )
-            self._update_program_organizations(body, program)
+            organizations_valid = self._update_program_organizations(body, program)
             self._update_program_courses_and_runs(body, program)
             self._update_program_banner_image(body, program)
             program.save()
+            return organizations_valid
         except Exception:  # pylint: disable=broad-except
             logger.exception('Failed to load program %s', uuid)
+            return False
 
     def _update_program_courses_and_runs(self, body, program):
         course_run_keys = set()
@@ -854,26 +1186,33 @@ class ProgramsApiDataLoader(AbstractDataLoader):
 
         # The course_code key field is technically useless, so we must build the course list from the
         # associated course runs.
-        courses = Course.objects.filter(course_runs__key__in=course_run_keys).distinct()
-        program.courses.clear()
-        program.courses.add(*courses)
+        courses = list(Course.objects.filter(course_runs__key__in=course_run_keys).distinct())
+        self._replace_related(program.courses, courses)
 
         # Do a diff of all the course runs and the explicitly-associated course runs to determine
         # which course runs should be explicitly excluded.
         excluded_course_runs = CourseRun.objects.filter(course__in=courses).exclude(key__in=course_run_keys)
-        program.excluded_course_runs.clear()
-        program.excluded_course_runs.add(*excluded_course_runs)
+        self._replace_related(program.excluded_course_runs, list(excluded_course_runs))
+
+    @staticmethod
+    def _replace_related(manager, objects):
+        # Only rewritten when they differ, since every change invalidates caches, documents, and the search index.
+        if set(manager.values_list('pk', flat=True)) != {obj.pk for obj in objects}:
+            manager.clear()
+            manager.add(*objects)
 
     def _update_program_organizations(self, body, program):
         uuid = self._get_uuid(body)
         org_keys = [org['key'] for org in body['organizations']]
         organizations = Organization.objects.filter(key__in=org_keys, partner=self.partner)
 
-        if len(org_keys) != organizations.count():
+        valid = len(org_keys) == organizations.count()
+        if not valid:
             logger.error('Organizations for program [%s] are invalid!', uuid)
 
         program.authoring_organizations.clear()
         program.authoring_organizations.add(*organizations)
+        return valid
 
     def _get_banner_image_url(self, body):
         image_key = 'w{width}h{height}'.format(width=self.image_width, height=self.image_height)
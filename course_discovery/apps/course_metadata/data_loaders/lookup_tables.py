@@ -0,0 +1,60 @@
+"""
+In-memory lookup tables of the rows the data loaders match upstream records against.
+
+Loaders which would otherwise look up the same handful of currencies, seat types, courses, and course runs once per
+upstream record load them in bulk when they start instead, and only go to the database for the rows they don't have.
+"""
+import threading
+
+
+class LookupTable:
+    """
+    An index of rows by one of their fields.
+
+    Keys which aren't in the table (e.g. rows created since it was loaded) are looked up in the database when they're
+    asked for, and added to the table if found. Misses aren't remembered, so rows created later are still found.
+    """
+
+    def __init__(self, queryset, field, lookup=None, normalize=None):
+        """
+        Arguments:
+            queryset (QuerySet): The rows to look keys up in.
+            field (str): The field whose values are the keys.
+            lookup (str): The lookup used to find missing keys in the queryset. Defaults to an exact match.
+            normalize (callable): Applied to keys before they're compared, e.g. to make them case insensitive.
+        """
+        self.queryset = queryset
+        self.field = field
+        self.lookup = lookup or field
+        self.normalize = normalize or (lambda key: key)
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def load(self, queryset=None):
+        """
+        Replace the contents of the table with the rows of the given queryset, or of the whole table's queryset.
+        """
+        queryset = self.queryset if queryset is None else queryset
+        rows = {self.normalize(getattr(row, self.field)): row for row in queryset}
+        with self._lock:
+            self._rows = rows
+
+    def get(self, key):
+        """
+        Return the row with the given key, or None if there isn't one.
+        """
+        if key is None:
+            return None
+
+        normalized_key = self.normalize(key)
+        row = self._rows.get(normalized_key)
+        if row is None:
+            try:
+                row = self.queryset.get(**{self.lookup: key})
+            except self.queryset.model.DoesNotExist:
+                return None
+
+            with self._lock:
+                self._rows[normalized_key] = row
+
+        return row
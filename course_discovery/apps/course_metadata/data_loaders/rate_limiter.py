@@ -0,0 +1,179 @@
+"""
+Rate limiting of the HTTP requests made by the data loaders.
+
+The APIs the data loaders read from (e.g. the LMS Courses API) throttle their clients. Rather than sleeping for a
+fixed time between requests, every request is made through a token bucket shared by all of the loaders that call
+the same host, which slows down when the API reports it's overloaded and speeds back up when it isn't.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+
+from django.utils.http import parse_http_date_safe
+
+logger = logging.getLogger(__name__)
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_retry_after(response):
+    """
+    Return the number of seconds the Retry-After header of the response asks clients to wait, or None.
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        # An HTTP date, rather than a number of seconds.
+        timestamp = parse_http_date_safe(value)
+        return max(timestamp - time.time(), 0) if timestamp is not None else None
+
+
+class RateLimiter:
+    """
+    An adaptive token bucket rate limiter.
+
+    Tokens are added at the current rate, up to ``burst``, and every request takes one, waiting for it if the
+    bucket is empty. Throttled responses (429 and 504) halve the rate, down to ``min_rate``, and pause every
+    caller for as long as the response's Retry-After header asks. Each successful response then raises the
+    rate back toward ``max_rate`` by a fixed step, so the callers settle just under the API's actual limit.
+
+    Rates are in requests per second. Request counts, throttled responses, and the time spent waiting are
+    recorded per endpoint.
+    """
+    THROTTLED_STATUS_CODES = (429, 504)
+    # The fraction of max_rate the rate is raised by after each successful response.
+    RECOVERY_STEP = 0.05
+    MAX_TRIES = 5
+
+    def __init__(self, max_rate, burst=None, min_rate=None, clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = max_rate
+        self.min_rate = min_rate or max_rate / 16
+        self.burst = burst or max(max_rate * 60, 1)
+        self.rate = max_rate
+        self.tokens = self.burst
+        self.resume_at = 0
+
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self._stats = defaultdict(Counter)
+
+    def _refill(self, now):
+        # Tokens don't accrue while requests are paused.
+        elapsed = now - max(self._updated, self.resume_at)
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """
+        Wait until a request can be made.
+
+        The token is taken right away, leaving a deficit if the bucket is empty, so the callers waiting on the
+        rate limiter are spaced out by the rate rather than all resuming at once.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.tokens -= 1
+            wait = max(self.resume_at - now, 0) + max(-self.tokens, 0) / self.rate
+
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def record(self, endpoint, status_code, waited=0, retry_after=None):
+        """
+        Record the response to a request, and adapt the rate to it.
+        """
+        with self._lock:
+            stats = self._stats[endpoint]
+            stats['requests'] += 1
+            stats['wait_seconds'] += waited
+
+            if status_code in self.THROTTLED_STATUS_CODES:
+                stats['throttled'] += 1
+                self.rate = max(self.rate / 2, self.min_rate)
+                # Spend the burst, so that requests resume at the reduced rate.
+                self.tokens = min(self.tokens, 0)
+
+                if retry_after:
+                    self.resume_at = max(self.resume_at, self._clock() + retry_after)
+            else:
+                self.rate = min(self.rate + self.max_rate * self.RECOVERY_STEP, self.max_rate)
+
+    def request(self, send, url, **kwargs):
+        """
+        Make a request through the rate limiter, retrying throttled responses up to MAX_TRIES times.
+
+        Arguments:
+            send (callable): Makes the request, e.g. an API client's ``get``, and returns its response.
+            url (str): The URL to request.
+
+        Returns:
+            The last response, whether or not it was throttled.
+        """
+        endpoint = urlparse(url).path
+        for attempt in range(1, self.MAX_TRIES + 1):
+            waited = self.acquire()
+            response = send(url, **kwargs)
+            self.record(endpoint, response.status_code, waited=waited, retry_after=get_retry_after(response))
+
+            if response.status_code not in self.THROTTLED_STATUS_CODES or attempt == self.MAX_TRIES:
+                return response
+
+            logger.info(
+                'Request to [%s] was throttled with status [%d] (attempt %d of %d). Request rate is now %.2f/s.',
+                endpoint, response.status_code, attempt, self.MAX_TRIES, self.rate
+            )
+
+        return response  # pragma: no cover
+
+    def get_stats(self):
+        """
+        Return the request statistics of each endpoint.
+
+        Returns:
+            dict: Endpoint path to a dict of requests, throttled, and wait_seconds.
+        """
+        with self._lock:
+            return {
+                endpoint: {
+                    'requests': stats['requests'],
+                    'throttled': stats['throttled'],
+                    'wait_seconds': round(stats['wait_seconds'], 2),
+                }
+                for endpoint, stats in self._stats.items()
+            }
+
+
+def get_rate_limiter(url, requests_per_minute):
+    """
+    Return the rate limiter shared by every request made to the host of the given URL (within this process).
+    """
+    host = urlparse(url).netloc
+    max_rate = requests_per_minute / 60
+
+    with _rate_limiters_lock:
+        rate_limiter = _rate_limiters.get(host)
+        if rate_limiter is None or rate_limiter.max_rate != max_rate:
+            rate_limiter = _rate_limiters[host] = RateLimiter(max_rate)
+
+    return rate_limiter
+
+
+def reset_rate_limiters():
+    """ Discard the rate limiters, and with them their state and statistics. """
+    with _rate_limiters_lock:
+        _rate_limiters.clear()
@@ -0,0 +1,124 @@
+"""
+Change detection for the records the data loaders read from upstream APIs.
+
+Most records are identical from one refresh to the next. Each loader stores a hash of every record it processes
+successfully, keyed by source (e.g. courses_api) and the record's ID in that source, and skips the records whose
+hash hasn't changed by the next refresh before doing any ORM work for them.
+"""
+import hashlib
+import json
+import threading
+
+from django.utils import timezone
+
+from course_discovery.apps.course_metadata.models import DataLoaderRecordHash
+
+# Changing this makes every record's hash change, so that everything is processed again by the next refresh.
+# Bump it whenever the way a loader processes records changes. Local data a record's processing depends on, which
+# can change between refreshes, must be passed as its record context instead.
+HASH_VERSION = 1
+
+
+def get_content_hash(body, context=None):
+    """
+    Return a stable hash of an upstream record.
+
+    Arguments:
+        body (dict): The record, as returned by the API.
+        context: Anything else the result of processing the record depends on (e.g. partner configuration).
+    """
+    content = json.dumps([HASH_VERSION, context, body], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+class RecordHashes:
+    """
+    The stored hashes of one partner's records from one source, and counts of the records processed and skipped.
+
+    Records are filtered and their hashes stored a page at a time. Loaders only store the hashes of the records they
+    processed without errors, so that failed records are retried by the next refresh.
+    """
+
+    def __init__(self, partner, source, force=False, context=None):
+        """
+        Arguments:
+            partner (Partner): Partner whose records these are.
+            source (str): The API and kind of record, e.g. courses_api.
+            force (bool): If True, no records are skipped, though their hashes are still stored.
+            context: Passed to get_content_hash with each record.
+        """
+        self.partner = partner
+        self.source = source
+        self.force = force
+        self.context = context
+        self.processed = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def _get_queryset(self, record_ids):
+        return DataLoaderRecordHash.objects.filter(partner=self.partner, source=self.source, record_id__in=record_ids)
+
+    def get_changed(self, records, record_contexts=None, missing_ids=None):
+        """
+        Filter a page of records down to the ones that changed since they were last processed.
+
+        Arguments:
+            records (list): (record ID, body) tuples. Records without an ID are always processed.
+            record_contexts (dict): Record ID to anything else the result of processing that record depends on,
+                e.g. the type of the local course run it's validated against. Hashed along with the record.
+            missing_ids (set): IDs of records whose local data no longer exists, e.g. because it was deleted.
+                These are processed even if they haven't changed.
+
+        Returns:
+            tuple: A list of (record ID, body, content hash) tuples of the records to process, and a list of the IDs
+                of the records which were skipped.
+        """
+        stored = {}
+        if not self.force:
+            record_ids = {record_id for record_id, __ in records if record_id is not None}
+            stored = dict(self._get_queryset(record_ids).values_list('record_id', 'content_hash'))
+
+        missing_ids = missing_ids or set()
+        changed = []
+        skipped = []
+        for record_id, body in records:
+            context = self.context
+            if record_contexts is not None:
+                context = [self.context, record_contexts.get(record_id)]
+            content_hash = get_content_hash(body, context)
+            if record_id is not None and stored.get(record_id) == content_hash and record_id not in missing_ids:
+                skipped.append(record_id)
+            else:
+                changed.append((record_id, body, content_hash))
+
+        with self._lock:
+            self.processed += len(changed)
+            self.skipped += len(skipped)
+
+        return changed, skipped
+
+    def save(self, hashes):
+        """
+        Store the hashes of records which were processed successfully.
+
+        Arguments:
+            hashes (dict): Record ID to content hash.
+        """
+        hashes = {record_id: content_hash for record_id, content_hash in hashes.items() if record_id is not None}
+        if not hashes:
+            return
+
+        now = timezone.now()
+        # The IDs are compared exactly, whatever the database collation.
+        existing = [record_hash for record_hash in self._get_queryset(hashes) if record_hash.record_id in hashes]
+        for record_hash in existing:
+            record_hash.content_hash = hashes.pop(record_hash.record_id)
+            record_hash.modified = now
+
+        DataLoaderRecordHash.objects.bulk_update(existing, ['content_hash', 'modified'])
+        # Conflicts are only possible when the same record appears on two pages processed at once. Either hash will do.
+        DataLoaderRecordHash.objects.bulk_create([
+            DataLoaderRecordHash(partner=self.partner, source=self.source, record_id=record_id,
+                                 content_hash=content_hash)
+            for record_id, content_hash in hashes.items()
+        ], ignore_conflicts=True)
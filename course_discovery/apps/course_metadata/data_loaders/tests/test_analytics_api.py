@@ -1,5 +1,6 @@
 import json
 
+import mock
 import responses
 from django.test import TestCase
 
@@ -9,6 +10,8 @@ from course_discovery.apps.course_metadata.data_loaders.tests.mixins import Data
 from course_discovery.apps.course_metadata.models import Course, CourseRun, Program
 from course_discovery.apps.course_metadata.tests.factories import CourseFactory, CourseRunFactory, ProgramFactory
 
+LOGGER_PATH = 'course_discovery.apps.course_metadata.data_loaders.analytics_api.logger'
+
 
 class AnalyticsAPIDataLoaderTests(DataLoaderTestMixin, TestCase):
     @property
@@ -48,10 +51,7 @@ class AnalyticsAPIDataLoaderTests(DataLoaderTestMixin, TestCase):
         program = ProgramFactory()
         program.courses.set(courses.values())  # pylint: disable=no-member
 
-    @responses.activate
-    def test_ingest(self):
-        self._define_course_metadata()
-
+    def _mock_course_summaries_api(self):
         url = '{root_url}course_summaries/'.format(root_url=self.api_url)
         responses.add(
             method=responses.GET,
@@ -60,6 +60,11 @@ class AnalyticsAPIDataLoaderTests(DataLoaderTestMixin, TestCase):
             match_querystring=False,
             content_type=JSON
         )
+
+    @responses.activate
+    def test_ingest(self):
+        self._define_course_metadata()
+        self._mock_course_summaries_api()
         self.loader.ingest()
 
         # For runs, let's just confirm that enrollment counts were recorded and add up counts for courses
@@ -92,3 +97,28 @@ class AnalyticsAPIDataLoaderTests(DataLoaderTestMixin, TestCase):
         programs = Program.objects.all()
         self.assertEqual(programs[0].enrollment_count, expected_program_enrollment_count)
         self.assertEqual(programs[0].recent_enrollment_count, expected_program_recent_enrollment_count)
+
+    @responses.activate
+    def test_ingest_writes_changed_counts_in_bulk(self):
+        """ Verify counts are written without history records, and only when they've changed. """
+        self._define_course_metadata()
+        CourseRunFactory(key='00test/99test/00test')
+        self._mock_course_summaries_api()
+        history_counts = [model.history.count() for model in (Course, CourseRun, Program)]
+
+        with mock.patch(LOGGER_PATH) as mock_logger:
+            self.loader.ingest()
+            mock_logger.info.assert_called_with(
+                'Updated the enrollment counts of %d of %d course runs, %d of %d courses, and %d of %d programs.',
+                6, 6, 3, 3, 1, 1
+            )
+
+        self.assertEqual([model.history.count() for model in (Course, CourseRun, Program)], history_counts)
+        self.assertEqual(CourseRun.objects.get(key='00test/99test/00test').enrollment_count, 0)
+
+        with mock.patch(LOGGER_PATH) as mock_logger:
+            self.loader.ingest()
+            mock_logger.info.assert_called_with(
+                'Updated the enrollment counts of %d of %d course runs, %d of %d courses, and %d of %d programs.',
+                0, 6, 0, 3, 0, 1
+            )
@@ -1,27 +1,30 @@
 import datetime
 import json
 from decimal import Decimal
+from urllib.parse import urlparse
 
 import ddt
 import mock
 import pytz
 import responses
 from django.core.management import CommandError
-from django.http.response import HttpResponse
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_save, pre_save
 from django.test import TestCase
 from edx_django_utils.cache import TieredCache
 from pytz import UTC
-from slumber.exceptions import HttpClientError
 
 from course_discovery.apps.core.tests.utils import mock_api_callback, mock_jpeg_callback
 from course_discovery.apps.course_metadata.choices import CourseRunPacing, CourseRunStatus
 from course_discovery.apps.course_metadata.data_loaders.api import (
     AbstractDataLoader, CoursesApiDataLoader, EcommerceApiDataLoader, ProgramsApiDataLoader
 )
+from course_discovery.apps.course_metadata.data_loaders.rate_limiter import RateLimiter
 from course_discovery.apps.course_metadata.data_loaders.tests import JPEG, JSON, mock_data
 from course_discovery.apps.course_metadata.data_loaders.tests.mixins import DataLoaderTestMixin
 from course_discovery.apps.course_metadata.models import (
-    Course, CourseEntitlement, CourseRun, CourseRunType, CourseType, Organization, Program, ProgramType, Seat, SeatType
+    Course, CourseEntitlement, CourseRun, CourseRunType, CourseType, DataLoaderRecordHash, Organization, Program,
+    ProgramType, Seat, SeatType
 )
 from course_discovery.apps.course_metadata.tests.factories import (
     CourseEntitlementFactory, CourseFactory, CourseRunFactory, OrganizationFactory, SeatFactory, SeatTypeFactory
@@ -56,6 +59,38 @@ class AbstractDataLoaderTest(TestCase):
         dt = datetime.datetime.utcnow()
         self.assertEqual(AbstractDataLoader.parse_date(dt.isoformat()), dt)
 
+    def test_bulk_update_signals(self):
+        """ Verify bulk updates send pre_save and post_save, and reset the values did_change() compares against. """
+        course_run = CourseRunFactory(title_override='Old')
+        course_run.title_override = 'New'
+        receiver = mock.Mock()
+        pre_save.connect(receiver, sender=CourseRun)
+        post_save.connect(receiver, sender=CourseRun)
+
+        try:
+            AbstractDataLoader.bulk_update(CourseRun, [course_run], ['title_override'])
+        finally:
+            pre_save.disconnect(receiver, sender=CourseRun)
+            post_save.disconnect(receiver, sender=CourseRun)
+
+        self.assertEqual([call[1]['signal'] for call in receiver.call_args_list], [pre_save, post_save])
+        self.assertEqual(CourseRun.objects.get(pk=course_run.pk).title_override, 'New')
+        self.assertFalse(course_run.did_change('title_override'))
+
+    def test_bulk_update_pre_save_validation(self):
+        """ Verify a pre_save receiver rejecting an instance aborts the bulk update. """
+        course_run = CourseRunFactory(title_override='Old')
+        course_run.title_override = 'New'
+
+        with mock.patch('course_discovery.apps.course_metadata.signals.'
+                        'check_course_runs_within_course_for_duplicate_external_key',
+                        side_effect=ValidationError('Duplicate external key')):
+            course_run.external_key = 'duplicate'
+            with self.assertRaises(ValidationError):
+                AbstractDataLoader.bulk_update(CourseRun, [course_run], ['title_override', 'external_key'])
+
+        self.assertEqual(CourseRun.objects.get(pk=course_run.pk).title_override, 'Old')
+
 
 @ddt.ddt
 class CoursesApiDataLoaderTests(DataLoaderTestMixin, TestCase):
@@ -77,13 +112,21 @@ class CoursesApiDataLoaderTests(DataLoaderTestMixin, TestCase):
         )
         return bodies
 
-    def test_fatal_code(self):
-        response_with_200 = HttpResponse(status=200)
-        response_with_429 = HttpResponse(status=429)
-        response_with_504 = HttpResponse(status=504)
-        self.assertTrue(self.loader_class._fatal_code(HttpClientError(response=response_with_200)))  # pylint: disable=protected-access
-        self.assertFalse(self.loader_class._fatal_code(HttpClientError(response=response_with_429)))  # pylint: disable=protected-access
-        self.assertFalse(self.loader_class._fatal_code(HttpClientError(response=response_with_504)))  # pylint: disable=protected-access
+    @responses.activate
+    @ddt.data(429, 504)
+    def test_throttled_request_retried(self, status):
+        """ Verify throttled requests are retried by the rate limiter, which slows down in response. """
+        self.loader.rate_limiter = RateLimiter(max_rate=1000)
+        responses.add(responses.GET, self.api_url + 'courses/', status=status, headers={'Retry-After': '0'})
+        bodies = self.mock_api()
+
+        response = self.loader._make_request(1)  # pylint: disable=protected-access
+
+        self.assertEqual(len(response['results']), len(bodies))
+        self.assertLess(self.loader.rate_limiter.rate, 1000)
+        self.assertEqual(self.loader.rate_limiter.get_stats(), {
+            urlparse(self.api_url).path + 'courses/': {'requests': 2, 'throttled': 1, 'wait_seconds': 0.0},
+        })
 
     def assert_course_run_loaded(self, body, partner_uses_publisher=True, draft=False, new_pub=False):
         """ Assert a CourseRun corresponding to the specified data body was properly loaded into the database. """
@@ -215,7 +258,9 @@ class CoursesApiDataLoaderTests(DataLoaderTestMixin, TestCase):
         expected_num_course_runs = len(api_data)
         self.assertEqual(CourseRun.objects.count(), expected_num_course_runs)
 
-        # Verify multiple calls to ingest data do NOT result in data integrity errors.
+        # Verify multiple calls to ingest data do NOT result in data integrity errors. The runs were changed here,
+        # rather than upstream, so the unchanged records must not be skipped.
+        self.loader.record_hashes['courses_api'].force = True
         self.loader.ingest()
         calls = [
             mock.call(run2),
@@ -227,6 +272,75 @@ class CoursesApiDataLoaderTests(DataLoaderTestMixin, TestCase):
         # Make sure the credit seat with a course run end date is unchanged
         self.assertIsNone(run3.seats.first().upgrade_deadline)
 
+    @responses.activate
+    def test_ingest_updates_in_bulk(self):
+        """ Verify changed runs are written in bulk, rather than saved one at a time, and still send post_save. """
+        api_data = self.mock_api()
+        self.loader.ingest()
+
+        CourseRun.objects.update(title_override='Stale')
+        self.loader.record_hashes['courses_api'].force = True
+        history_count = CourseRun.history.count()
+        receiver = mock.Mock()
+        post_save.connect(receiver, sender=CourseRun)
+
+        try:
+            with mock.patch.object(CourseRun, 'save') as mock_save:
+                self.loader.ingest()
+        finally:
+            post_save.disconnect(receiver, sender=CourseRun)
+
+        mock_save.assert_not_called()
+        self.assertEqual(receiver.call_count, len(api_data))
+        self.assertEqual(CourseRun.history.count(), history_count + len(api_data))
+        for datum in api_data:
+            self.assertEqual(CourseRun.objects.get(key=datum['id']).title_override, datum['name'])
+
+    @responses.activate
+    def test_ingest_skips_unchanged_records(self):
+        """ Verify records which haven't changed since they were last loaded are skipped, unless forced. """
+        api_data = self.mock_api()
+        self.loader.ingest()
+
+        record_hashes = self.loader.record_hashes['courses_api']
+        self.assertEqual((record_hashes.processed, record_hashes.skipped), (len(api_data), 0))
+
+        CourseRun.objects.update(title_override='Stale')
+        self.loader.ingest()
+        self.assertEqual((record_hashes.processed, record_hashes.skipped), (len(api_data), len(api_data)))
+        self.assertEqual(set(CourseRun.objects.values_list('title_override', flat=True)), {'Stale'})
+
+        record_hashes.force = True
+        self.loader.ingest()
+        self.assertEqual(record_hashes.processed, 2 * len(api_data))
+        for datum in api_data:
+            self.assertEqual(CourseRun.objects.get(key=datum['id']).title_override, datum['name'])
+
+    @responses.activate
+    def test_ingest_recreates_deleted_runs(self):
+        """ Verify unchanged records are loaded again if their course runs were deleted locally. """
+        api_data = self.mock_api()
+        self.loader.ingest()
+
+        deleted_key = api_data[0]['id']
+        Course.everything.update(canonical_course_run=None)
+        CourseRun.everything.filter(key=deleted_key).delete()
+
+        record_hashes = self.loader.record_hashes['courses_api']
+        self.loader.ingest()
+        self.assertEqual((record_hashes.processed, record_hashes.skipped), (len(api_data) + 1, len(api_data) - 1))
+        self.assertTrue(CourseRun.objects.filter(key=deleted_key).exists())
+
+    @responses.activate
+    def test_ingest_exception_handling_retries_records(self):
+        """ Verify the hashes of records which failed to load aren't stored, so they're loaded by the next run. """
+        self.mock_api()
+
+        with mock.patch.object(self.loader, 'clean_strings', side_effect=Exception):
+            self.loader.ingest()
+
+        self.assertFalse(DataLoaderRecordHash.objects.exists())
+
     @responses.activate
     def test_ingest_exception_handling(self):
         """ Verify the data loader properly handles exceptions during processing of the data from the API. """
@@ -755,8 +869,54 @@ class EcommerceApiDataLoaderTests(DataLoaderTestMixin, TestCase):
         self.assert_entitlements_loaded(products_api_data)
         self.assert_enrollment_codes_loaded(products_api_data)
 
-        # Verify multiple calls to ingest data do NOT result in data integrity errors.
+        # Verify multiple calls to ingest data do NOT result in data integrity errors, and that the products
+        # skipped as unchanged aren't deleted as stale.
+        self.loader.ingest()
+        self.assertGreater(self.loader.record_hashes['ecommerce_entitlements'].skipped, 0)
+        self.assert_entitlements_loaded(products_api_data)
+        self.assert_enrollment_codes_loaded(products_api_data)
+
+    @responses.activate
+    def test_ingest_writes_changed_products_in_bulk(self):
+        """ Verify seats and entitlements are created in bulk, and that unchanged ones aren't written again. """
+        self.mock_courses_api()
+        self.mock_products_api()
+        self.loader.ingest()
+
+        # The IDs of the rows created in bulk are found, and their creation is recorded.
+        created_seat_ids = set(Seat.history.filter(history_type='+').values_list('id', flat=True))
+        self.assertTrue(set(Seat.objects.values_list('pk', flat=True)) <= created_seat_ids)
+        created_entitlement_ids = set(CourseEntitlement.history.filter(history_type='+').values_list('id', flat=True))
+        self.assertTrue(set(CourseEntitlement.objects.values_list('pk', flat=True)) <= created_entitlement_ids)
+
+        seats = dict(Seat.objects.filter(bulk_sku__isnull=True).values_list('pk', 'modified'))
+        entitlement_history_count = CourseEntitlement.history.count()
+        for record_hashes in self.loader.record_hashes.values():
+            record_hashes.force = True
+        self.loader.ingest()
+
+        self.assertEqual(dict(Seat.objects.filter(bulk_sku__isnull=True).values_list('pk', 'modified')), seats)
+        self.assertEqual(CourseEntitlement.history.count(), entitlement_history_count)
+
+    @responses.activate
+    def test_ingest_reprocesses_seats_of_retyped_course_runs(self):
+        """ Verify a course run's seats aren't skipped as unchanged once the type they're validated against changes. """
+        self.mock_courses_api()
+        self.mock_products_api()
+        record_hashes = self.loader.record_hashes['ecommerce_course_runs']
+
+        self.loader.ingest()
+        # Records which failed to load (e.g. for a missing course run) are processed by every refresh.
+        processed = record_hashes.processed
+        self.loader.ingest()
+        reprocessed = record_hashes.processed - processed
+
+        CourseRun.objects.filter(key='verified/course/run').update(
+            type=CourseRunType.objects.get(slug=CourseRunType.CREDIT_VERIFIED_AUDIT)
+        )
+        processed = record_hashes.processed
         self.loader.ingest()
+        self.assertEqual(record_hashes.processed - processed, reprocessed + 1)
 
     @responses.activate
     @mock.patch(LOGGER_PATH)
@@ -1075,3 +1235,42 @@ class ProgramsApiDataLoaderTests(DataLoaderTestMixin, TestCase):
         for program in programs:
             self.assert_program_loaded(program)
             self.assert_program_banner_image_loaded(program)
+
+    @responses.activate
+    def test_ingest_updates_courses_of_unchanged_programs(self):
+        """ Verify the courses and excluded runs of programs skipped as unchanged follow the local course runs. """
+        TieredCache.dangerous_clear_all_tiers()
+        programs = self.mock_api()
+        for program_data in programs:
+            banner_image_url = program_data.get('banner_image_urls', {}).get('w1440h480')
+            if banner_image_url:
+                responses.add_callback(
+                    responses.GET, banner_image_url, callback=mock_jpeg_callback(), content_type=JPEG
+                )
+
+        body = programs[0]
+        run_keys = [run_mode['course_key'] for run_mode in body['course_codes'][0]['run_modes']]
+        missing_course = CourseRun.objects.get(key=run_keys[0]).course
+        missing_course_key = missing_course.key
+        missing_course.delete()
+
+        self.loader.ingest()
+        record_hashes = self.loader.record_hashes['programs_api']
+        self.assertEqual(record_hashes.skipped, 0)
+        program = Program.objects.get(uuid=body['uuid'])
+        self.assertNotIn(missing_course_key, [course.key for course in program.courses.all()])
+
+        # The course is loaded after the program, and another course of the program gets a new run.
+        course = CourseFactory(key=missing_course_key, partner=self.partner)
+        for run_key in run_keys:
+            CourseRunFactory(course=course, key=run_key)
+        other_course = program.courses.first()
+        new_run = CourseRunFactory(course=other_course)
+
+        with mock.patch.object(self.loader, 'update_program', wraps=self.loader.update_program) as mock_update:
+            self.loader.ingest()
+        self.assertNotIn(body['uuid'], [call[0][0]['uuid'] for call in mock_update.call_args_list])
+        self.assertGreater(record_hashes.skipped, 0)
+        self.assertIn(course, program.courses.all())
+        self.assertIn(new_run, program.excluded_course_runs.all())
+        self.assertFalse(program.excluded_course_runs.filter(key__in=run_keys).exists())
@@ -0,0 +1,34 @@
+from django.test import TestCase
+
+from course_discovery.apps.course_metadata.data_loaders.lookup_tables import LookupTable
+from course_discovery.apps.course_metadata.models import CourseRun
+from course_discovery.apps.course_metadata.tests.factories import CourseRunFactory
+
+
+class LookupTableTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.course_run = CourseRunFactory(key='course-v1:edX+DemoX+Demo_Course')
+        self.lookup_table = LookupTable(CourseRun.objects.all(), 'key', lookup='key__iexact', normalize=str.lower)
+
+    def test_get(self):
+        """ Verify loaded rows are found without queries, whatever the case of their keys. """
+        self.lookup_table.load()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lookup_table.get(self.course_run.key), self.course_run)
+            self.assertEqual(self.lookup_table.get(self.course_run.key.upper()), self.course_run)
+            self.assertIsNone(self.lookup_table.get(None))
+
+    def test_get_missing(self):
+        """ Verify rows missing from the table are looked up, and remembered if they're found. """
+        self.lookup_table.load(CourseRun.objects.none())
+        course_run = CourseRunFactory()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.lookup_table.get(course_run.key), course_run)
+            self.assertEqual(self.lookup_table.get(course_run.key), course_run)
+
+        with self.assertNumQueries(2):
+            self.assertIsNone(self.lookup_table.get('course-v1:edX+Missing+Run'))
+            self.assertIsNone(self.lookup_table.get('course-v1:edX+Missing+Run'))
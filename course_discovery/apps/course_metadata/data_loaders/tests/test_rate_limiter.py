@@ -0,0 +1,111 @@
+import mock
+from django.test import SimpleTestCase
+
+from course_discovery.apps.course_metadata.data_loaders.rate_limiter import (
+    RateLimiter, get_rate_limiter, get_retry_after
+)
+
+
+class FakeClock:
+    """ A clock that only moves when something sleeps. """
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def mock_response(status_code, retry_after=None):
+    headers = {'Retry-After': retry_after} if retry_after is not None else {}
+    return mock.Mock(status_code=status_code, headers=headers)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clock = FakeClock()
+
+    def get_rate_limiter(self, max_rate=1, burst=2):
+        return RateLimiter(max_rate, burst=burst, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_acquire(self):
+        """ Verify requests are made right away until the burst is spent, and then at the rate. """
+        rate_limiter = self.get_rate_limiter(max_rate=2)
+
+        self.assertEqual(rate_limiter.acquire(), 0)
+        self.assertEqual(rate_limiter.acquire(), 0)
+        self.assertEqual(rate_limiter.acquire(), 0.5)
+        self.assertEqual(rate_limiter.acquire(), 0.5)
+        self.assertEqual(self.clock.now, 1)
+
+    def test_throttled_responses(self):
+        """ Verify throttled responses halve the rate, and that successful ones raise it back up. """
+        rate_limiter = self.get_rate_limiter(max_rate=1)
+
+        rate_limiter.record('/courses/', 429)
+        self.assertEqual(rate_limiter.rate, 0.5)
+        rate_limiter.record('/courses/', 504)
+        self.assertEqual(rate_limiter.rate, 0.25)
+
+        # The burst is spent, and requests resume at the reduced rate.
+        self.assertEqual(rate_limiter.acquire(), 4)
+
+        for __ in range(40):
+            rate_limiter.record('/courses/', 200)
+        self.assertEqual(rate_limiter.rate, 1)
+
+    def test_minimum_rate(self):
+        rate_limiter = RateLimiter(1, min_rate=0.5)
+        for __ in range(3):
+            rate_limiter.record('/courses/', 429)
+        self.assertEqual(rate_limiter.rate, 0.5)
+
+    def test_retry_after(self):
+        """ Verify every request waits for as long as a throttled response's Retry-After header asks. """
+        rate_limiter = self.get_rate_limiter(max_rate=10, burst=10)
+
+        rate_limiter.record('/courses/', 429, retry_after=30)
+        self.assertEqual(rate_limiter.acquire(), 30.2)
+
+        self.assertEqual(get_retry_after(mock_response(429, '12')), 12)
+        self.assertEqual(get_retry_after(mock_response(429, 'Wed, 21 Oct 2015 07:28:00 GMT')), 0)
+        self.assertIsNone(get_retry_after(mock_response(429, 'soon')))
+        self.assertIsNone(get_retry_after(mock_response(429)))
+
+    def test_request(self):
+        """ Verify throttled requests are retried, and that the requests are recorded per endpoint. """
+        rate_limiter = RateLimiter(1, burst=1, min_rate=1, clock=self.clock, sleep=self.clock.sleep)
+        send = mock.Mock(side_effect=[mock_response(429, '5'), mock_response(200), mock_response(200)])
+
+        response = rate_limiter.request(send, 'http://example.com/api/courses/', params={'page': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(send.call_count, 2)
+        send.assert_called_with('http://example.com/api/courses/', params={'page': 1})
+
+        rate_limiter.request(send, 'http://example.com/api/programs/')
+        self.assertEqual(rate_limiter.get_stats(), {
+            '/api/courses/': {'requests': 2, 'throttled': 1, 'wait_seconds': 6.0},
+            '/api/programs/': {'requests': 1, 'throttled': 0, 'wait_seconds': 1.0},
+        })
+
+    def test_request_gives_up(self):
+        rate_limiter = self.get_rate_limiter(max_rate=1000, burst=1)
+        send = mock.Mock(return_value=mock_response(429, '0'))
+
+        response = rate_limiter.request(send, 'http://example.com/api/courses/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(send.call_count, RateLimiter.MAX_TRIES)
+
+    def test_get_rate_limiter(self):
+        """ Verify loaders calling the same host share a rate limiter. """
+        rate_limiter = get_rate_limiter('http://example.com/api/courses/v1/', 60)
+        self.assertEqual(rate_limiter.max_rate, 1)
+        self.assertIs(get_rate_limiter('http://example.com/api/programs/v1/', 60), rate_limiter)
+        self.assertIsNot(get_rate_limiter('http://other.example.com/api/', 60), rate_limiter)
+
+        # Changing the configured rate replaces the rate limiter.
+        self.assertEqual(get_rate_limiter('http://example.com/api/courses/v1/', 120).max_rate, 2)
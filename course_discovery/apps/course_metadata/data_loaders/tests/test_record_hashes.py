@@ -0,0 +1,73 @@
+from django.test import TestCase
+
+from course_discovery.apps.core.tests.factories import PartnerFactory
+from course_discovery.apps.course_metadata.data_loaders.record_hashes import RecordHashes, get_content_hash
+from course_discovery.apps.course_metadata.models import DataLoaderRecordHash
+
+
+class RecordHashesTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.partner = PartnerFactory()
+        self.records = [('a', {'name': 'A'}), ('b', {'name': 'B'}), (None, {'name': 'No ID'})]
+
+    def save(self, record_hashes, records):
+        record_hashes.save({record_id: get_content_hash(body) for record_id, body in records})
+
+    def test_get_changed(self):
+        """ Verify records are skipped only if they have an ID and their stored hash matches. """
+        record_hashes = RecordHashes(self.partner, 'courses_api')
+        self.save(record_hashes, self.records)
+        self.assertEqual(DataLoaderRecordHash.objects.count(), 2)
+
+        changed, skipped = record_hashes.get_changed([('a', {'name': 'A'}), ('b', {'name': 'B2'}), ('c', {})])
+        self.assertEqual([record_id for record_id, __, __ in changed], ['b', 'c'])
+        self.assertEqual(changed[0][2], get_content_hash({'name': 'B2'}))
+        self.assertEqual(skipped, ['a'])
+        self.assertEqual((record_hashes.processed, record_hashes.skipped), (2, 1))
+
+        changed, skipped = record_hashes.get_changed([(None, {'name': 'No ID'})])
+        self.assertEqual((len(changed), skipped), (1, []))
+
+    def test_save_updates(self):
+        record_hashes = RecordHashes(self.partner, 'courses_api')
+        self.save(record_hashes, self.records)
+        self.save(record_hashes, [('a', {'name': 'A2'})])
+
+        self.assertEqual(DataLoaderRecordHash.objects.count(), 2)
+        self.assertEqual(
+            DataLoaderRecordHash.objects.get(record_id='a').content_hash, get_content_hash({'name': 'A2'})
+        )
+
+    def test_scope(self):
+        """ Verify hashes are stored per partner and source, and that they depend on the context. """
+        self.save(RecordHashes(self.partner, 'courses_api'), self.records)
+
+        for record_hashes in (
+                RecordHashes(PartnerFactory(), 'courses_api'),
+                RecordHashes(self.partner, 'programs_api'),
+                RecordHashes(self.partner, 'courses_api', context={'uses_publisher': True}),
+                RecordHashes(self.partner, 'courses_api', force=True),
+        ):
+            __, skipped = record_hashes.get_changed(self.records)
+            self.assertEqual(skipped, [])
+
+    def test_record_contexts(self):
+        """ Verify records are processed again when their record context changes. """
+        record_hashes = RecordHashes(self.partner, 'courses_api')
+        changed, __ = record_hashes.get_changed(self.records[:2], record_contexts={'a': 1, 'b': 1})
+        record_hashes.save({record_id: content_hash for record_id, __, content_hash in changed})
+
+        changed, skipped = record_hashes.get_changed(self.records[:2], record_contexts={'a': 1, 'b': 2})
+        self.assertEqual([record_id for record_id, __, __ in changed], ['b'])
+        self.assertEqual(skipped, ['a'])
+
+    def test_missing_ids(self):
+        """ Verify unchanged records are processed again when their local data is missing. """
+        record_hashes = RecordHashes(self.partner, 'courses_api')
+        self.save(record_hashes, self.records)
+
+        changed, skipped = record_hashes.get_changed(self.records[:2], missing_ids={'b'})
+        self.assertEqual([record_id for record_id, __, __ in changed], ['b'])
+        self.assertEqual(changed[0][2], get_content_hash({'name': 'B'}))
+        self.assertEqual(skipped, ['a'])
@@ -0,0 +1,63 @@
+import logging
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from course_discovery.apps.api.documents import DOCUMENT_SERIALIZER_VERSION, build_documents
+from course_discovery.apps.api.models import SerializedDocument
+from course_discovery.apps.core.models import Partner
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Render and store the serialized documents used to serve course, course run, and program details.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partner_code',
+            help='The short code for a specific partner to build documents for.'
+        )
+        parser.add_argument(
+            '--document_type',
+            action='append',
+            dest='document_types',
+            choices=[document_type for document_type, __ in SerializedDocument.DOCUMENT_TYPE_CHOICES],
+            help='Type of document to build. May be repeated. Defaults to all types.'
+        )
+        parser.add_argument(
+            '--delete_stale_versions',
+            action='store_true',
+            help='Delete documents rendered by other versions of the document serializers.'
+        )
+
+    def handle(self, *args, **options):
+        partners = Partner.objects.select_related('site')
+        partner_code = options.get('partner_code')
+        if partner_code:
+            partners = partners.filter(short_code=partner_code)
+
+        if not partners:
+            raise CommandError('No partners available!')
+
+        document_types = options['document_types'] or [
+            document_type for document_type, __ in SerializedDocument.DOCUMENT_TYPE_CHOICES
+        ]
+
+        for partner in partners:
+            if options['delete_stale_versions']:
+                deleted, __ = SerializedDocument.objects.filter(partner=partner).exclude(
+                    serializer_version=DOCUMENT_SERIALIZER_VERSION
+                ).delete()
+                logger.info('Deleted %d stale serialized documents for partner [%s].', deleted, partner.short_code)
+
+            for document_type in document_types:
+                start = time.time()
+                count = build_documents(document_type, partner)
+                logger.info(
+                    'Built %d [%s] documents for partner [%s] in %.2f seconds.',
+                    count,
+                    document_type,
+                    partner.short_code,
+                    time.time() - start,
+                )
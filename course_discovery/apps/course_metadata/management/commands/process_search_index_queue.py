@@ -0,0 +1,54 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.utils import translation
+
+from course_discovery.apps.course_metadata.search_queue import process_queue
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Drain the search index queue, written by QueuedSignalProcessor, into the live search index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch_size',
+            type=int,
+            default=settings.SEARCH_INDEX_QUEUE_BATCH_SIZE,
+            help='Number of queued changes processed at a time.'
+        )
+        parser.add_argument(
+            '--using',
+            default='default',
+            help='Haystack connection to update.'
+        )
+        parser.add_argument(
+            '--continuous',
+            action='store_true',
+            help='Keep polling for queued changes once the queue is empty, instead of exiting.'
+        )
+        parser.add_argument(
+            '--poll_interval',
+            type=float,
+            default=settings.SEARCH_INDEX_QUEUE_POLL_INTERVAL,
+            help='Seconds to wait between polls of an empty queue, when running continuously.'
+        )
+
+    def handle(self, *args, **options):
+        # Index translated fields in the default language, as update_index does.
+        translation.activate(settings.LANGUAGE_CODE)
+
+        total = 0
+        while True:
+            processed = process_queue(options['batch_size'], using=options['using'])
+            total += processed
+
+            if not processed:
+                if not options['continuous']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        logger.info('Processed [%d] queued search index changes.', total)
@@ -4,11 +4,14 @@ import logging
 
 import waffle
 from django.apps import apps
-from django.core.management import BaseCommand, CommandError
+from django.core.management import BaseCommand, CommandError, call_command
 from django.db import connection
 from django.db.models.signals import post_delete, post_save
 
 from course_discovery.apps.api.cache import api_change_receiver, set_api_timestamp
+from course_discovery.apps.api.documents import (
+    delete_documents, get_serialized_document_signal_senders, serialized_document_change_receiver
+)
 from course_discovery.apps.core.models import Partner
 from course_discovery.apps.core.utils import delete_orphans
 from course_discovery.apps.course_metadata.data_loaders.analytics_api import AnalyticsAPIDataLoader
@@ -22,7 +25,10 @@ logger = logging.getLogger(__name__)
 
 def execute_loader(loader_class, *loader_args):
     try:
-        loader_class(*loader_args).ingest()
+        loader = loader_class(*loader_args)
+        loader.ingest()
+        loader.log_request_stats()
+        loader.log_record_stats()
         return True
     except Exception:  # pylint: disable=broad-except
         logger.exception('%s failed!', loader_class.__name__)
@@ -56,6 +62,16 @@ class Command(BaseCommand):
             '--partner_code',
             help='The short code for a specific partner to refresh.'
         )
+        parser.add_argument(
+            '--warm_api_cache',
+            action='store_true',
+            help='Warm the API response cache with warm_api_cache once the refresh completes.'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Process every upstream record, including those unchanged since the last refresh.'
+        )
 
     def handle(self, *args, **options):
         # We only want to invalidate the API response cache once data loading
@@ -66,6 +82,10 @@ class Command(BaseCommand):
             for signal in (post_save, post_delete):
                 signal.disconnect(receiver=api_change_receiver, sender=model)
 
+        # Likewise, serialized documents are deleted in one go once loading completes.
+        for signal, sender in get_serialized_document_signal_senders():
+            signal.disconnect(receiver=serialized_document_change_receiver, sender=sender)
+
         # For each partner defined...
         partners = Partner.objects.all()
 
@@ -77,6 +97,8 @@ class Command(BaseCommand):
         if not partners:
             raise CommandError('No partners available!')
 
+        force = options.get('force')
+
         success = True
         for partner in partners:
 
@@ -143,6 +165,7 @@ class Command(BaseCommand):
                                     api_url,
                                     max_workers,
                                     is_threadsafe,
+                                    force,
                                 ))
 
                 success = success and all(f.result() for f in futures)
@@ -157,6 +180,7 @@ class Command(BaseCommand):
                             api_url,
                             max_workers,
                             is_threadsafe,
+                            force,
                         ) and success
 
             # TODO Cleanup CourseRun overrides equivalent to the Course values.
@@ -168,6 +192,15 @@ class Command(BaseCommand):
         delete_orphans(Video)
 
         set_api_timestamp()
+        for partner in partners:
+            delete_documents(partner_id=partner.id)
+
+        if options.get('warm_api_cache'):
+            try:
+                call_command('warm_api_cache', partner_code=partner_code)
+            except CommandError:
+                # A cold cache is a performance problem, not a data problem; don't fail the refresh over it.
+                logger.exception('Failed to warm the API cache.')
 
         if not success:
             raise CommandError('One or more of the data loaders above failed.')
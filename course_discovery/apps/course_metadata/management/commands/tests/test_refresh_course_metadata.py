@@ -114,7 +114,7 @@ class RefreshCourseMetadataCommandTests(OAuth2Mixin, TransactionTestCase):
             call_command('refresh_course_metadata')
 
             # Set up expected calls
-            expected_calls = [mock.call(loader_class, self.partner, api_url, max_workers or 7, False)
+            expected_calls = [mock.call(loader_class, self.partner, api_url, max_workers or 7, False, False)
                               for loader_class, api_url, max_workers in self.pipeline]
             mock_executor.assert_has_calls(expected_calls)
 
@@ -135,7 +135,7 @@ class RefreshCourseMetadataCommandTests(OAuth2Mixin, TransactionTestCase):
 
             # Set up expected calls
             expected_calls = [mock.call(execute_parallel_loader, loader_class,
-                                        self.partner, api_url, max_workers or 7, True)
+                                        self.partner, api_url, max_workers or 7, True, False)
                               for loader_class, api_url, max_workers in self.pipeline]
             mock_executor.assert_has_calls(expected_calls, any_order=True)
 
@@ -144,12 +144,31 @@ class RefreshCourseMetadataCommandTests(OAuth2Mixin, TransactionTestCase):
         assert mock_set_api_timestamp.call_count == 1
         assert not mock_receiver.called
 
+    def test_refresh_course_metadata_force(self):
+        """ Verify the loaders are told not to skip unchanged records when requested. """
+        with mock.patch('course_discovery.apps.course_metadata.management.commands.'
+                        'refresh_course_metadata.execute_loader', return_value=True) as mock_executor:
+            call_command('refresh_course_metadata', '--force')
+
+        assert mock_executor.called
+        for call in mock_executor.call_args_list:
+            assert call[0][-1] is True
+
     def test_refresh_course_metadata_with_invalid_partner_code(self):
         """ Verify an error is raised if an invalid partner code is passed on the command line. """
         with self.assertRaises(CommandError):
             command_args = ['--partner_code=invalid']
             call_command('refresh_course_metadata', *command_args)
 
+    @mock.patch('course_discovery.apps.course_metadata.management.commands.refresh_course_metadata.call_command')
+    def test_refresh_course_metadata_warms_api_cache(self, mock_call_command):
+        """ Verify the API cache is warmed after the refresh when requested. """
+        with mock.patch('course_discovery.apps.course_metadata.management.commands.'
+                        'refresh_course_metadata.execute_loader', return_value=True):
+            call_command('refresh_course_metadata', '--warm_api_cache')
+
+        mock_call_command.assert_called_once_with('warm_api_cache', partner_code=None)
+
     def test_refresh_course_metadata_with_loader_exception(self):
         """ Verify execution continues if an individual data loader fails. """
         logger_target = 'course_discovery.apps.course_metadata.management.commands.refresh_course_metadata.logger'
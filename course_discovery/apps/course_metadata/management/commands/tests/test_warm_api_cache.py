@@ -0,0 +1,58 @@
+import tempfile
+
+import mock
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase
+
+from course_discovery.apps.core.tests.factories import PartnerFactory, UserFactory
+
+
+@mock.patch.object(Client, 'get', return_value=mock.Mock(status_code=200, content=b'{"results": []}'))
+class WarmApiCacheCommandTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.partner = PartnerFactory()
+        self.user = UserFactory()
+
+    def call_command(self, *args):
+        call_command('warm_api_cache', '--username', self.user.username, '--max_workers', '1', *args)
+
+    def test_warms_urls_per_partner(self, mock_get):
+        other_partner = PartnerFactory()
+
+        self.call_command('--url', '/api/v1/programs/', '--url', '/api/v1/courses/')
+
+        expected_calls = [
+            mock.call(url, HTTP_HOST=partner.site.domain, HTTP_ACCEPT='application/json')
+            for partner in (self.partner, other_partner)
+            for url in ('/api/v1/programs/', '/api/v1/courses/')
+        ]
+        mock_get.assert_has_calls(expected_calls, any_order=True)
+
+    def test_partner_code(self, mock_get):
+        PartnerFactory()
+
+        self.call_command('--partner_code', self.partner.short_code, '--url', '/api/v1/programs/')
+
+        mock_get.assert_called_once_with(
+            '/api/v1/programs/', HTTP_HOST=self.partner.site.domain, HTTP_ACCEPT='application/json'
+        )
+
+    def test_urls_file_and_top(self, mock_get):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as urls_file:
+            urls_file.write('# Most requested first\n/api/v1/programs/\n\n/api/v1/courses/\n/api/v1/people/\n')
+            urls_file.flush()
+
+            self.call_command('--urls_file', urls_file.name, '--top', '2')
+
+        self.assertEqual([call[0][0] for call in mock_get.call_args_list], ['/api/v1/programs/', '/api/v1/courses/'])
+
+    def test_failures(self, mock_get):
+        mock_get.return_value = mock.Mock(status_code=500, content=b'')
+
+        with self.assertRaisesMessage(CommandError, 'Failed to warm 1 API URLs.'):
+            self.call_command('--url', '/api/v1/programs/')
+
+    def test_missing_user(self, _mock_get):
+        with self.assertRaisesMessage(CommandError, 'User [missing] does not exist.'):
+            call_command('warm_api_cache', '--username', 'missing')
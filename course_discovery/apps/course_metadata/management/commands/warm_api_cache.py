@@ -0,0 +1,148 @@
+import concurrent.futures
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+
+from course_discovery.apps.core.models import Partner
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+def read_urls_file(path):
+    """
+    Read a recorded list of API paths (e.g. extracted from access logs), one per line and
+    ordered from most to least requested. Blank lines and lines starting with '#' are ignored.
+    """
+    with open(path) as f:
+        urls = [line.strip() for line in f]
+
+    return [url for url in urls if url and not url.startswith('#')]
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay the hottest API URLs for each partner through the full view stack, '
+        'so that the response cache is populated before real traffic arrives.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partner_code',
+            help='The short code for a specific partner to warm.'
+        )
+        parser.add_argument(
+            '--url',
+            action='append',
+            dest='urls',
+            help='API path to warm, e.g. /api/v1/programs/. May be repeated. Defaults to API_CACHE_WARMING_URLS.'
+        )
+        parser.add_argument(
+            '--urls_file',
+            help='File containing a recorded list of API paths to warm, one per line, most requested first.'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=None,
+            help='Only warm the first N URLs of the list.'
+        )
+        parser.add_argument(
+            '--max_workers',
+            type=int,
+            default=settings.API_CACHE_WARMING_MAX_WORKERS,
+            help='Number of threads used to render responses.'
+        )
+        parser.add_argument(
+            '--username',
+            default=settings.API_CACHE_WARMING_USERNAME,
+            help='User the requests are made as. Must be able to read every warmed endpoint.'
+        )
+
+    def handle(self, *args, **options):
+        username = options['username']
+        if not username:
+            raise CommandError('A username is required to warm the API cache.')
+
+        try:
+            self.user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError('User [{}] does not exist.'.format(username))
+
+        if options['urls_file']:
+            urls = read_urls_file(options['urls_file'])
+        else:
+            urls = options['urls'] or settings.API_CACHE_WARMING_URLS
+
+        if options['top']:
+            urls = urls[:options['top']]
+
+        if not urls:
+            raise CommandError('No URLs to warm!')
+
+        partners = Partner.objects.select_related('site')
+        partner_code = options.get('partner_code')
+        if partner_code:
+            partners = partners.filter(short_code=partner_code)
+
+        if not partners:
+            raise CommandError('No partners available!')
+
+        self.clients = threading.local()
+        requests = [(partner.site.domain, url) for partner in partners for url in urls]
+        max_workers = options['max_workers']
+
+        start = time.time()
+        if max_workers > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(lambda request: self.warm_url(*request), requests))
+        else:
+            results = [self.warm_url(host, url) for host, url in requests]
+
+        failures = [result for result in results if result['status'] != 200]
+        logger.info(
+            'Warmed %d of %d API URLs in %.2f seconds, %d bytes in total.',
+            len(results) - len(failures),
+            len(results),
+            time.time() - start,
+            sum(result['bytes'] for result in results),
+        )
+
+        if failures:
+            raise CommandError('Failed to warm {} API URLs.'.format(len(failures)))
+
+    def get_client(self):
+        """
+        Return a logged in test client for the current thread.
+        """
+        client = getattr(self.clients, 'client', None)
+        if client is None:
+            client = Client()
+            client.force_login(self.user)
+            self.clients.client = client
+
+        return client
+
+    def warm_url(self, host, url):
+        start = time.time()
+        try:
+            response = self.get_client().get(url, HTTP_HOST=host, HTTP_ACCEPT='application/json')
+            status, size = response.status_code, len(response.content)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Failed to warm [%s%s].', host, url)
+            status, size = None, 0
+        finally:
+            # Each worker thread has its own database connection, which would otherwise be leaked.
+            if threading.current_thread() is not threading.main_thread():
+                connections.close_all()
+
+        duration = time.time() - start
+        logger.info('Warmed [%s%s] with status %s in %.0f ms, %d bytes.', host, url, status, duration * 1000, size)
+
+        return {'host': host, 'url': url, 'status': status, 'duration': duration, 'bytes': size}
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.12 on 2026-10-16 12:00
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_metadata', '0250_auto_20200518_2054'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataloaderconfig',
+            name='requests_per_minute',
+            field=models.PositiveSmallIntegerField(default=40, help_text='Number of requests per minute the data loaders may make to each API host. They slow down further if the API throttles them. Partners can override this.', validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.12 on 2026-10-16 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_partner_data_loader_requests_per_minute'),
+        ('course_metadata', '0251_dataloaderconfig_requests_per_minute'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataLoaderRecordHash',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('source', models.CharField(help_text='The API and kind of record, e.g. courses_api.', max_length=32)),
+                ('record_id', models.CharField(help_text='The ID of the record in its source.', max_length=255)),
+                ('content_hash', models.CharField(max_length=40)),
+                ('partner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Partner')),
+            ],
+            options={
+                'unique_together': {('partner', 'source', 'record_id')},
+            },
+        ),
+    ]
@@ -12,7 +12,7 @@ import waffle
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
-from django.core.validators import FileExtensionValidator
+from django.core.validators import FileExtensionValidator, MinValueValidator
 from django.db import models, transaction
 from django.db.models import F, Q
 from django.utils.functional import cached_property
@@ -2851,6 +2851,28 @@ class DataLoaderConfig(SingletonModel):
     Configuration for data loaders used in the refresh_course_metadata command.
     """
     max_workers = models.PositiveSmallIntegerField(default=7)
+    requests_per_minute = models.PositiveSmallIntegerField(
+        default=40, validators=[MinValueValidator(1)],
+        help_text=_('Number of requests per minute the data loaders may make to each API host. They slow down '
+                    'further if the API throttles them. Partners can override this.'),
+    )
+
+
+class DataLoaderRecordHash(TimeStampedModel):
+    """
+    Hash of the upstream record a data loader last processed successfully, so that the next refresh can skip the
+    record if it hasn't changed.
+    """
+    partner = models.ForeignKey(Partner, models.CASCADE)
+    source = models.CharField(max_length=32, help_text=_('The API and kind of record, e.g. courses_api.'))
+    record_id = models.CharField(max_length=255, help_text=_('The ID of the record in its source.'))
+    content_hash = models.CharField(max_length=40)
+
+    class Meta:
+        unique_together = ('partner', 'source', 'record_id')
+
+    def __str__(self):
+        return '{source}: {record_id}'.format(source=self.source, record_id=self.record_id)
 
 
 class DeletePersonDupsConfig(SingletonModel):
@@ -1,7 +1,10 @@
 import json
 
+from django.db.models import Prefetch
+from django.test import RequestFactory
 from haystack import indexes
 from opaque_keys.edx.keys import CourseKey
+from rest_framework.utils.encoders import JSONEncoder
 
 from course_discovery.apps.course_metadata.choices import CourseRunStatus, ProgramStatus
 from course_discovery.apps.course_metadata.models import Course, CourseRun, Degree, Person, Position, Program
@@ -44,6 +47,17 @@ def filter_visible_runs(course_runs):
     return course_runs.exclude(type__is_marketable=False)
 
 
+def get_visible_runs(course):
+    """
+    Return the visible runs of a course, in primary key order.
+
+    Equivalent to filter_visible_runs(course.course_runs), but read from the runs prefetched by
+    CourseIndex.index_queryset, rather than with a query per course.
+    """
+    course_runs = [run for run in course.course_runs.all() if run.type is None or run.type.is_marketable]
+    return sorted(course_runs, key=lambda run: run.pk)
+
+
 class OrganizationsMixin:
     def format_organization(self, organization):
         return '{key}: {name}'.format(key=organization.key, name=organization.name)
@@ -154,11 +168,16 @@ class CourseIndex(BaseCourseIndex, indexes.Indexable):
     subject_uuids = indexes.MultiValueField()
 
     course_runs = indexes.MultiValueField()
+    # The course runs as detailed by CourseSearchSerializer, so that search results can be served from the index alone.
+    course_runs_body = indexes.CharField(indexed=False)
     expected_learning_items = indexes.MultiValueField()
 
     prerequisites = indexes.MultiValueField(faceted=True)
     languages = indexes.MultiValueField()
     seat_types = indexes.MultiValueField()
+    # The seat types of all of the course's runs, as CourseSearchSerializer lists them. seat_types only has those of
+    # the visible runs, since it's what searches are filtered by.
+    course_run_seat_types = indexes.MultiValueField(indexed=False)
 
     def read_queryset(self, using=None):
         # Pre-fetch all fields required by the CourseSearchSerializer. Unfortunately, there's
@@ -169,11 +188,43 @@ class CourseIndex(BaseCourseIndex, indexes.Indexable):
             'course_runs__seats__type'
         )
 
+    def index_queryset(self, using=None):
+        # Deferred to prevent a circular import:
+        # course_discovery.apps.api.serializers -> course_discovery.apps.course_metadata.search_indexes
+        from course_discovery.apps.api.serializers import MinimalPersonSerializer
+
+        # Each batch of courses is prepared from a fixed number of queries, rather than a few per course.
+        course_runs = CourseRun.objects.select_related('language', 'type').prefetch_related(
+            'seats__type',
+            Prefetch('staff', queryset=MinimalPersonSerializer.prefetch_queryset()),
+        )
+        return super().index_queryset(using=using).select_related('level_type', 'partner__site').prefetch_related(
+            'authoring_organizations',
+            'expected_learning_items',
+            'prerequisites',
+            'sponsoring_organizations',
+            'subjects__translations',
+            Prefetch('course_runs', queryset=course_runs),
+        )
+
     def prepare_aggregation_key(self, obj):
         return 'course:{}'.format(obj.key)
 
     def prepare_course_runs(self, obj):
-        return [course_run.key for course_run in filter_visible_runs(obj.course_runs)]
+        return [course_run.key for course_run in get_visible_runs(obj)]
+
+    def prepare_course_runs_body(self, obj):
+        # Deferred to prevent a circular import:
+        # course_discovery.apps.api.serializers -> course_discovery.apps.course_metadata.search_indexes
+        from course_discovery.apps.api.documents import get_document_request
+        from course_discovery.apps.api.serializers import CourseSearchSerializer
+
+        # Runs are stored with all of their detail fields. The serializer drops the ones that weren't requested.
+        request = get_document_request(obj.partner) if obj.partner else RequestFactory().get('/')
+        course_runs = [
+            CourseSearchSerializer.course_run_detail(request, True, course_run) for course_run in obj.course_runs.all()
+        ]
+        return json.dumps(course_runs, cls=JSONEncoder)
 
     def prepare_expected_learning_items(self, obj):
         return [item.value for item in obj.expected_learning_items.all()]
@@ -182,24 +233,31 @@ class CourseIndex(BaseCourseIndex, indexes.Indexable):
         return [prerequisite.name for prerequisite in obj.prerequisites.all()]
 
     def prepare_org(self, obj):
-        course_run = filter_visible_runs(obj.course_runs).first()
-        if course_run:
-            return CourseKey.from_string(course_run.key).org
+        course_runs = get_visible_runs(obj)
+        if course_runs:
+            return CourseKey.from_string(course_runs[0].key).org
         return None
 
     def prepare_first_enrollable_paid_seat_price(self, obj):
         return obj.first_enrollable_paid_seat_price
 
     def prepare_seat_types(self, obj):
-        seat_types = [seat.slug for run in filter_visible_runs(obj.course_runs) for seat in run.seat_types]
+        seat_types = [seat.slug for run in get_visible_runs(obj) for seat in run.seat_types]
         return list(set(seat_types))
 
+    def prepare_course_run_seat_types(self, obj):
+        # Deferred to prevent a circular import:
+        # course_discovery.apps.api.serializers -> course_discovery.apps.course_metadata.search_indexes
+        from course_discovery.apps.api.serializers import CourseSearchSerializer
+
+        return CourseSearchSerializer.course_seat_types(obj)
+
     def prepare_subject_uuids(self, obj):
         return [str(subject.uuid) for subject in obj.subjects.all()]
 
     def prepare_languages(self, obj):
         return {
-            self._prepare_language(course_run.language) for course_run in filter_visible_runs(obj.course_runs)
+            self._prepare_language(course_run.language) for course_run in get_visible_runs(obj)
             if course_run.language
         }
 
@@ -207,7 +265,8 @@ class CourseIndex(BaseCourseIndex, indexes.Indexable):
 class CourseRunIndex(BaseCourseIndex, indexes.Indexable):
     model = CourseRun
 
-    course_key = indexes.CharField(model_attr='course__key', stored=True)
+    # Faceted, so that typeahead can group runs by course_key_exact.
+    course_key = indexes.CharField(model_attr='course__key', stored=True, faceted=True)
     org = indexes.CharField()
     number = indexes.CharField()
     status = indexes.CharField(model_attr='status', faceted=True)
@@ -256,7 +315,15 @@ class CourseRunIndex(BaseCourseIndex, indexes.Indexable):
         )
 
     def index_queryset(self, using=None):
-        return filter_visible_runs(super().index_queryset(using=using))
+        queryset = filter_visible_runs(super().index_queryset(using=using))
+        return queryset.select_related('course__level_type', 'course__partner', 'language', 'type').prefetch_related(
+            'course__authoring_organizations',
+            'course__sponsoring_organizations',
+            'course__subjects__translations',
+            'seats__type',
+            'staff',
+            'transcript_languages',
+        )
 
     def prepare_aggregation_key(self, obj):
         # Aggregate CourseRuns by Course key since that is how we plan to dedup CourseRuns on the marketing site.
@@ -344,6 +411,20 @@ class ProgramIndex(BaseIndex, indexes.Indexable, OrganizationsMixin):
         model_attr='is_program_eligible_for_one_click_purchase', null=False
     )
 
+    def index_queryset(self, using=None):
+        return super().index_queryset(using=using).select_related('degree', 'partner', 'type').prefetch_related(
+            'authoring_organizations',
+            'credit_backing_organizations',
+            'excluded_course_runs',
+            'type__applicable_seat_types',
+            'type__translations',
+            'courses__subjects__translations',
+            Prefetch('courses__course_runs', queryset=CourseRun.objects.select_related('language').prefetch_related(
+                'seats__type',
+                'staff',
+            )),
+        )
+
     def prepare_aggregation_key(self, obj):
         return 'program:{}'.format(obj.uuid)
 
@@ -370,9 +451,8 @@ class ProgramIndex(BaseIndex, indexes.Indexable, OrganizationsMixin):
 
     def prepare_search_card_display(self, obj):
         try:
-            degree = Degree.objects.get(uuid=obj.uuid)
+            degree = obj.degree
         except Degree.DoesNotExist:
-
             return []
         return [degree.search_card_ranking, degree.search_card_cost, degree.search_card_courses]
 
@@ -382,12 +462,23 @@ class PersonIndex(BaseIndex, indexes.Indexable):
     uuid = indexes.CharField(model_attr='uuid')
     salutation = indexes.CharField(model_attr='salutation', null=True)
     full_name = indexes.CharField(model_attr='full_name')
+    full_name_autocomplete = indexes.NgramField(model_attr='full_name')
     partner = indexes.CharField(null=True)
     bio = indexes.CharField(model_attr='bio', null=True)
     bio_language = indexes.CharField(model_attr='bio_language', null=True)
     get_profile_image_url = indexes.CharField(model_attr='get_profile_image_url', null=True)
     position = indexes.MultiValueField()
     organizations = indexes.MultiValueField(faceted=True)
+    # The person as serialized by PersonSerializer, so that typeahead can be served from the index alone.
+    typeahead_body = indexes.CharField(indexed=False)
+
+    def index_queryset(self, using=None):
+        queryset = super().index_queryset(using=using).select_related(
+            'bio_language', 'partner__site', 'position__organization__partner',
+        )
+        return queryset.prefetch_related(
+            'areas_of_expertise', 'courses_staffed__course__authoring_organizations', 'person_networks',
+        )
 
     def prepare_aggregation_key(self, obj):
         return 'person:{}'.format(obj.uuid)
@@ -400,11 +491,21 @@ class PersonIndex(BaseIndex, indexes.Indexable):
 
     def prepare_position(self, obj):
         try:
-            position = Position.objects.get(person=obj)
+            position = obj.position
         except Position.DoesNotExist:
             return []
         return [position.title, position.organization_override]
 
+    def prepare_typeahead_body(self, obj):
+        # Deferred to prevent a circular import:
+        # course_discovery.apps.api.serializers -> course_discovery.apps.course_metadata.search_indexes
+        from course_discovery.apps.api.documents import get_document_request
+        from course_discovery.apps.api.serializers import PersonSerializer
+
+        # Image URLs are made absolute with the site of the person's partner.
+        request = get_document_request(obj.partner) if obj.partner else RequestFactory().get('/')
+        return json.dumps(PersonSerializer(obj, context={'request': request}).data)
+
     def prepare_bio_language(self, obj):
         if obj.bio_language:
             return obj.bio_language.name
@@ -0,0 +1,242 @@
+"""
+Queue-driven, incremental updates of the search index.
+
+QueuedSignalProcessor records the course metadata instances that changed in the SearchIndexQueueItem table.
+process_queue drains that table in batches: it works out which indexed documents (courses, course runs, programs,
+and people) each change affects, and updates or removes them in the live index. Full rebuilds with update_index
+remain available as a safety net.
+"""
+import contextlib
+import logging
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from haystack import connections as haystack_connections
+from haystack.signals import BaseSignalProcessor
+
+from course_discovery.apps.course_metadata.models import (
+    Course, CourseEntitlement, CourseRun, Organization, Person, PersonAreaOfExpertise, PersonSocialNetwork, Position,
+    Program, Seat, Subject
+)
+from course_discovery.apps.edx_haystack_extensions.models import SearchIndexQueueItem
+
+logger = logging.getLogger(__name__)
+
+INDEXED_MODELS = (Course, CourseRun, Person, Program)
+# Set while update_index rebuilds the index. The queue isn't drained until the alias is moved to the new index.
+QUEUE_PAUSED_KEY = 'search_index_queue_paused'
+
+# Models whose changes are queued. Changes to the non-indexed models are resolved to the indexed
+# documents that include them (e.g. a seat to its course run) when the queue is drained.
+QUEUED_MODELS = INDEXED_MODELS + (
+    CourseEntitlement, Organization, PersonAreaOfExpertise, PersonSocialNetwork, Position, Seat, Subject,
+)
+
+
+def _get_course_dependents(courses):
+    course_ids = set(courses.values_list('pk', flat=True))
+    return {
+        Course: course_ids,
+        CourseRun: set(CourseRun.objects.filter(course__in=course_ids).values_list('pk', flat=True)),
+        Program: set(Program.objects.filter(courses__in=course_ids).values_list('pk', flat=True)),
+    }
+
+
+def get_indexed_dependents(instance):
+    """
+    Return the indexed documents whose content includes the given instance.
+
+    Returns:
+        dict: Indexed model to a set of primary keys.
+    """
+    if getattr(instance, 'draft', False):
+        # Drafts aren't indexed.
+        return {}
+
+    try:
+        if isinstance(instance, Seat):
+            instance = instance.course_run
+        elif isinstance(instance, CourseEntitlement):
+            instance = instance.course
+    except ObjectDoesNotExist:
+        return {}
+
+    if isinstance(instance, CourseRun):
+        return {
+            Course: {instance.course_id},
+            CourseRun: {instance.pk},
+            Person: set(instance.staff.values_list('pk', flat=True)),
+            Program: set(Program.objects.filter(courses=instance.course_id).values_list('pk', flat=True)),
+        }
+    elif isinstance(instance, Course):
+        return _get_course_dependents(Course.objects.filter(pk=instance.pk))
+    elif isinstance(instance, Program):
+        # Course runs are indexed with the types of the programs they're part of.
+        return {
+            CourseRun: set(CourseRun.objects.filter(course__programs=instance).values_list('pk', flat=True)),
+            Program: {instance.pk},
+        }
+    elif isinstance(instance, Person):
+        return {Person: {instance.pk}}
+    elif isinstance(instance, (PersonAreaOfExpertise, PersonSocialNetwork, Position)):
+        return {Person: {instance.person_id}}
+    elif isinstance(instance, Organization):
+        dependents = _get_course_dependents(Course.objects.filter(
+            Q(authoring_organizations=instance) | Q(sponsoring_organizations=instance)
+        ))
+        dependents[Program] |= set(Program.objects.filter(
+            Q(authoring_organizations=instance) | Q(credit_backing_organizations=instance)
+        ).values_list('pk', flat=True))
+        return dependents
+    elif isinstance(instance, Subject):
+        return _get_course_dependents(Course.objects.filter(subjects=instance))
+
+    return {}
+
+
+def enqueue(objects):
+    """
+    Queue instances for indexing.
+
+    Arguments:
+        objects (dict): Model to a set of primary keys.
+    """
+    SearchIndexQueueItem.objects.bulk_create([
+        SearchIndexQueueItem(model=model._meta.label_lower, object_id=pk)  # pylint: disable=protected-access
+        for model, pks in objects.items()
+        for pk in pks
+        if pk is not None
+    ])
+
+
+def get_m2m_through_models():
+    return [
+        field.remote_field.through
+        for model in (Course, CourseRun, Program)
+        for field in model._meta.many_to_many
+    ]
+
+
+class QueuedSignalProcessor(BaseSignalProcessor):
+    """
+    Records changed course metadata in the search index queue, instead of updating the index in the
+    request (or data loader) that made the change. Saves are queued as-is, and are cheap. Deletions are
+    resolved to the documents they affect right away, since the deleted rows can't be looked up later.
+    """
+
+    def setup(self):
+        for model in QUEUED_MODELS:
+            post_save.connect(self.handle_save, sender=model)
+            pre_delete.connect(self.handle_delete, sender=model)
+
+        for through in get_m2m_through_models():
+            m2m_changed.connect(self.handle_m2m_changed, sender=through)
+
+    def teardown(self):
+        for model in QUEUED_MODELS:
+            post_save.disconnect(self.handle_save, sender=model)
+            pre_delete.disconnect(self.handle_delete, sender=model)
+
+        for through in get_m2m_through_models():
+            m2m_changed.disconnect(self.handle_m2m_changed, sender=through)
+
+    def handle_save(self, sender, instance, **kwargs):
+        if not getattr(instance, 'draft', False):
+            enqueue({sender: {instance.pk}})
+
+    def handle_delete(self, sender, instance, **kwargs):
+        enqueue(get_indexed_dependents(instance))
+
+    # pylint: disable=unused-argument
+    def handle_m2m_changed(self, sender, instance, action, model, pk_set, **kwargs):
+        if action == 'pre_clear':
+            # The cleared relations are gone by the time the queue is drained.
+            enqueue(get_indexed_dependents(instance))
+        elif action in ('post_add', 'post_remove') and not getattr(instance, 'draft', False):
+            objects = {type(instance): {instance.pk}}
+            if model in QUEUED_MODELS and pk_set:
+                objects[model] = set(pk_set)
+            enqueue(objects)
+
+
+@contextlib.contextmanager
+def pause_queue(timeout):
+    """
+    Stop the queue from being drained for the duration of the block, or until the timeout (in seconds) expires.
+
+    Changes drained into the live index while a new index is built would be missing from the new one, since the
+    rebuild may already have indexed the objects they affect. Held back, they're drained into the new index once it
+    has replaced the old one.
+    """
+    cache.set(QUEUE_PAUSED_KEY, True, timeout)
+    try:
+        yield
+    finally:
+        cache.delete(QUEUE_PAUSED_KEY)
+
+
+def is_queue_paused():
+    return bool(cache.get(QUEUE_PAUSED_KEY))
+
+
+def process_queue(batch_size, using='default'):
+    """
+    Drain a batch of the search index queue into the live index. Nothing is drained while the queue is paused.
+
+    Returns:
+        int: The number of queue items processed.
+    """
+    if is_queue_paused():
+        logger.info('The search index queue is paused while the index is rebuilt.')
+        return 0
+
+    items = list(SearchIndexQueueItem.objects.order_by('id')[:batch_size])
+    if not items:
+        return 0
+
+    queued = defaultdict(set)
+    for item in items:
+        queued[item.model].add(item.object_id)
+
+    pending = defaultdict(set)
+    for label, pks in queued.items():
+        try:
+            model = apps.get_model(label)
+        except LookupError:
+            logger.warning('Skipping queued search index updates for unknown model [%s].', label)
+            continue
+
+        found = set()
+        for instance in model._base_manager.filter(pk__in=pks):  # pylint: disable=protected-access
+            found.add(instance.pk)
+            for dependent_model, dependent_pks in get_indexed_dependents(instance).items():
+                pending[dependent_model] |= dependent_pks
+
+        if model in INDEXED_MODELS:
+            # Deleted instances are removed from the index below.
+            pending[model] |= pks - found
+
+    connection = haystack_connections[using]
+    backend = connection.get_backend()
+    unified_index = connection.get_unified_index()
+
+    for model, pks in pending.items():
+        index = unified_index.get_index(model)
+        objects = list(index.index_queryset(using=using).filter(pk__in=pks))
+        if objects:
+            backend.update(index, objects)
+
+        # Objects which were deleted, or are no longer indexable (e.g. a hidden course run).
+        label = model._meta.label_lower  # pylint: disable=protected-access
+        for pk in pks - {obj.pk for obj in objects}:
+            backend.remove('{label}.{pk}'.format(label=label, pk=pk))
+
+        logger.info('Updated [%d] and removed [%d] %s search documents.', len(objects), len(pks) - len(objects),
+                    model.__name__)
+
+    SearchIndexQueueItem.objects.filter(id__in=[item.id for item in items]).delete()
+    return len(items)
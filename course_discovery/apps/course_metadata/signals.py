@@ -8,7 +8,11 @@ from django.db.models.signals import m2m_changed, post_delete, post_save, pre_de
 from django.dispatch import receiver
 
 from course_discovery.apps.api.cache import api_change_receiver
+from course_discovery.apps.api.documents import (
+    get_serialized_document_signal_senders, serialized_document_change_receiver
+)
 from course_discovery.apps.core.models import Partner
+from course_discovery.apps.core.utils import is_history_model
 from course_discovery.apps.course_metadata.constants import MASTERS_PROGRAM_TYPE_SLUG
 from course_discovery.apps.course_metadata.models import (
     Course, CourseRun, Curriculum, CurriculumCourseMembership, CurriculumProgramMembership, Organization, Program
@@ -94,10 +98,17 @@ def _find_in_programs(existing_programs, target_curriculum=None, target_program=
 # deleted. Given how interconnected our data is and how infrequently our models
 # change (data loading aside), this is a clean and simple way to ensure correctness
 # of the API while providing closer-to-optimal cache TTLs.
+# History records are written alongside every change to the models they record, so they're ignored.
 for model in apps.get_app_config('course_metadata').get_models():
+    if is_history_model(model):
+        continue
     for signal in (post_save, post_delete):
         signal.connect(api_change_receiver, sender=model)
 
+# Stored serialized documents are deleted when anything they include changes, and rebuilt when next requested.
+for signal, sender in get_serialized_document_signal_senders():
+    signal.connect(serialized_document_change_receiver, sender=sender)
+
 
 @receiver(pre_save, sender=CourseRun)
 def ensure_external_key_uniqueness__course_run(sender, instance, **kwargs):  # pylint: disable=unused-argument
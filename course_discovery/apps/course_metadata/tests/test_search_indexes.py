@@ -0,0 +1,56 @@
+import ddt
+from django.test import TestCase
+from haystack import connections as haystack_connections
+
+from course_discovery.apps.course_metadata.models import Course, CourseRun, Person, Program
+from course_discovery.apps.course_metadata.search_indexes import get_visible_runs
+from course_discovery.apps.course_metadata.tests.factories import (
+    CourseRunFactory, CourseRunTypeFactory, DegreeFactory, OrganizationFactory, PersonFactory, PositionFactory,
+    ProgramFactory, SeatFactory, SubjectFactory
+)
+
+
+@ddt.ddt
+class SearchIndexPreparationTests(TestCase):
+    def create_catalog(self):
+        organization = OrganizationFactory()
+        person = PersonFactory()
+        PositionFactory(person=person, organization=organization)
+
+        course_run = CourseRunFactory(staff=[person], course__authoring_organizations=[organization])
+        course_run.course.subjects.add(SubjectFactory())
+        SeatFactory(course_run=course_run)
+        ProgramFactory(courses=[course_run.course], authoring_organizations=[organization])
+        DegreeFactory(courses=[course_run.course])
+
+    def get_index(self, model):
+        return haystack_connections['default'].get_unified_index().get_index(model)
+
+    @ddt.data(
+        (Course, ('course_runs', 'languages', 'org', 'seat_types', 'subjects')),
+        (CourseRun, ('authoring_organizations', 'staff_uuids', 'subjects', 'transcript_languages')),
+        (Person, ('organizations', 'position')),
+        (Program, ('credit_backing_organizations', 'search_card_display', 'staff_uuids', 'subject_uuids')),
+    )
+    @ddt.unpack
+    def test_prepare_from_index_queryset(self, model, fields):
+        """ Verify the related rows the prepare methods need are loaded with the batch, not per object. """
+        for __ in range(2):
+            self.create_catalog()
+
+        index = self.get_index(model)
+        objects = list(index.index_queryset())
+        assert len(objects) >= 2
+
+        with self.assertNumQueries(0):
+            for obj in objects:
+                for field in fields:
+                    getattr(index, 'prepare_' + field)(obj)
+
+    def test_get_visible_runs(self):
+        course_run = CourseRunFactory()
+        course = course_run.course
+        CourseRunFactory(course=course, type=CourseRunTypeFactory(is_marketable=False))
+        newer_run = CourseRunFactory(course=course)
+
+        assert get_visible_runs(course) == [course_run, newer_run]
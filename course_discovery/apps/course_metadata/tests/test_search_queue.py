@@ -0,0 +1,108 @@
+from django.test import TestCase
+from haystack import connection_router
+from haystack import connections as haystack_connections
+from haystack.query import SearchQuerySet
+
+from course_discovery.apps.core.tests.mixins import ElasticsearchTestMixin
+from course_discovery.apps.course_metadata.models import Course, CourseRun, Person, Program
+from course_discovery.apps.course_metadata.search_queue import (
+    QueuedSignalProcessor, enqueue, get_indexed_dependents, process_queue
+)
+from course_discovery.apps.course_metadata.tests.factories import (
+    CourseRunFactory, OrganizationFactory, PersonFactory, ProgramFactory, SeatFactory
+)
+from course_discovery.apps.edx_haystack_extensions.models import SearchIndexQueueItem
+
+
+class SearchQueueTests(ElasticsearchTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.person = PersonFactory()
+        self.course_run = CourseRunFactory(staff=[self.person])
+        self.course = self.course_run.course
+        self.program = ProgramFactory(courses=[self.course])
+
+    def get_queued(self):
+        return set(SearchIndexQueueItem.objects.values_list('model', 'object_id'))
+
+    def search(self, model, **kwargs):
+        self.refresh_index()
+        return SearchQuerySet().models(model).filter(**kwargs)
+
+    def test_get_indexed_dependents(self):
+        seat = SeatFactory(course_run=self.course_run)
+        expected = {
+            Course: {self.course.pk},
+            CourseRun: {self.course_run.pk},
+            Person: {self.person.pk},
+            Program: {self.program.pk},
+        }
+        assert get_indexed_dependents(seat) == expected
+        assert get_indexed_dependents(self.course_run) == expected
+
+        organization = OrganizationFactory()
+        self.course.authoring_organizations.add(organization)
+        assert get_indexed_dependents(organization) == {
+            Course: {self.course.pk},
+            CourseRun: {self.course_run.pk},
+            Program: {self.program.pk},
+        }
+
+        assert get_indexed_dependents(self.program) == {
+            CourseRun: {self.course_run.pk},
+            Program: {self.program.pk},
+        }
+
+    def test_signal_processor(self):
+        """ Verify changes are queued, and deletions are resolved to the documents they affect. """
+        processor = QueuedSignalProcessor(haystack_connections, connection_router)
+        try:
+            seat = SeatFactory(course_run=self.course_run)
+            assert self.get_queued() == {('course_metadata.seat', seat.pk)}
+
+            SearchIndexQueueItem.objects.all().delete()
+            seat.delete()
+            assert self.get_queued() == {
+                ('course_metadata.course', self.course.pk),
+                ('course_metadata.courserun', self.course_run.pk),
+                ('course_metadata.person', self.person.pk),
+                ('course_metadata.program', self.program.pk),
+            }
+
+            SearchIndexQueueItem.objects.all().delete()
+            other_course = CourseRunFactory().course
+            SearchIndexQueueItem.objects.all().delete()
+            self.program.courses.add(other_course)
+            assert self.get_queued() == {
+                ('course_metadata.program', self.program.pk),
+                ('course_metadata.course', other_course.pk),
+            }
+        finally:
+            processor.teardown()
+
+    def test_process_queue(self):
+        """ Verify queued changes are indexed, and documents of deleted objects are removed. """
+        assert not self.search(CourseRun, key=self.course_run.key)
+
+        enqueue({CourseRun: {self.course_run.pk}})
+        assert process_queue(batch_size=10) == 1
+        assert not SearchIndexQueueItem.objects.exists()
+
+        assert self.search(CourseRun, key=self.course_run.key).count() == 1
+        assert self.search(Course, key=self.course.key).count() == 1
+        assert self.search(Program, uuid=str(self.program.uuid)).count() == 1
+
+        key = self.course_run.key
+        enqueue({CourseRun: {self.course_run.pk}})
+        self.course_run.delete()
+        process_queue(batch_size=10)
+        assert not self.search(CourseRun, key=key)
+
+    def test_process_queue_batches(self):
+        enqueue({Person: {self.person.pk}, Program: {self.program.pk}})
+        enqueue({Person: {self.person.pk}})
+
+        assert process_queue(batch_size=2) == 2
+        assert SearchIndexQueueItem.objects.count() == 1
+        assert process_queue(batch_size=2) == 1
+        assert process_queue(batch_size=2) == 0
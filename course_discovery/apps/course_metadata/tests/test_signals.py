@@ -5,11 +5,13 @@ import ddt
 import mock
 import pytest
 from django.apps import apps
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 from factory import DjangoModelFactory
 from pytz import UTC
 
+from course_discovery.apps.api.cache import API_TIMESTAMP_KEY, CATALOG_RESOURCES
 from course_discovery.apps.api.v1.tests.test_views.mixins import FuzzyInt
 from course_discovery.apps.course_metadata.algolia_models import (
     AlgoliaProxyCourse, AlgoliaProxyProduct, AlgoliaProxyProgram, SearchDefaultResultsConfiguration
@@ -17,9 +19,9 @@ from course_discovery.apps.course_metadata.algolia_models import (
 from course_discovery.apps.course_metadata.choices import CourseRunStatus
 from course_discovery.apps.course_metadata.models import (
     BackfillCourseRunSlugsConfig, BackpopulateCourseTypeConfig, BulkModifyProgramHookConfig, CourseRun, Curriculum,
-    CurriculumProgramMembership, DataLoaderConfig, DeletePersonDupsConfig, DrupalPublishUuidConfig,
-    LevelTypeTranslation, MigratePublisherToCourseMetadataConfig, ProfileImageDownloadConfig, Program,
-    ProgramTypeTranslation, RemoveRedirectsConfig, SubjectTranslation, TagCourseUuidsConfig, TopicTranslation
+    CurriculumProgramMembership, DataLoaderConfig, DataLoaderRecordHash, DeletePersonDupsConfig,
+    DrupalPublishUuidConfig, LevelTypeTranslation, MigratePublisherToCourseMetadataConfig, ProfileImageDownloadConfig,
+    Program, ProgramTypeTranslation, RemoveRedirectsConfig, SubjectTranslation, TagCourseUuidsConfig, TopicTranslation
 )
 from course_discovery.apps.course_metadata.signals import _duplicate_external_key_message
 from course_discovery.apps.course_metadata.tests import factories
@@ -28,12 +30,13 @@ LOGGER_NAME = 'course_discovery.apps.course_metadata.signals'
 
 
 @pytest.mark.django_db
+@mock.patch('course_discovery.apps.api.cache.set_api_resource_timestamps')
 @mock.patch('course_discovery.apps.api.cache.set_api_timestamp')
 class TestCacheInvalidation:
-    def test_model_change(self, mock_set_api_timestamp):
+    def test_model_change(self, mock_set_api_timestamp, mock_set_api_resource_timestamps):
         """
-        Verify that the API cache is invalidated after course_metadata models
-        are saved or deleted.
+        Verify that the API cache is invalidated, either entirely or for the dependent
+        resource families, after course_metadata models are saved or deleted.
         """
         factory_map = {}
         for key, factorylike in factories.__dict__.items():
@@ -52,7 +55,7 @@ class TestCacheInvalidation:
                          TopicTranslation, ProfileImageDownloadConfig, TagCourseUuidsConfig, RemoveRedirectsConfig,
                          BulkModifyProgramHookConfig, BackfillCourseRunSlugsConfig, AlgoliaProxyCourse,
                          AlgoliaProxyProgram, AlgoliaProxyProduct, ProgramTypeTranslation, LevelTypeTranslation,
-                         SearchDefaultResultsConfiguration]:
+                         SearchDefaultResultsConfiguration, DataLoaderRecordHash]:
                 continue
             if 'abstract' in model.__name__.lower() or 'historical' in model.__name__.lower():
                 continue
@@ -64,13 +67,45 @@ class TestCacheInvalidation:
             # Verify that model creation and deletion invalidates the API cache.
             instance = factory()
 
-            assert mock_set_api_timestamp.called
+            assert mock_set_api_timestamp.called or mock_set_api_resource_timestamps.called
             mock_set_api_timestamp.reset_mock()
+            mock_set_api_resource_timestamps.reset_mock()
 
             instance.delete()
 
-            assert mock_set_api_timestamp.called
+            assert mock_set_api_timestamp.called or mock_set_api_resource_timestamps.called
             mock_set_api_timestamp.reset_mock()
+            mock_set_api_resource_timestamps.reset_mock()
+
+    def test_scoped_model_change(self, mock_set_api_timestamp, mock_set_api_resource_timestamps):
+        """
+        Verify that models with a declared cache dependency only invalidate their
+        resource families for the owning partner.
+        """
+        seat = factories.SeatFactory()
+        mock_set_api_timestamp.reset_mock()
+        mock_set_api_resource_timestamps.reset_mock()
+
+        seat.save()
+
+        assert not mock_set_api_timestamp.called
+        mock_set_api_resource_timestamps.assert_called_once_with(
+            CATALOG_RESOURCES, seat.course_run.course.partner_id
+        )
+
+
+@pytest.mark.django_db
+class TestScopedCacheInvalidation:
+    def test_history_records_ignored(self):
+        """ Verify the history records written with scoped models' changes don't invalidate the entire API cache. """
+        course = factories.CourseFactory()
+        cache.set(API_TIMESTAMP_KEY, 1, None)
+
+        course.title = 'Changed'
+        course.save()
+
+        assert course.history.exists()
+        assert cache.get(API_TIMESTAMP_KEY) == 1
 
 
 @ddt.ddt
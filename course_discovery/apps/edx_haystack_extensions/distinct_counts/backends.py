@@ -1,9 +1,162 @@
+import hashlib
+import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
 import elasticsearch
 from django.conf import settings
 from haystack.backends.elasticsearch_backend import ElasticsearchSearchQuery
 from haystack.models import SearchResult
 
 
+# The index each alias pointed to when it was last looked up, and when that lookup expires, keyed by alias.
+_index_generations = {}
+_index_generations_lock = threading.Lock()
+
+
+def get_index_generation(backend):
+    """
+    Return the name of the index the backend's alias currently points to, or None if it can't be looked up.
+
+    Caches keyed by the generation are invalidated by swapping the alias to a newly built index. Lookups are
+    remembered for settings.INDEX_GENERATION_CACHE_TIMEOUT seconds, so that queries don't each make one.
+    """
+    index_name = backend.index_name
+    timeout = settings.INDEX_GENERATION_CACHE_TIMEOUT
+    if timeout:
+        with _index_generations_lock:
+            expires, index_generation = _index_generations.get(index_name, (0, None))
+        if expires > time.time():
+            return index_generation
+
+    try:
+        indexes = backend.conn.indices.get_alias(name=index_name)
+    except elasticsearch.NotFoundError:
+        # The backend is configured with the name of an index, rather than an alias.
+        index_generation = index_name
+    except elasticsearch.TransportError as e:
+        backend.log.warning('Failed to look up the index behind alias [%s]: %s', index_name, e)
+        return None
+    else:
+        index_generation = ','.join(sorted(indexes)) or index_name
+
+    if timeout:
+        with _index_generations_lock:
+            _index_generations[index_name] = (time.time() + timeout, index_generation)
+
+    return index_generation
+
+
+def clear_index_generations():
+    """ Forget the looked up index generations, e.g. once an alias has been pointed to a new index. """
+    with _index_generations_lock:
+        _index_generations.clear()
+
+
+class DistinctCountsResultCache:
+    """
+    A bounded, per-process LRU cache of distinct counts query results, sized by the bytes of their pickled form.
+
+    Keys include the name of the index behind the search alias, so swapping the alias to a newly built index makes
+    old entries unreachable; they then age out as new entries are added. Entries also expire after
+    settings.DISTINCT_COUNTS_CACHE_TIMEOUT seconds, since the live index is updated in place between rebuilds.
+    The budget is read from settings.DISTINCT_COUNTS_CACHE_MAX_BYTES, and 0 disables the cache.
+
+    Results are stored pickled, so that every hit gets its own copy of the search results (which callers
+    may go on to load model instances into).
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+
+    @property
+    def max_bytes(self):
+        return settings.DISTINCT_COUNTS_CACHE_MAX_BYTES
+
+    @staticmethod
+    def get_key(index_generation, aggregation_key, query_string, search_kwargs):
+        """
+        Return the cache key of a query. Equivalent queries get the same key, regardless of the order their
+        filters and facets were added in.
+        """
+        def canonicalize(value):
+            if isinstance(value, (set, frozenset)):
+                return sorted(value, key=str)
+            if isinstance(value, type):
+                return '{}.{}'.format(value.__module__, value.__qualname__)
+            return str(value)
+
+        search_kwargs = dict(search_kwargs)
+        if 'query_facets' in search_kwargs:
+            search_kwargs['query_facets'] = sorted(search_kwargs['query_facets'])
+
+        canonical_query = json.dumps(
+            {
+                'aggregation_key': aggregation_key,
+                'facet_precision': settings.DISTINCT_COUNTS_FACET_PRECISION,
+                'hit_precision': settings.DISTINCT_COUNTS_HIT_PRECISION,
+                'query_string': query_string,
+                'search_kwargs': search_kwargs,
+            },
+            default=canonicalize,
+            sort_keys=True,
+        )
+        return index_generation, hashlib.sha1(canonical_query.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        if not self.max_bytes:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires, content = entry
+            if expires <= time.time():
+                del self._entries[key]
+                self.size -= len(content)
+                return None
+
+            self._entries.move_to_end(key)
+
+        return pickle.loads(content)
+
+    def set(self, key, results):
+        max_bytes = self.max_bytes
+        if not max_bytes:
+            return
+
+        content = pickle.dumps(results, pickle.HIGHEST_PROTOCOL)
+        if len(content) > max_bytes:
+            # Entries larger than the whole budget would evict everything.
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+
+            self._entries[key] = (time.time() + settings.DISTINCT_COUNTS_CACHE_TIMEOUT, content)
+            self.size += len(content)
+
+            while self.size > max_bytes:
+                _, (__, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+distinct_counts_cache = DistinctCountsResultCache()
+
+
 class DistinctCountsSearchQuery(ElasticsearchSearchQuery):
     """ Custom Haystack Query class that computes and caches distinct hit and facet counts for a query."""
 
@@ -59,7 +212,21 @@ class DistinctCountsSearchQuery(ElasticsearchSearchQuery):
         # Use the DistinctCountsElasticsearchBackendWrapper to execute the query so that distinct hit and query
         # counts may be computed.
         backend = DistinctCountsElasticsearchBackendWrapper(self.backend, self.aggregation_key)
-        results = backend.search(final_query, **search_kwargs)
+
+        # The cardinality aggregations are expensive, and most traffic is for the same few facet combinations.
+        cache_key = None
+        if distinct_counts_cache.max_bytes:
+            index_generation = backend.get_index_generation()
+            if index_generation is not None:
+                cache_key = distinct_counts_cache.get_key(
+                    index_generation, self.aggregation_key, final_query, search_kwargs
+                )
+
+        results = distinct_counts_cache.get(cache_key) if cache_key else None
+        if results is None:
+            results = backend.search(final_query, **search_kwargs)
+            if cache_key:
+                distinct_counts_cache.set(cache_key, results)
 
         self._results = results.get('results', [])
         self._hit_count = results.get('hits', 0)
@@ -155,6 +322,9 @@ class DistinctCountsElasticsearchBackendWrapper:
         self.aggregation_key = aggregation_key
         self.aggregation_name = 'distinct_{}'.format(aggregation_key)
 
+    def get_index_generation(self):
+        return get_index_generation(self.backend)
+
     def search(self, query_string, **kwargs):
         """
         Run a search query and return the results.
@@ -9,7 +9,8 @@ from haystack.query import SearchQuerySet
 from course_discovery.apps.course_metadata.models import CourseRun
 from course_discovery.apps.course_metadata.tests.factories import CourseFactory, CourseRunFactory
 from course_discovery.apps.edx_haystack_extensions.distinct_counts.backends import (
-    DistinctCountsElasticsearchBackendWrapper, DistinctCountsSearchQuery
+    DistinctCountsElasticsearchBackendWrapper, DistinctCountsResultCache, DistinctCountsSearchQuery,
+    clear_index_generations, distinct_counts_cache, get_index_generation
 )
 
 
@@ -129,6 +130,71 @@ class TestDistinctCountsSearchQuery:
         actual = sorted([run.key for run in paginated_results])
         assert expected == actual
 
+    def test_run_caches_results(self, settings):
+        """ Verify that results are served from the cache, until the alias points to a new index. """
+        settings.DISTINCT_COUNTS_CACHE_MAX_BYTES = 1024 * 1024
+        CourseRunFactory(title='foo')
+
+        def build_query():
+            query = DistinctCountsSearchQuery()
+            query.aggregation_key = 'aggregation_key'
+            query.add_filter(SQ(title='foo'))
+            query.add_model(CourseRun)
+            query.add_field_facet('pacing_type')
+            return query
+
+        distinct_counts_cache.clear()
+        try:
+            query = build_query()
+            query.run()
+
+            empty_results = {'results': [], 'hits': 0, 'distinct_hits': 0}
+            with mock.patch.object(DistinctCountsElasticsearchBackendWrapper, 'search') as mock_search:
+                mock_search.return_value = empty_results
+                cached_query = build_query()
+                cached_query.run()
+                assert not mock_search.called
+                assert cached_query._hit_count == query._hit_count == 1
+                assert cached_query._distinct_hit_count == query._distinct_hit_count
+                assert cached_query._facet_counts == query._facet_counts
+                assert [result.key for result in cached_query._results] == [result.key for result in query._results]
+
+                with mock.patch.object(DistinctCountsElasticsearchBackendWrapper, 'get_index_generation',
+                                       return_value='swapped_index'):
+                    build_query().run()
+                assert mock_search.call_count == 1
+        finally:
+            distinct_counts_cache.clear()
+
+    def test_result_cache_key(self):
+        """ Verify that equivalent queries share a key, regardless of the order their facets were added in. """
+        kwargs = {'query_facets': [('hidden', 'hidden:true'), ('current', 'start:<now')], 'models': {CourseRun}}
+        reordered = {'models': {CourseRun}, 'query_facets': [('current', 'start:<now'), ('hidden', 'hidden:true')]}
+
+        key = DistinctCountsResultCache.get_key('index_1', 'aggregation_key', 'title:(foo)', kwargs)
+        assert key == DistinctCountsResultCache.get_key('index_1', 'aggregation_key', 'title:(foo)', reordered)
+        assert key != DistinctCountsResultCache.get_key('index_2', 'aggregation_key', 'title:(foo)', kwargs)
+        assert key != DistinctCountsResultCache.get_key('index_1', 'aggregation_key', 'title:(bar)', kwargs)
+
+    def test_result_cache_evicts_by_size(self, settings):
+        """ Verify that the least recently used results are evicted once the cache is over its budget. """
+        cache = DistinctCountsResultCache()
+        settings.DISTINCT_COUNTS_CACHE_MAX_BYTES = 1024
+        results = {'results': [], 'hits': 0, 'distinct_hits': 0, 'spelling_suggestion': 'x' * 400}
+
+        cache.set('a', results)
+        cache.set('b', results)
+        assert cache.get('a') == results
+        cache.set('c', results)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == results
+        assert cache.get('c') == results
+        assert cache.size <= 1024
+
+        settings.DISTINCT_COUNTS_CACHE_MAX_BYTES = 0
+        assert cache.get('a') is None
+
     def test_run_raises_when_validation_fails(self):
         """ Verify that run raises an exception when the Query is misconfigured. """
         with mock.patch.object(DistinctCountsSearchQuery, 'validate') as mock_validate:
@@ -237,6 +303,26 @@ class TestDistinctCountsSearchQuery:
 @pytest.mark.django_db
 @pytest.mark.usefixtures('haystack_default_connection')
 class TestDistinctCountsElasticsearchBackendWrapper:
+    def test_get_index_generation_cached(self, settings):
+        """ Verify the index behind the alias is remembered, until the remembered generations are cleared. """
+        settings.INDEX_GENERATION_CACHE_TIMEOUT = 60
+        backend = SearchQuerySet().query.backend
+        get_alias = backend.conn.indices.get_alias
+        expected = ','.join(sorted(get_alias(name=backend.index_name)))
+
+        clear_index_generations()
+        try:
+            with mock.patch.object(backend.conn.indices, 'get_alias', wraps=get_alias) as mock_get:
+                assert get_index_generation(backend) == expected
+                assert get_index_generation(backend) == expected
+                assert mock_get.call_count == 1
+
+                clear_index_generations()
+                assert get_index_generation(backend) == expected
+                assert mock_get.call_count == 2
+        finally:
+            clear_index_generations()
+
     def test_search_raises_when_called_with_date_facet(self):
         now = datetime.datetime.now()
         one_day = datetime.timedelta(days=1)
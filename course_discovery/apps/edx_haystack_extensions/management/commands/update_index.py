@@ -1,18 +1,102 @@
+import concurrent.futures
+import contextlib
 import logging
+import os
 import time
+from collections import OrderedDict
 
+from django.apps import apps
 from django.conf import settings
 from django.core.management import CommandError
+from django.db import connection
+from django.db.models import Max
+from elasticsearch.helpers import bulk
 from haystack import connections as haystack_connections
+from haystack.constants import ID
+from haystack.exceptions import SkipDocument
 from haystack.management.commands.update_index import Command as HaystackCommand
 
 from course_discovery.apps.core.utils import ElasticsearchUtils
+from course_discovery.apps.course_metadata.search_queue import pause_queue
+from course_discovery.apps.edx_haystack_extensions.distinct_counts.backends import clear_index_generations
+from course_discovery.apps.edx_haystack_extensions.models import SearchIndexQueueItem
 
 logger = logging.getLogger(__name__)
 
+# Faceted fields whose number of distinct values, per content type, is compared by the sanity check.
+CARDINALITY_FIELDS = ('organizations_exact', 'seat_types_exact', 'subjects_exact')
+
+DEFAULT_PARTITION_SIZE = 1000
+DEFAULT_CHUNK_SIZE = 500
+
+# Options of Haystack's update_index which select the objects indexed. Parallel builds always index everything.
+PARALLEL_UNSUPPORTED_OPTIONS = OrderedDict([
+    ('age', '--age'),
+    ('start_date', '--start'),
+    ('end_date', '--end'),
+    ('remove', '--remove'),
+])
+
+
+def get_pk_ranges(queryset, partition_size):
+    """
+    Split a queryset into contiguous primary key ranges, each covering up to partition_size objects.
+
+    Ranges are filtered by primary key rather than sliced with offsets, so that a worker's query
+    doesn't get slower the further into the table its range lies.
+
+    Returns:
+        list[tuple]: (first pk, last pk) of each range, inclusive.
+    """
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    return [
+        (pks[start], pks[min(start + partition_size, len(pks)) - 1])
+        for start in range(0, len(pks), partition_size)
+    ]
+
+
+def index_pk_range(using, index_name, model_label, start_pk, end_pk, chunk_size):
+    """
+    Index the objects of a model whose primary keys are within the given range, in a worker process.
+
+    The parent process closes its database connection before the workers are forked, so each worker opens
+    its own. The worker also uses its own Elasticsearch connection.
+
+    Returns:
+        int: The number of documents indexed.
+    """
+    engine = haystack_connections[using]
+    backend = engine.backend(using, **engine.options)
+    # The parent process has already created the index, and put its mapping.
+    backend.index_name = index_name
+    backend.setup_complete = True
+
+    model = apps.get_model(model_label)
+    index = engine.get_unified_index().get_index(model)
+    queryset = index.build_queryset(using=using).filter(pk__gte=start_pk, pk__lte=end_pk)
+
+    from_python = backend._from_python  # pylint: disable=protected-access
+    documents = []
+    # The range is small enough to load at once, and iterator() would skip the index's prefetching.
+    for obj in queryset:
+        try:
+            prepared = index.full_prepare(obj)
+        except SkipDocument:
+            continue
+
+        document = {key: from_python(value) for key, value in prepared.items()}
+        document['_id'] = document[ID]
+        documents.append(document)
+
+    if documents:
+        bulk(backend.conn, documents, index=index_name, doc_type='modelresult', chunk_size=chunk_size)
+
+    return len(documents)
+
 
 class Command(HaystackCommand):
     backends = []
+    phase_timings = None
 
     def add_arguments(self, parser):
         super().add_arguments(parser)
@@ -20,6 +104,24 @@ class Command(HaystackCommand):
             '--disable-change-limit', action='store_true', dest='disable_change_limit',
             help='Disables checks limiting the number of records modified.'
         )
+        parser.add_argument(
+            '--parallel', action='store_true', dest='parallel',
+            help='Index each model with a pool of worker processes, each indexing a range of primary keys. '
+                 'The size of the pool is set by --workers, and defaults to the number of CPUs.'
+        )
+        parser.add_argument(
+            '--partition-size', type=int, default=DEFAULT_PARTITION_SIZE, dest='partition_size',
+            help='Number of objects indexed by each worker task, when indexing in parallel.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, dest='chunk_size',
+            help='Number of documents sent to Elasticsearch in each bulk request, when indexing in parallel.'
+        )
+        parser.add_argument(
+            '--disable-build-tuning', action='store_true', dest='disable_build_tuning',
+            help='Build the new index with its configured replicas and refresh interval, rather than building it '
+                 'without either, and restoring them (then merging the index) before the alias is set.'
+        )
 
     def get_record_count(self, conn, index_name):
         return conn.count(index_name).get('count')
@@ -28,45 +130,180 @@ class Command(HaystackCommand):
         from django.utils import translation
         translation.activate(settings.LANGUAGE_CODE)
 
+        if options.get('parallel'):
+            unsupported = [flag for option, flag in PARALLEL_UNSUPPORTED_OPTIONS.items() if options.get(option)]
+            if unsupported:
+                raise CommandError('{} cannot be used with --parallel.'.format(', '.join(unsupported)))
+
         self.backends = options.get('using')
         if not self.backends:
             self.backends = list(haystack_connections.connections_info.keys())
 
-        alias_mappings = []
-
-        # Use a timestamped index instead of the default in settings.
-        for backend_name in self.backends:
-            connection = haystack_connections[backend_name]
-            backend = connection.get_backend()
-            record_count = self.get_record_count(backend.conn, backend.index_name)
-            alias, index_name = self.prepare_backend_index(backend)
-            alias_mappings.append((backend, index_name, alias, record_count))
-
-        # Set the alias (from settings) to the timestamped catalog.
-        run_attempts = 0
-        indexes_pending = {key: '' for key in [x[1] for x in alias_mappings]}
-        while indexes_pending and run_attempts < 2:
-            run_attempts += 1
-            super(Command, self).handle(**options)
-
-            for backend, index, alias, record_count in alias_mappings:
-                # Run a sanity check to ensure we aren't drastically changing the
-                # index, which could be indicative of a bug.
-                if index in indexes_pending and not options.get('disable_change_limit', False):
-                    record_count_is_sane, index_info_string = self.sanity_check_new_index(
-                        backend.conn, index, record_count
-                    )
-                    if record_count_is_sane:
-                        self.set_alias(backend, alias, index)
-                        indexes_pending.pop(index, None)
+        self.phase_timings = OrderedDict()
+        tune_build = not options.get('disable_build_tuning', False)
+        if tune_build:
+            # Haystack refreshes the index after every batch it commits. The index is refreshed once loaded instead.
+            options['commit'] = False
+        with pause_queue(settings.SEARCH_INDEX_QUEUE_PAUSE_TIMEOUT):
+            alias_mappings = []
+
+            # Changes queued before the rebuild starts are included in the new index. The ones queued after it
+            # starts are held until the alias is set, and then drained into the new index.
+            last_queued_id = SearchIndexQueueItem.objects.aggregate(last_id=Max('id'))['last_id']
+
+            # Use a timestamped index instead of the default in settings.
+            with self.time_phase('create index'):
+                for backend_name in self.backends:
+                    backend = haystack_connections[backend_name].get_backend()
+                    record_count = self.get_record_count(backend.conn, backend.index_name)
+                    alias, index_name = self.prepare_backend_index(backend, bulk_load=tune_build)
+                    alias_mappings.append((backend, index_name, alias, record_count))
+
+            # Set the alias (from settings) to the timestamped catalog.
+            run_attempts = 0
+            indexes_pending = {key: '' for key in [x[1] for x in alias_mappings]}
+            while indexes_pending and run_attempts < 2:
+                run_attempts += 1
+                if tune_build and run_attempts > 1:
+                    for backend, index, __, __ in alias_mappings:
+                        if index in indexes_pending:
+                            ElasticsearchUtils.start_bulk_load(backend.conn, index)
+
+                with self.time_phase('load documents'):
+                    if options.get('parallel'):
+                        for backend, index, __, __ in alias_mappings:
+                            self.update_backend_parallel(backend, index, **options)
+                    else:
+                        super(Command, self).handle(**options)
+
+                if tune_build:
+                    for backend, index, __, __ in alias_mappings:
+                        if index in indexes_pending:
+                            self.finish_backend_index(backend, index)
+
+                for backend, index, alias, record_count in alias_mappings:
+                    # Run a sanity check to ensure we aren't drastically changing the
+                    # index, which could be indicative of a bug.
+                    if index in indexes_pending and not options.get('disable_change_limit', False):
+                        with self.time_phase('sanity check'):
+                            record_count_is_sane, index_info_string = self.sanity_check_new_index(
+                                backend.conn, index, record_count, alias=alias
+                            )
+                        if record_count_is_sane:
+                            with self.time_phase('set alias'):
+                                self.set_alias(backend, alias, index)
+                            indexes_pending.pop(index, None)
+                        else:
+                            indexes_pending[index] = index_info_string
                     else:
-                        indexes_pending[index] = index_info_string
-                else:
-                    self.set_alias(backend, alias, index)
-                    indexes_pending.pop(index, None)
+                        with self.time_phase('set alias'):
+                            self.set_alias(backend, alias, index)
+                        indexes_pending.pop(index, None)
+
+            self.report_phase_timings()
+
+            if indexes_pending:
+                raise CommandError('Sanity check failed for new index(es): {}'.format(indexes_pending))
 
-        if indexes_pending:
-            raise CommandError('Sanity check failed for new index(es): {}'.format(indexes_pending))
+            if last_queued_id is not None:
+                SearchIndexQueueItem.objects.filter(id__lte=last_queued_id).delete()
+
+    @contextlib.contextmanager
+    def time_phase(self, phase):
+        """ Adds the duration of the block to the total time spent in the given phase of the rebuild. """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.phase_timings[phase] = self.phase_timings.get(phase, 0) + time.time() - start
+
+    def report_phase_timings(self):
+        total = sum(self.phase_timings.values())
+        lines = ['Index rebuild phase timings:']
+        lines += [
+            '  {:<24} {:>10.1f}s'.format(phase, duration)
+            for phase, duration in self.phase_timings.items()
+        ]
+        lines.append('  {:<24} {:>10.1f}s'.format('total', total))
+        self.stdout.write('\n'.join(lines))
+
+    def finish_backend_index(self, backend, index):
+        """
+        Makes a bulk loaded index ready to serve searches: restores its replicas and refresh interval,
+        waits for its replicas to be allocated, and merges its segments.
+
+        Raises:
+            CommandError: If the index doesn't reach the required health status in time. The alias isn't moved.
+        """
+        with self.time_phase('restore index settings'):
+            ElasticsearchUtils.finish_bulk_load(backend.conn, index)
+
+        with self.time_phase('wait for health'):
+            healthy = ElasticsearchUtils.wait_for_status(
+                backend.conn, index,
+                status=settings.ELASTICSEARCH_INDEX_BUILD_STATUS,
+                timeout=settings.ELASTICSEARCH_INDEX_BUILD_TIMEOUT,
+            )
+
+        if not healthy:
+            self.report_phase_timings()
+            logger.error('Index [%s] did not reach status [%s] in time. The alias was not moved to it.',
+                         index, settings.ELASTICSEARCH_INDEX_BUILD_STATUS)
+            raise CommandError(
+                'New index [{index}] did not reach status [{status}] within [{timeout}] seconds.'.format(
+                    index=index, status=settings.ELASTICSEARCH_INDEX_BUILD_STATUS,
+                    timeout=settings.ELASTICSEARCH_INDEX_BUILD_TIMEOUT,
+                )
+            )
+
+        with self.time_phase('force merge'):
+            ElasticsearchUtils.force_merge(backend.conn, index, settings.ELASTICSEARCH_INDEX_BUILD_TIMEOUT)
+
+    def update_backend_parallel(self, backend, index_name, **options):
+        """
+        Index every model of the backend into the given index, spreading each model across a process pool.
+
+        Models are indexed one at a time, so that the throughput of each can be reported.
+        """
+        using = backend.connection_alias
+        labels = options.get('app_label') or []
+        workers = options.get('workers') or os.cpu_count()
+
+        # Put the mapping once, before any of the workers write to the index.
+        backend.setup()
+
+        unified_index = haystack_connections[using].get_unified_index()
+        for model in unified_index.get_indexed_models():
+            opts = model._meta  # pylint: disable=protected-access
+            model_label = opts.label_lower
+            if labels and opts.app_label not in labels and model_label not in labels:
+                continue
+
+            index = unified_index.get_index(model)
+            pk_ranges = get_pk_ranges(index.build_queryset(using=using), options['partition_size'])
+
+            start = time.time()
+            # A forked worker closing the connection it inherited would also close it on the MySQL server,
+            # without the parent knowing. Closing it here instead means neither has one open when the workers
+            # are forked, and the parent reconnects the next time it runs a query.
+            connection.close()
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(
+                        index_pk_range, using, index_name, model_label, start_pk, end_pk, options['chunk_size']
+                    )
+                    for start_pk, end_pk in pk_ranges
+                ]
+                indexed = sum(future.result() for future in futures)
+
+            duration = time.time() - start
+            logger.info(
+                'Indexed [%d] %s documents into [%s] in [%.1f] seconds with [%d] workers ([%.1f] documents/second).',
+                indexed, model.__name__, index_name, duration, workers, indexed / duration if duration else 0
+            )
+
+        if options.get('commit', True):
+            backend.conn.indices.refresh(index=index_name)
 
     def percentage_change(self, current, previous):
         try:
@@ -76,50 +313,95 @@ class Command(HaystackCommand):
             # This is done to fail the sanity check
             return 1
 
-    def get_per_model_record_count(self, conn, index, content_type):
-        return conn.search(index=index, q='content_type:{}'.format(content_type)).get('hits', {}).get('total', 0)
+    def get_index_statistics(self, conn, indexes):
+        """
+        Collect per content type statistics for each of the given indexes (or aliases), in a single request.
+
+        Returns:
+            list[dict]: For each index, the total document count, and the document count and the number of
+                distinct values of each of CARDINALITY_FIELDS, per content type.
+        """
+        aggregations = {
+            'content_types': {
+                # A size of 0 returns every term.
+                'terms': {'field': 'content_type_exact', 'size': 0},
+                'aggs': {field: {'cardinality': {'field': field}} for field in CARDINALITY_FIELDS},
+            }
+        }
+        body = []
+        for index in indexes:
+            body.append({'index': index})
+            body.append({'size': 0, 'aggs': aggregations})
+
+        statistics = []
+        for response in conn.msearch(body=body)['responses']:
+            types = {}
+            for bucket in response.get('aggregations', {}).get('content_types', {}).get('buckets', []):
+                types[bucket['key']] = {'count': bucket['doc_count']}
+                types[bucket['key']].update({field: bucket[field]['value'] for field in CARDINALITY_FIELDS})
+            statistics.append({'total': response.get('hits', {}).get('total', 0), 'types': types})
+
+        return statistics
 
-    def sanity_check_new_index(self, conn, index, previous_record_count):
-        """ Ensure that we do not point to an index that looks like it has missing data. """
-        current_record_count = conn.count(index).get('count')
+    def get_average_document_sizes(self, conn, indexes):
+        """ Return the average size, in bytes, of the (primary) documents of each of the given indexes. """
+        stats = conn.indices.stats(index=','.join(indexes), metric='docs,store')['indices']
+        sizes = {}
+        for index, index_stats in stats.items():
+            primaries = index_stats['primaries']
+            count = primaries['docs']['count']
+            sizes[index] = primaries['store']['size_in_bytes'] / count if count else 0
+        return sizes
+
+    def sanity_check_new_index(self, conn, index, previous_record_count, alias=None):
+        """
+        Ensure that we do not point to an index that looks like it has missing data.
+
+        The total record count is compared against previous_record_count. When the alias of the index that's in use
+        is given, the new index is also compared against it: the document count and the number of distinct values
+        of CARDINALITY_FIELDS per content type, and the average document size. Content types missing from the
+        index in use aren't compared, since there is nothing to compare them with. Values below
+        INDEX_TYPE_CHANGE_MIN_COMPARED only fail the check if they drop to zero.
+        """
+        conn.indices.refresh(index=index)
+        indexes = [index, alias] if alias else [index]
+        statistics = self.get_index_statistics(conn, indexes)
+
+        current_record_count = statistics[0]['total']
         percentage_change = self.percentage_change(current_record_count, previous_record_count)
         # Verify there was not a big shift in record count
-        record_count_is_sane = percentage_change < settings.INDEX_SIZE_CHANGE_THRESHOLD
-
-        if not record_count_is_sane:
-            attempts = 0
-            while attempts < 2:
-                attempts += 1
-                current_attempt_record_count = conn.count(index).get('count')
-                current_attempt_percentage_change = self.percentage_change(
-                    current_attempt_record_count, previous_record_count)
-                alternate_current_record_count = conn.search(index).get('hits', {}).get('total', 0)
-                course_search_record_count = self.get_per_model_record_count(conn, index, 'course')
-                courserun_search_record_count = self.get_per_model_record_count(conn, index, 'courserun')
-                program_search_record_count = self.get_per_model_record_count(conn, index, 'program')
-                person_search_record_count = self.get_per_model_record_count(conn, index, 'person')
-                message = '''
-    Sanity check failed for attempt #{0}.
-    Percentage change: {1}
-    Base record count: {2}
-    Search record count: {3}
-    Course count: {4}
-    CourseRun count: {5}
-    Program count: {6}
-    People count: {7}
-                '''.format(
-                    attempts,
-                    str(int(round(current_attempt_percentage_change * 100, 0))) + '%',
-                    current_attempt_record_count,
-                    alternate_current_record_count,
-                    course_search_record_count,
-                    courserun_search_record_count,
-                    program_search_record_count,
-                    person_search_record_count
+        failures = []
+        if percentage_change >= settings.INDEX_SIZE_CHANGE_THRESHOLD:
+            failures.append('record count changed by [{:.2f}%]'.format(percentage_change * 100))
+
+        if alias:
+            current_types, previous_types = statistics[0]['types'], statistics[1]['types']
+            for content_type, previous in sorted(previous_types.items()):
+                current = current_types.get(content_type, {})
+                threshold = settings.INDEX_TYPE_CHANGE_THRESHOLDS.get(
+                    content_type, settings.INDEX_SIZE_CHANGE_THRESHOLD
                 )
-                logger.info(message)
-                logger.info('...sleeping for 5 seconds...')
-                time.sleep(5)
+                for statistic in ('count',) + CARDINALITY_FIELDS:
+                    change = self.percentage_change(current.get(statistic, 0), previous[statistic])
+                    if previous[statistic] < settings.INDEX_TYPE_CHANGE_MIN_COMPARED:
+                        # Small values are only checked for disappearing entirely.
+                        failed = previous[statistic] and not current.get(statistic, 0)
+                    else:
+                        failed = change >= threshold
+                    if failed:
+                        failures.append('[{}] {} changed from [{}] to [{}], a [{:.2f}%] change'.format(
+                            content_type, statistic, previous[statistic], current.get(statistic, 0), change * 100
+                        ))
+
+            sizes = self.get_average_document_sizes(conn, indexes)
+            previous_size = next((size for name, size in sizes.items() if name != index), 0)
+            size_change = self.percentage_change(sizes.get(index, 0), previous_size)
+            if previous_size and size_change >= settings.INDEX_DOCUMENT_SIZE_CHANGE_THRESHOLD:
+                failures.append('average document size changed by [{:.2f}%]'.format(size_change * 100))
+
+        record_count_is_sane = not failures
+        if failures:
+            logger.info('Sanity check failed for index [%s]: %s.', index, '; '.join(failures))
 
         index_info_string = (
             'The previous index contained [{}] records. '
@@ -127,6 +409,8 @@ class Command(HaystackCommand):
                 previous_record_count, current_record_count, percentage_change * 100
             )
         )
+        if failures:
+            index_info_string += ' Failed checks: {}.'.format('; '.join(failures))
         return record_count_is_sane, index_info_string
 
     def set_alias(self, backend, alias, index):
@@ -151,13 +435,15 @@ class Command(HaystackCommand):
             ]
         }
         backend.conn.indices.update_aliases(body)
+        clear_index_generations()
 
-    def prepare_backend_index(self, backend):
+    def prepare_backend_index(self, backend, bulk_load=False):
         """
         Prepares an index that will be used to store data by the backend.
 
         Args:
             backend (ElasticsearchSearchBackend): Backend to update.
+            bulk_load (bool): Create the index with settings tuned for bulk loading.
 
         Returns:
             (tuple): tuple containing:
@@ -166,6 +452,6 @@ class Command(HaystackCommand):
                 index_name(str): Name of the newly-created index.
         """
         alias = backend.index_name
-        index_name = ElasticsearchUtils.create_index(backend.conn, alias)
+        index_name = ElasticsearchUtils.create_index(backend.conn, alias, bulk_load=bulk_load)
         backend.index_name = index_name
         return alias, index_name
@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class SearchIndexQueueItem(models.Model):
+    """
+    A model instance whose search documents need to be updated.
+
+    Rows are written by the queued search signal processor, and drained in batches into the live
+    index by the process_search_index_queue management command. An instance may be queued any
+    number of times; duplicates are collapsed when the queue is drained.
+    """
+    model = models.CharField(max_length=255, help_text='Lowercased label of the model, e.g. course_metadata.course.')
+    object_id = models.PositiveIntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return '{model}.{object_id}'.format(model=self.model, object_id=self.object_id)
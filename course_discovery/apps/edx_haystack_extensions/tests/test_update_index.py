@@ -1,16 +1,47 @@
+from concurrent.futures import Future
+from io import StringIO
+
+import ddt
 import mock
 import pytest
 from django.conf import settings
 from django.core.management import CommandError, call_command
-from django.test import TestCase, override_settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from elasticsearch import Elasticsearch
 from freezegun import freeze_time
+from haystack.query import SearchQuerySet
 
 from course_discovery.apps.core.tests.mixins import ElasticsearchTestMixin
+from course_discovery.apps.course_metadata.models import CourseRun
+from course_discovery.apps.course_metadata.search_queue import enqueue, process_queue
 from course_discovery.apps.course_metadata.tests.factories import CourseRunFactory
+from course_discovery.apps.edx_haystack_extensions.management.commands.update_index import (
+    Command, get_pk_ranges, index_pk_range
+)
+from course_discovery.apps.edx_haystack_extensions.models import SearchIndexQueueItem
 from course_discovery.apps.edx_haystack_extensions.tests.mixins import SearchIndexTestMixin
 
 
+class SerialExecutor:
+    """ Stands in for ProcessPoolExecutor, so that workers see the test's uncommitted data. """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@ddt.ddt
 @override_settings(HAYSTACK_SIGNAL_PROCESSOR='haystack.signals.BaseSignalProcessor')
 class UpdateIndexTests(ElasticsearchTestMixin, SearchIndexTestMixin, TestCase):
     @freeze_time('2016-06-21')
@@ -35,6 +66,77 @@ class UpdateIndexTests(ElasticsearchTestMixin, SearchIndexTestMixin, TestCase):
         }
         self.assertDictEqual(response, expected)
 
+    @freeze_time('2016-06-21')
+    def test_handle_build_tuning(self):
+        """ Verify the new index is built without replicas or refreshes, and its settings restored before use. """
+        alias = settings.HAYSTACK_CONNECTIONS['default']['INDEX_NAME']
+        index = '{alias}_20160621_000000'.format(alias=alias)
+        connection = Elasticsearch(settings.HAYSTACK_CONNECTIONS['default']['URL'])
+        command_module = 'course_discovery.apps.edx_haystack_extensions.management.commands.update_index'
+
+        def assert_bulk_load_settings(*args, **kwargs):  # pylint: disable=unused-argument
+            index_settings = connection.indices.get_settings(index=index)[index]['settings']['index']
+            assert index_settings['number_of_replicas'] == '0'
+            assert index_settings['refresh_interval'] == '-1'
+
+        out = StringIO()
+        with mock.patch(command_module + '.HaystackCommand.handle', side_effect=assert_bulk_load_settings):
+            with mock.patch(command_module + '.Command.sanity_check_new_index', return_value=(True, '')):
+                call_command('update_index', stdout=out)
+
+        index_settings = connection.indices.get_settings(index=index)[index]['settings']['index']
+        assert index_settings['number_of_replicas'] == '1'
+        assert index_settings['refresh_interval'] == '1s'
+
+        output = out.getvalue()
+        for phase in ('create index', 'load documents', 'restore index settings', 'force merge', 'set alias'):
+            assert phase in output
+
+    def test_handle_unhealthy_index(self):
+        """ Verify the alias isn't moved to a new index that doesn't reach the required health status in time. """
+        alias = settings.HAYSTACK_CONNECTIONS['default']['INDEX_NAME']
+        connection = Elasticsearch(settings.HAYSTACK_CONNECTIONS['default']['URL'])
+        previous_indexes = set(connection.indices.get_alias(name=alias))
+
+        with mock.patch('course_discovery.apps.core.utils.ElasticsearchUtils.wait_for_status', return_value=False):
+            with pytest.raises(CommandError):
+                call_command('update_index', stdout=StringIO())
+
+        assert set(connection.indices.get_alias(name=alias)) == previous_indexes
+
+    def test_handle_clears_search_index_queue(self):
+        """ Verify changes queued before the rebuild are dropped, since the new index includes them. """
+        SearchIndexQueueItem.objects.create(model='course_metadata.courserun', object_id=1)
+
+        with mock.patch('course_discovery.apps.edx_haystack_extensions.management.commands.'
+                        'update_index.Command.sanity_check_new_index', return_value=(True, '')):
+            call_command('update_index')
+
+        assert not SearchIndexQueueItem.objects.exists()
+
+    def test_handle_holds_changes_queued_during_rebuild(self):
+        """ Verify changes queued while the index is rebuilt aren't drained until the new index is in use. """
+        course_run = CourseRunFactory()
+
+        def change_course_run(*args, **kwargs):  # pylint: disable=unused-argument
+            # The new index has already been loaded, so it doesn't include the change.
+            course_run.title_override = 'Changed during the rebuild'
+            course_run.save()
+            enqueue({CourseRun: {course_run.pk}})
+            assert process_queue(10) == 0
+            return True, ''
+
+        with mock.patch('course_discovery.apps.edx_haystack_extensions.management.commands.'
+                        'update_index.Command.sanity_check_new_index', side_effect=change_course_run):
+            call_command('update_index')
+
+        assert process_queue(10) == 1
+
+        alias = settings.HAYSTACK_CONNECTIONS['default']['INDEX_NAME']
+        Elasticsearch(settings.HAYSTACK_CONNECTIONS['default']['URL']).indices.refresh(index=alias)
+        results = {result.pk: result for result in SearchQuerySet().models(CourseRun)}
+        assert results[str(course_run.pk)].title == 'Changed during the rebuild'
+
     def test_sanity_check_error(self):
         """ Verify the command raises a CommandError if new index fails the sanity check. """
         CourseRunFactory()
@@ -64,6 +166,53 @@ class UpdateIndexTests(ElasticsearchTestMixin, SearchIndexTestMixin, TestCase):
                             'update_index.Command.get_record_count', return_value=record_count):
                 call_command('update_index')
 
+    def get_statistics_response(self, total, types):
+        buckets = [
+            {
+                'key': content_type,
+                'doc_count': count,
+                'organizations_exact': {'value': organizations},
+                'seat_types_exact': {'value': 2},
+                'subjects_exact': {'value': 3},
+            }
+            for content_type, (count, organizations) in types.items()
+        ]
+        return {'hits': {'total': total}, 'aggregations': {'content_types': {'buckets': buckets}}}
+
+    def get_stats_response(self, index, count, size):
+        return {index: {'primaries': {'docs': {'count': count}, 'store': {'size_in_bytes': size}}}}
+
+    @ddt.data(
+        # Counts and cardinalities are compared per content type, even when the total is stable.
+        ({'course': (50, 25), 'courserun': (50, 25), 'program': (5, 2)}, 1000, True),
+        ({'course': (40, 25), 'courserun': (60, 25), 'program': (5, 2)}, 1000, False),
+        ({'course': (50, 10), 'courserun': (50, 25), 'program': (5, 2)}, 1000, False),
+        # Small values may change by more than the limit, but not disappear.
+        ({'course': (50, 25), 'courserun': (50, 25), 'program': (6, 3)}, 1000, True),
+        ({'course': (50, 25), 'courserun': (50, 25), 'program': (5, 0)}, 1000, False),
+        ({'course': (50, 25), 'courserun': (50, 25)}, 1000, False),
+        # The average document size is compared, too.
+        ({'course': (50, 25), 'courserun': (50, 25), 'program': (5, 2)}, 2000, False),
+    )
+    @ddt.unpack
+    def test_sanity_check_statistics(self, types, size, expected_is_sane):
+        """ Verify the new index is compared against the index in use with a single statistics request. """
+        conn = mock.Mock()
+        conn.msearch.return_value = {'responses': [
+            self.get_statistics_response(100, types),
+            self.get_statistics_response(100, {'course': (50, 25), 'courserun': (50, 25), 'program': (5, 2)}),
+        ]}
+        conn.indices.stats.return_value = {'indices': dict(
+            self.get_stats_response('new', 100, size * 100),
+            **self.get_stats_response('old', 100, 1000 * 100)
+        )}
+
+        record_count_is_sane, __ = Command().sanity_check_new_index(conn, 'new', 100, alias='catalog')
+
+        assert record_count_is_sane == expected_is_sane
+        assert conn.msearch.call_count == 1
+        assert not conn.search.called
+
     @freeze_time('2016-06-21')
     def test_sanity_check_disabled(self):
         """ Verify the sanity check can be disabled. """
@@ -71,3 +220,56 @@ class UpdateIndexTests(ElasticsearchTestMixin, SearchIndexTestMixin, TestCase):
                         'update_index.Command.sanity_check_new_index') as mock_sanity_check_new_index:
             call_command('update_index', disable_change_limit=True)
             self.assertFalse(mock_sanity_check_new_index.called)
+
+    def test_get_pk_ranges(self):
+        pks = sorted(course_run.pk for course_run in CourseRunFactory.create_batch(5))
+        assert get_pk_ranges(CourseRun.objects.all(), 2) == [(pks[0], pks[1]), (pks[2], pks[3]), (pks[4], pks[4])]
+        assert get_pk_ranges(CourseRun.objects.none(), 2) == []
+
+    @ddt.data(
+        ({'age': 1}, '--age'),
+        ({'start_date': '2016-06-21'}, '--start'),
+        ({'end_date': '2016-06-21'}, '--end'),
+        ({'remove': True}, '--remove'),
+    )
+    @ddt.unpack
+    def test_handle_parallel_unsupported_options(self, options, flag):
+        """ Verify options selecting which objects are indexed are rejected, rather than ignored, in parallel. """
+        with self.assertRaisesRegex(CommandError, flag):
+            call_command('update_index', parallel=True, **options)
+
+
+@override_settings(HAYSTACK_SIGNAL_PROCESSOR='haystack.signals.BaseSignalProcessor')
+class ParallelUpdateIndexTests(ElasticsearchTestMixin, SearchIndexTestMixin, TransactionTestCase):
+    """ The parallel build manages the database connection, which can't be done inside a test's transaction. """
+
+    def test_handle_parallel(self):
+        """ Verify the parallel build indexes every object, one primary key range per task. """
+        course_runs = CourseRunFactory.create_batch(5)
+        enqueue({CourseRun: {course_runs[0].pk}})
+        command_module = 'course_discovery.apps.edx_haystack_extensions.management.commands.update_index'
+        connection_open_in_workers = []
+
+        def index_pk_range_without_connection(*args):
+            # A worker forked with the parent's connection open would close it on the server too.
+            connection_open_in_workers.append(connection.connection is not None)
+            return index_pk_range(*args)
+
+        with mock.patch(command_module + '.concurrent.futures.ProcessPoolExecutor', SerialExecutor):
+            with mock.patch(command_module + '.index_pk_range',
+                            side_effect=index_pk_range_without_connection) as mock_index_pk_range:
+                with mock.patch(command_module + '.Command.sanity_check_new_index', return_value=(True, '')):
+                    call_command('update_index', parallel=True, partition_size=2, chunk_size=2)
+
+        model_labels = [call[0][2] for call in mock_index_pk_range.call_args_list]
+        assert model_labels.count('course_metadata.courserun') == 3
+        assert not any(connection_open_in_workers)
+
+        # The parent process can still query the database once the workers are done.
+        assert not SearchIndexQueueItem.objects.exists()
+
+        self.refresh_index()
+        alias = settings.HAYSTACK_CONNECTIONS['default']['INDEX_NAME']
+        host = settings.HAYSTACK_CONNECTIONS['default']['URL']
+        response = Elasticsearch(host).search(index=alias, q='content_type:courserun')
+        assert response['hits']['total'] == len(course_runs)
@@ -412,6 +412,44 @@ REST_FRAMEWORK_EXTENSIONS = {
     'DEFAULT_OBJECT_CACHE_KEY_FUNC': 'course_discovery.apps.api.cache.timestamped_object_key_constructor',
 }
 
+# Content coding used to store cached API responses. Responses are served in this encoding to clients whose
+# Accept-Encoding allows it, and decoded for everyone else. 'br' requires the optional brotli package, and falls
+# back to 'gzip' if it isn't installed.
+API_CACHE_CONTENT_ENCODING = 'gzip'
+API_CACHE_COMPRESSION_LEVEL = 6
+
+# Memory budget, in bytes, of the per-process LRU tier in front of the shared API response cache. 0 disables it.
+# Keep in mind that every worker process holds its own copy.
+API_CACHE_LOCAL_MAX_BYTES = 0
+
+# Number of typeahead responses kept by the per-process typeahead cache, and for how many seconds. 0 disables it.
+TYPEAHEAD_CACHE_MAX_ENTRIES = 1000
+TYPEAHEAD_CACHE_TIMEOUT = 30
+
+# When enabled, a cache miss is rendered by a single request holding a cache lock. Concurrent requests for the
+# same response are served the previous generation's entry, or wait up to API_CACHE_LOCK_WAIT seconds for it.
+API_CACHE_STALE_WHILE_REVALIDATE = False
+# Seconds after which a render lock is considered abandoned (e.g. the rendering process died).
+API_CACHE_LOCK_TIMEOUT = 60
+API_CACHE_LOCK_WAIT = 5
+API_CACHE_LOCK_POLL_INTERVAL = 0.1
+# Record hit/stale/miss/lock-wait counters in the shared cache. See course_discovery.apps.api.cache.API_CACHE_STATS.
+API_CACHE_RECORD_STATS = False
+# Seconds between logging the API cache stats, from each process serving API requests. 0 disables logging.
+API_CACHE_STATS_LOG_INTERVAL = 0
+
+# API paths replayed by the warm_api_cache management command, most requested first.
+API_CACHE_WARMING_URLS = [
+    '/api/v1/courses/',
+    '/api/v1/programs/',
+    '/api/v1/people/',
+    '/api/v1/organizations/',
+    '/api/v1/pathways/',
+]
+# The user warm_api_cache makes requests as. It must be able to read every warmed endpoint.
+API_CACHE_WARMING_USERNAME = None
+API_CACHE_WARMING_MAX_WORKERS = 4
+
 # NOTE (CCB): JWT_SECRET_KEY is intentionally not set here to avoid production releases with a public value.
 # Set a value in a downstream settings file.
 JWT_AUTH = {
@@ -509,6 +547,12 @@ ELASTICSEARCH_INDEX_SETTINGS = {
     }
 }
 
+# update_index builds new indexes without replicas or refreshes. Before pointing the alias at a new index, it
+# waits (up to ELASTICSEARCH_INDEX_BUILD_TIMEOUT seconds) for the restored replicas to reach this health status.
+# Clusters with too few data nodes to allocate every replica, such as a single node devstack, wait for yellow.
+ELASTICSEARCH_INDEX_BUILD_STATUS = 'green'
+ELASTICSEARCH_INDEX_BUILD_TIMEOUT = 600
+
 SYNONYMS_MODULE = 'course_discovery.settings.synonyms'
 
 # Haystack configuration (http://django-haystack.readthedocs.io/en/v2.5.0/settings.html)
@@ -523,13 +567,35 @@ HAYSTACK_CONNECTIONS = {
 }
 
 # We do not use the RealtimeSignalProcessor here to avoid overloading our
-# Elasticsearch instance when running the refresh_course_metadata command
-HAYSTACK_SIGNAL_PROCESSOR = 'haystack.signals.BaseSignalProcessor'
+# Elasticsearch instance when running the refresh_course_metadata command. Changes are
+# queued instead, and indexed in batches by the process_search_index_queue command.
+HAYSTACK_SIGNAL_PROCESSOR = 'course_discovery.apps.course_metadata.search_queue.QueuedSignalProcessor'
 HAYSTACK_INDEX_RETENTION_LIMIT = 3
 
+# Number of queued changes process_search_index_queue indexes at a time, and how long it
+# waits between polls of an empty queue when running continuously.
+SEARCH_INDEX_QUEUE_BATCH_SIZE = 500
+SEARCH_INDEX_QUEUE_POLL_INTERVAL = 5
+# The longest update_index pauses the queue for, in case it dies without resuming it.
+SEARCH_INDEX_QUEUE_PAUSE_TIMEOUT = 6 * 60 * 60
+
 # Update Index Settings
 # Make sure the size of the new index does not change by more than this percentage
 INDEX_SIZE_CHANGE_THRESHOLD = .1
+# Per content type limits on the change in document count, and in the number of distinct organizations, subjects,
+# and seat types. Types that aren't listed use INDEX_SIZE_CHANGE_THRESHOLD.
+INDEX_TYPE_CHANGE_THRESHOLDS = {
+    'course': .1,
+    'courserun': .1,
+    'person': .2,
+    'program': .1,
+}
+# Per content type counts and cardinalities smaller than this in the index in use aren't compared by percentage,
+# since a single legitimate change (e.g. a new seat type, or a new program in a small set) exceeds the limits.
+# They still fail the check if they drop to zero.
+INDEX_TYPE_CHANGE_MIN_COMPARED = 20
+# Limit on the change in average document size. Looser, since the size of an index on disk varies with its segments.
+INDEX_DOCUMENT_SIZE_CHANGE_THRESHOLD = .25
 
 # Elasticsearch search query facet "size" option to increase from the default value of "100"
 # See  https://www.elastic.co/guide/en/elasticsearch/reference/1.5/search-facets-terms-facet.html#_accuracy_control
@@ -555,6 +621,15 @@ DISTINCT_COUNTS_FACET_PRECISION = 250
 # to be executed.
 DISTINCT_COUNTS_QUERY_CACHE_WARMING_COUNT = 20
 
+# Memory budget, in bytes, of the per-process cache of distinct counts query results, and for how many seconds
+# results are kept. Cached results are also dropped when the search alias is pointed at a new index. 0 disables it.
+DISTINCT_COUNTS_CACHE_MAX_BYTES = 16 * 1024 * 1024
+DISTINCT_COUNTS_CACHE_TIMEOUT = 300
+
+# Seconds for which the index behind a search alias is remembered, once looked up to key the caches above. Other
+# processes see a swapped alias once this expires. 0 looks it up on every query.
+INDEX_GENERATION_CACHE_TIMEOUT = 5
+
 DEFAULT_PARTNER_ID = None
 
 # See: https://docs.djangoproject.com/en/dev/ref/settings/#site-id
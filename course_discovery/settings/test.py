@@ -34,6 +34,9 @@ CACHES = {
 
 # Disable the caching mixin for tests
 USE_API_CACHING = False
+TYPEAHEAD_CACHE_MAX_ENTRIES = 0
+DISTINCT_COUNTS_CACHE_MAX_BYTES = 0
+INDEX_GENERATION_CACHE_TIMEOUT = 0
 
 DATABASES = {
     'default': {